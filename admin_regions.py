@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+import startup_profile
+
+# ======================================================================
+#      WILAYAH ADMINISTRASI (point-in-polygon provinsi, kab/kota, kecamatan)
+# ======================================================================
+# Provinsi, kabupaten/kota dan kecamatan ditentukan dari polygon batas
+# administrasi (GeoJSON, mis. geoBoundaries IDN ADM1/ADM2/ADM3) di
+# BOUNDARY_FILES; level yang filenya tidak ada dilewati:
+#   1. semua koordinat unik katalog di-query sekaligus ke STRtree shapely
+#      (bounding box dulu, lalu predicate "intersects" pada geometri yang
+#      sudah di-prepare)
+#   2. event di laut / di luar semua polygon memakai polygon terdekat
+#      selama jaraknya < OFFSHORE_MAX_KM, selain itu "Lainnya"; jarak
+#      dihitung ke garis batas yang disederhanakan (NEAREST_SIMPLIFY_DEG),
+#      karena jarak ke polygon detail (ribuan vertex) jauh lebih mahal
+#   3. hasil di-cache per koordinat (dibulatkan COORD_DECIMALS), jadi
+#      reload dan upsert feed hanya menghitung koordinat baru
+# Kalau shapely atau file batas tidak ada, available() False dan
+# seismo_engine kembali ke kota terdekat (worldcities.csv).
+
+BOUNDARY_FILES = {
+    "province": os.environ.get("SEISMO_PROVINCE_BOUNDARIES", "data/boundaries/provinces.geojson"),
+    "regency": os.environ.get("SEISMO_REGENCY_BOUNDARIES", "data/boundaries/regencies.geojson"),
+    "district": os.environ.get("SEISMO_DISTRICT_BOUNDARIES", "data/boundaries/districts.geojson"),
+}
+# Properti nama yang dicoba berurutan (geoBoundaries, GADM, BIG)
+NAME_PROPERTIES = {
+    "province": ("shapeName", "NAME_1", "PROVINSI", "name"),
+    "regency": ("shapeName", "NAME_2", "KAB_KOTA", "WADMKK", "name"),
+    "district": ("shapeName", "NAME_3", "KECAMATAN", "WADMKC", "name"),
+}
+UNKNOWN = "Lainnya"
+OFFSHORE_MAX_KM = 150
+KM_PER_DEGREE = 111.32        # jarak planar dalam derajat; cukup dekat ekuator (Indonesia)
+NEAREST_SIMPLIFY_DEG = 0.01    # ~1 km
+COORD_DECIMALS = 4            # ~11 m, sama dengan presisi koordinat katalog
+MAX_CACHE_ENTRIES = 2_000_000
+
+
+def _feature_name(properties, level):
+    for key in NAME_PROPERTIES[level]:
+        if properties.get(key):
+            return str(properties[key]).replace("Province", "").strip()
+    return UNKNOWN
+
+
+class BoundaryLayer:
+    """Polygon satu level administrasi + STRtree di atas bounding box-nya."""
+
+    def __init__(self, path, level):
+        import shapely
+        from shapely.geometry import shape
+
+        with open(path) as f:
+            features = json.load(f)["features"]
+        geometries, names = [], []
+        for feature in features:
+            if not feature.get("geometry"):
+                continue
+            geometry = shape(feature["geometry"])
+            if not geometry.is_valid:
+                geometry = shapely.make_valid(geometry)
+            geometries.append(geometry)
+            names.append(_feature_name(feature.get("properties") or {}, level))
+        self.geometries = np.asarray(geometries, dtype=object)
+        shapely.prepare(self.geometries)
+        self.names = np.asarray(names + [UNKNOWN], dtype=object)     # indeks -1 -> UNKNOWN
+        self.tree = shapely.STRtree(self.geometries)
+        self.nearest_tree = shapely.STRtree(shapely.boundary(shapely.simplify(self.geometries, NEAREST_SIMPLIFY_DEG)))
+
+    def lookup(self, lat, lon):
+        """Indeks polygon per titik (-1 = tidak ada dalam OFFSHORE_MAX_KM)."""
+        import shapely
+
+        points = shapely.points(lon, lat)
+        result = np.full(len(points), -1, dtype=np.int64)
+        point_idx, geom_idx = self.tree.query(points, predicate="intersects")
+        # Titik di perbatasan / polygon tumpang tindih: ambil polygon dengan indeks terkecil
+        order = np.lexsort((geom_idx, point_idx))
+        point_idx, geom_idx = point_idx[order], geom_idx[order]
+        first = np.unique(point_idx, return_index=True)[1]
+        result[point_idx[first]] = geom_idx[first]
+
+        outside = np.flatnonzero(result < 0)
+        valid = outside[~shapely.is_empty(points[outside]) & np.isfinite(lat[outside]) & np.isfinite(lon[outside])]
+        if len(valid):
+            near_point, near_geom = self.nearest_tree.query_nearest(
+                points[valid], max_distance=OFFSHORE_MAX_KM / KM_PER_DEGREE, all_matches=False)
+            result[valid[near_point]] = near_geom
+        return result
+
+
+_layers = None
+_layers_signature = None
+_layers_lock = threading.Lock()
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _signature():
+    parts = []
+    for level, path in BOUNDARY_FILES.items():
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append((level, st.st_mtime_ns, st.st_size))
+    return tuple(parts)
+
+
+def _load_layers():
+    """Layer per level (dimuat ulang kalau file batas berubah); {} kalau tidak tersedia."""
+    global _layers, _layers_signature
+    with _layers_lock:
+        signature = _signature()
+        if _layers is not None and signature == _layers_signature:
+            return _layers
+        layers = {}
+        if signature:
+            try:
+                with startup_profile.stage("import_shapely"):
+                    import shapely  # noqa: F401
+            except ImportError:
+                print("⚠️ shapely belum terinstall, polygon batas wilayah tidak dipakai.")
+            else:
+                for level, path in BOUNDARY_FILES.items():
+                    if os.path.exists(path):
+                        with startup_profile.stage(f"boundaries_{level}"):
+                            layers[level] = BoundaryLayer(path, level)
+        _layers, _layers_signature = layers, signature
+        with _cache_lock:
+            _cache.clear()
+        return layers
+
+
+def available():
+    """True kalau polygon provinsi bisa dipakai (shapely + file batas provinsi)."""
+    return "province" in _load_layers()
+
+
+def levels():
+    return tuple(_load_layers())
+
+
+def assign(lat, lon):
+    """{level: array nama} untuk setiap titik, dievaluasi batch per koordinat unik."""
+    layers = _load_layers()
+    lat = np.round(np.asarray(lat, dtype=np.float64), COORD_DECIMALS)
+    lon = np.round(np.asarray(lon, dtype=np.float64), COORD_DECIMALS)
+    coords, inverse = np.unique(np.column_stack([lat, lon]), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    keys = list(map(tuple, coords.tolist()))
+
+    with _cache_lock:
+        cached = [_cache.get(k) for k in keys]
+    missing = np.asarray([i for i, c in enumerate(cached) if c is None], dtype=np.int64)
+    if len(missing):
+        found = {level: layer.names[layer.lookup(coords[missing, 0], coords[missing, 1])]
+                 for level, layer in layers.items()}
+        with _cache_lock:
+            if len(_cache) + len(missing) > MAX_CACHE_ENTRIES:
+                _cache.clear()
+            for j, i in enumerate(missing):
+                cached[i] = _cache[keys[i]] = tuple(found[level][j] for level in layers)
+
+    per_coord = np.asarray(cached, dtype=object).reshape(len(keys), len(layers))
+    return {level: per_coord[inverse, k] for k, level in enumerate(layers)}
@@ -0,0 +1,57 @@
+import os
+
+# ======================================================================
+#            BACKGROUND JOBS (antrian lokal berbasis disk, tanpa broker)
+# ======================================================================
+# Callback berat (clustering, analitik full-catalog) dijalankan di subprocess
+# lewat DiskcacheManager bawaan Dash. Status job, progress dan hasil disimpan
+# di data/jobs (SQLite milik diskcache), jadi semua worker gunicorn di mesin
+# yang sama berbagi antrian dan cache hasil yang sama (key = input callback
+# + nilai cache_by, mis. versi dataset). Export tidak lewat sini: /export
+# sudah streaming (export_stream).
+#
+# Butuh: pip install "dash[diskcache]"  (diskcache, multiprocess, psutil).
+# Kalau belum terpasang, callback tetap jalan secara sinkron seperti biasa
+# (tanpa progress, cancel dan cache hasil).
+
+JOB_CACHE_DIR = "data/jobs"
+JOB_EXPIRE_SECONDS = 60 * 60   # hasil yang tidak diakses 1 jam dibuang
+
+
+def create_manager(cache_by=None):
+    """Buat DiskcacheManager; hasil di-cache berdasarkan input + nilai cache_by."""
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        os.makedirs(JOB_CACHE_DIR, exist_ok=True)
+        return DiskcacheManager(diskcache.Cache(JOB_CACHE_DIR), cache_by=cache_by, expire=JOB_EXPIRE_SECONDS)
+    except ImportError:
+        print("⚠️ diskcache/multiprocess/psutil belum terpasang, callback berat berjalan sinkron.")
+        return None
+
+
+def background_callback(app, manager, *dependencies, progress, running=None, cancel=None, **kwargs):
+    """Seperti app.callback, tapi fungsi dijalankan sebagai background job.
+
+    Fungsi selalu menerima `set_progress` sebagai argumen pertama. Tanpa manager
+    (dependency belum terpasang) callback didaftarkan biasa dan set_progress
+    menjadi no-op, sehingga kode callback tidak perlu tahu mode mana yang aktif.
+    """
+    def decorator(fn):
+        if manager is not None:
+            return app.callback(
+                *dependencies,
+                background=True,
+                manager=manager,
+                progress=progress,
+                running=running,
+                cancel=cancel,
+                **kwargs
+            )(fn)
+
+        def run_sync(*args):
+            return fn(lambda *_: None, *args)
+        run_sync.__name__ = fn.__name__
+        kwargs.pop("cache_args_to_ignore", None)
+        return app.callback(*dependencies, running=running, **kwargs)(run_sync)
+    return decorator
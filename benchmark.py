@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from unittest import mock
+
+import numpy as np
+
+import startup_profile
+
+# ======================================================================
+#            BENCHMARK CALLBACK DASHBOARD (katalog sintetis)
+# ======================================================================
+# Menjalankan jalur server langsung (tanpa browser) pada katalog sintetis
+# 100k / 1M / 10M event dan mencatat latensi (p50/p90/p99), puncak memori
+# dan ukuran payload per tahap:
+#   load_and_combine  baca CSV USGS/EMSC sintetis
+#   assign_provinces  deteksi provinsi
+#   store             tulis + mmap dataset_store (jalur startup worker)
+#   publish           warm-up snapshot (pyramid heatmap, baseline swarm)
+#   filter_data       beberapa skenario filter
+#   update_dashboard  callback overview + serialisasi respons (payload)
+#   export            streaming export /export/<fmt>
+#
+#   python benchmark.py --sizes 100k,1m --save data/bench/baseline.json
+#   python benchmark.py --sizes 100k,1m --compare data/bench/baseline.json
+#
+# --compare keluar dengan kode 1 kalau p50 atau puncak memori suatu tahap
+# naik lebih dari --threshold (default 20%).
+
+RESULTS_DIR = "data/bench"
+DEFAULT_SIZES = "100k,1m"
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 0.20
+# Tabel overview merender SEMUA baris hasil filter; di atas batas ini
+# skenario update_dashboard dilewati (dicatat) supaya benchmark tidak OOM.
+DASHBOARD_ROW_LIMIT = 200_000
+RSS_SAMPLE_SECONDS = 0.005
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+class PeakMemory:
+    """Puncak alokasi selama blok: tracemalloc (numpy/pandas ikut terlacak) + RSS.
+
+    RSS saja sering 0 MB: allocator memakai ulang halaman yang sudah dimiliki
+    proses. tracemalloc menghitung alokasi sebenarnya, jadi `peak` =
+    puncak alokasi di atas posisi awal; `peak_rss` tetap dicatat sebagai
+    pembanding (kenaikan RSS maksimum, sampling di thread terpisah).
+    """
+
+    def __enter__(self):
+        self._tracing = tracemalloc.is_tracing()
+        if not self._tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+        self.start_rss = self.max_rss = startup_profile.rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.max_rss = max(self.max_rss, startup_profile.rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(tracemalloc.get_traced_memory()[1] - self.start, 0)
+        if not self._tracing:
+            tracemalloc.stop()
+        self.peak_rss = max(self.max_rss, startup_profile.rss_bytes()) - self.start_rss
+
+
+def measure(fn, repeat):
+    """Jalankan fn() `repeat` kali; run terakhir dengan tracemalloc (memori).
+
+    tracemalloc memperlambat alokasi, jadi run itu hanya masuk statistik
+    latensi kalau repeat=1 (tahap sekali jalan). Return (hasil terakhir, statistik).
+    """
+    repeat = max(1, repeat)
+    durations, result = [], None
+    for i in range(repeat):
+        result = None                       # hasil run sebelumnya tidak ikut dihitung memori
+        if i < repeat - 1:
+            started = time.perf_counter()
+            result = fn()
+            durations.append(time.perf_counter() - started)
+            continue
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            result = fn()
+            traced = time.perf_counter() - started
+        if not durations:
+            durations.append(traced)
+    ms = np.asarray(durations) * 1000
+    stats = {
+        "runs": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "peak_mb": round(memory.peak / 2 ** 20, 1),
+        "peak_rss_mb": round(memory.peak_rss / 2 ** 20, 1),
+    }
+    return result, stats
+
+
+def scenarios(snap):
+    """Argumen filter (provinsi, mag_range, years, start_year, end_year) per skenario."""
+    full_mag = [snap.min_mag, snap.max_mag]
+    return {
+        "default": ([], full_mag, [], snap.default_start_year, snap.default_end_year),
+        "all_provinces_m5": (list(snap.valid_provinces), [5.0, snap.max_mag], [], snap.min_year, snap.max_year),
+        "top_province_2_years": ([snap.top_province], full_mag, list(snap.default_years[:2]), None, None),
+    }
+
+
+class _Ctx:
+    triggered = []      # sama seperti initial call
+
+
+def run_size(n, args, workdir):
+    import combine_data
+    import dashv2
+    import dataset_snapshot
+    import dataset_store
+    import event_table
+    import export_stream
+    import seismo_engine
+    import synthetic_catalog
+    from dash._utils import to_json
+
+    results = {}
+
+    def record(stage, stats, **extra):
+        stats.update(extra)
+        results[stage] = stats
+        print(f"  {stage:<45} p50 {stats['p50_ms']:>10.1f} ms  p99 {stats['p99_ms']:>10.1f} ms"
+              f"  peak {stats['peak_mb']:>8.1f} MB (rss +{stats['peak_rss_mb']:.1f})" + (f"  {extra}" if extra else ""))
+
+    catalog, stats = measure(lambda: synthetic_catalog.generate(n, seed=args.seed), 1)
+    record("generate", stats, rows=n)
+
+    if "load" in args.stages:
+        usgs_dir, emsc_dir = os.path.join(workdir, "usgs"), os.path.join(workdir, "emsc")
+        synthetic_catalog.write_source_csvs(catalog, usgs_dir, emsc_dir)
+        combined, stats = measure(lambda: combine_data.load_and_combine(
+            usgs_dir, emsc_dir, output_csv=os.path.join(workdir, "combined.csv")), 1)
+        # Semua event sintetis harus lolos; baris hilang = parser sumber rusak
+        record("load_and_combine", stats, rows=len(combined), lost_rows=n - len(combined))
+        if len(combined) < n:
+            print(f"  ⚠️ load_and_combine kehilangan {n - len(combined)} dari {n} baris")
+        del combined
+        shutil.rmtree(usgs_dir, ignore_errors=True)
+        shutil.rmtree(emsc_dir, ignore_errors=True)
+
+    # Pemanasan: import lazy (shapely, sklearn) & index polygon tidak ikut terukur
+    seismo_engine.assign_provinces(catalog.head(100))
+    df, stats = measure(lambda: event_table.compact(seismo_engine.assign_provinces(catalog)), 1)
+    record("assign_provinces", stats, provinces=int(df["province"].nunique()))
+    del catalog
+
+    # Jalur startup yang sama dengan produksi: materialize ke store lalu mmap
+    version = f"bench-{n}-{args.seed}"
+    store_dir = os.path.join(workdir, "store")
+
+    def build_store():
+        dataset_store.materialize(df, version, store_dir)
+        return dataset_store.load_mapped(version, store_dir)
+
+    (mapped, _, province_rows), stats = measure(build_store, 1)
+    record("store", stats)
+    del df
+
+    # Event sintetis bukan "event baru" untuk live push
+    dashv2._last_event_time = None
+    snap, stats = measure(lambda: dataset_snapshot.publish(
+        dataset_snapshot.build_snapshot(mapped, version, province_rows)), 1)
+    record("publish", stats)
+
+    for name, filters in scenarios(snap).items():
+        (dff, _), stats = measure(lambda: seismo_engine.filter_data(*filters, snap), args.repeat)
+        rows = len(dff)
+        record(f"filter_data/{name}", stats, rows=rows)
+        del dff
+
+        for layer in ("points", "count"):
+            stage = f"update_dashboard/{name}/{layer}"
+            if rows > args.dashboard_row_limit:
+                results[stage] = {"skipped": f"{rows} baris > --dashboard-row-limit {args.dashboard_row_limit}"}
+                print(f"  {stage:<45} dilewati ({rows} baris)")
+                continue
+            callback_args = (*filters, None, 0, layer, None)
+            with mock.patch("dash.callback_context", _Ctx()):
+                outputs, stats = measure(lambda: dashv2.update_dashboard(*callback_args), args.repeat)
+            payload, ser_stats = measure(lambda: to_json(list(outputs)), args.repeat)
+            record(stage, stats, rows=rows, payload_bytes=len(payload))
+            record(f"serialize/{name}/{layer}", ser_stats)
+            del outputs, payload
+
+    positions, _ = seismo_engine.filter_positions(*scenarios(snap)["default"], snap)
+    all_positions = np.arange(len(snap.df))
+    formats = ["csv"] + (["parquet"] if _has_pyarrow() else [])
+    for fmt in formats:
+        for label, pos in (("default", positions), ("all", all_positions)):
+            def export():
+                chunks = export_stream.iter_chunks(snap.df, pos, list(snap.df.columns))
+                body = {"csv": export_stream.iter_csv_gzip, "parquet": export_stream.iter_parquet}[fmt](chunks)
+                return sum(len(part) for part in body)
+            size, stats = measure(export, 1 if label == "all" else args.repeat)
+            record(f"export/{fmt}/{label}", stats, rows=len(pos), payload_bytes=size)
+    return results
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compare(current, baseline, threshold):
+    """Daftar regresi (ukuran, tahap, metrik, lama, baru) di atas threshold."""
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, stats in stages.items():
+            old = baseline.get("results", {}).get(size, {}).get(stage)
+            if not old or "skipped" in stats or "skipped" in old:
+                continue
+            for metric, floor in (("p50_ms", 1.0), ("peak_mb", 5.0)):
+                # Abaikan angka yang terlalu kecil untuk dibandingkan (noise)
+                if old[metric] >= floor and stats[metric] > old[metric] * (1 + threshold):
+                    regressions.append((size, stage, metric, old[metric], stats[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark callback dashboard dengan katalog sintetis")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="mis. 100k,1m,10m")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="ulangan per tahap ringan")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", default="load", help="tahap opsional: load (load_and_combine)")
+    parser.add_argument("--dashboard-row-limit", type=int, default=DASHBOARD_ROW_LIMIT)
+    parser.add_argument("--save", help="simpan hasil JSON (mis. sebagai baseline)")
+    parser.add_argument("--compare", help="baseline JSON untuk deteksi regresi")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    args.stages = {s.strip() for s in args.stages.split(",") if s.strip()}
+
+    # Import dashv2 me-load dataset asli sekali; benchmark mem-publish snapshot sendiri
+    os.environ.setdefault("DATASET_RELOAD_SECONDS", "1000000")
+    import dashv2  # noqa: F401
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="seismo-bench-") as workdir:
+        for label in args.sizes.split(","):
+            n = parse_size(label)
+            print(f"▶ {label.strip()} event")
+            report["results"][label.strip()] = run_size(n, args, workdir)
+    report["max_rss_mb"] = round(_rss_max_mb(), 1)
+
+    path = args.save or os.path.join(RESULTS_DIR, "latest.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Hasil disimpan di {path}")
+
+    lost = [(size, stage, stats["lost_rows"]) for size, stages in report["results"].items()
+            for stage, stats in stages.items() if stats.get("lost_rows")]
+    for size, stage, rows in lost:
+        print(f"⚠️ {size} {stage}: {rows} baris hilang")
+    if lost:
+        return 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for size, stage, metric, old, new in regressions:
+            print(f"⚠️ Regresi {size} {stage} {metric}: {old} -> {new}")
+        if regressions:
+            return 1
+        print(f"✅ Tidak ada regresi > {args.threshold:.0%} dibanding {args.compare}")
+    return 0
+
+
+def _rss_max_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 1024
+
+
+if __name__ == "__main__":
+    sys.exit(main())
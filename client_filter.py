@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import event_table
+import seismo_engine
+
+# ======================================================================
+#            CLIENT-SIDE FILTER (scope kecil difilter di browser)
+# ======================================================================
+# Kalau cakupan dasar (provinsi terpilih, semua tahun & magnitudo) cukup
+# kecil, update_dashboard mengirim kolom-kolomnya sekali ke dcc.Store
+# "client-scope". Geser slider magnitudo / ganti tahun lalu dihitung di
+# browser (route_filter di dashv2): statistik, peta titik dan tabel, tanpa
+# request ke server. Di atas batas baris (atau layer heatmap) perubahan
+# filter diteruskan ke server seperti biasa.
+#
+# Format store (kolom sejajar, urut waktu terbaru dulu):
+#   {"version", "key", "provinces", "min_year", "max_year", "rows",
+#    "columns": {time, year, latitude, longitude, depth, magnitude,
+#                place, province},          place/province = kode
+#    "categories": {"place": [...], "province": [...]}}
+
+CLIENT_FILTER_MAX_ROWS = int(os.environ.get("SEISMO_CLIENT_FILTER_ROWS", 5000))
+
+
+def scope_id(snap, provinces_input):
+    """Identitas cakupan: versi dataset + pilihan provinsi (sebelum default)."""
+    return {"version": snap.version, "key": sorted(provinces_input or [])}
+
+
+def _scope_rows(snap, provinces):
+    """Jumlah baris cakupan tanpa membangun posisi (index provinsi kalau ada)."""
+    if snap.province_rows is not None:
+        return sum(len(snap.province_rows.get(p, ())) for p in provinces)
+    return int(snap.df["province"].isin(provinces).sum())
+
+
+def _json_list(series):
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def scope_payload(snap, provinces, scope, max_rows=None):
+    """Kolom cakupan untuk browser, atau None kalau lebih dari max_rows baris."""
+    max_rows = CLIENT_FILTER_MAX_ROWS if max_rows is None else max_rows
+    if _scope_rows(snap, provinces) > max_rows:
+        return None
+    positions = seismo_engine.query_positions(seismo_engine.EventQuery(provinces=tuple(provinces)), snap)
+    df = event_table.display(snap.df.iloc[positions])
+    place_codes, places = pd.factorize(df["place"].astype(object))
+    province_codes, province_names = pd.factorize(df["province"].astype(object))
+    return {
+        **scope,
+        "provinces": [str(p) for p in provinces],
+        "min_year": snap.min_year,
+        "max_year": snap.max_year,
+        "rows": len(df),
+        "columns": {
+            "time": df["time"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+            "year": event_table.years(snap.df).to_numpy()[positions].astype(np.int64).tolist(),
+            "latitude": _json_list(df["latitude"]),
+            "longitude": _json_list(df["longitude"]),
+            "depth": _json_list(df["depth"]),
+            "magnitude": _json_list(df["magnitude"]),
+            "place": place_codes.tolist(),
+            "province": province_codes.tolist(),
+        },
+        "categories": {"place": [str(p) for p in places], "province": [str(p) for p in province_names]},
+    }
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+import event_table
+import region_tree
+
+# ======================================================================
+#            ANALISIS KLASTER (DBSCAN haversine, seluruh katalog)
+# ======================================================================
+# Mengelompokkan event yang berdekatan (< radius_km, minimal min_events)
+# menjadi klaster seismisitas. Dihitung per kelompok pulau supaya setiap
+# BallTree kecil dan progress bisa dilaporkan per langkah; untuk katalog
+# penuh ini butuh beberapa detik, jadi dipanggil dari background job
+# (background_jobs) di halaman regional, bukan di request thread.
+
+RADIUS_OPTIONS_KM = (10, 25, 50)
+DEFAULT_RADIUS_KM = 25
+DEFAULT_MIN_EVENTS = 10
+MAX_CLUSTERS = 20
+EARTH_RADIUS_KM = 6371.0
+
+COLUMNS = ["island", "province", "events", "latitude", "longitude", "max_magnitude", "first", "last"]
+
+
+def find_clusters(df, radius_km=DEFAULT_RADIUS_KM, min_events=DEFAULT_MIN_EVENTS, progress=None):
+    """Klaster per kelompok pulau, terbesar dulu.
+
+    progress(done, total, label) dipanggil setelah setiap kelompok pulau.
+    """
+    from sklearn.cluster import DBSCAN
+
+    province = df["province"].astype(str)
+    islands = province.map({p: region_tree.island_of(p) for p in province.unique()}).to_numpy(dtype=object)
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    groups = sorted(set(islands[valid]))
+
+    found = []
+    for i, island in enumerate(groups):
+        rows = np.flatnonzero(valid & (islands == island))
+        if len(rows) >= min_events:
+            labels = DBSCAN(eps=radius_km / EARTH_RADIUS_KM, min_samples=min_events, metric="haversine",
+                            algorithm="ball_tree").fit_predict(np.radians(np.column_stack([lat[rows], lon[rows]])))
+            for label in np.unique(labels[labels >= 0]):
+                found.append(_summary(df.iloc[rows[labels == label]], island))
+        if progress is not None:
+            progress(i + 1, len(groups), island)
+
+    if not found:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.DataFrame(found, columns=COLUMNS).sort_values("events", ascending=False, kind="stable") \
+        .head(MAX_CLUSTERS).reset_index(drop=True)
+
+
+def _summary(rows, island):
+    return {
+        "island": island,
+        "province": str(rows["province"].astype(str).mode().iloc[0]),
+        "events": len(rows),
+        "latitude": round(float(rows["latitude"].astype(np.float64).mean()), 3),
+        "longitude": round(float(rows["longitude"].astype(np.float64).mean()), 3),
+        "max_magnitude": event_table.display_value(rows["magnitude"].max(), "magnitude"),
+        "first": rows["time"].min(),
+        "last": rows["time"].max(),
+    }
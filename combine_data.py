@@ -46,6 +46,13 @@ def load_and_combine(usgs_folder, emsc_folder, output_csv="data/combined/combine
                 emsc['time'] = pd.to_datetime(emsc['date'] + ' ' + emsc['time'], errors='coerce')
             elif 'datetime' in emsc.columns:
                 emsc['time'] = pd.to_datetime(emsc['datetime'], errors='coerce')
+            elif 'date_time' in emsc.columns:
+                # ekspor situs EMSC: kolom "Date_Time" (UTC, tanpa zona)
+                emsc['time'] = pd.to_datetime(emsc['date_time'], errors='coerce')
+            if 'time' in emsc.columns:
+                # samakan dengan format USGS supaya kolom time tetap satu format
+                emsc['time'] = pd.to_datetime(emsc['time'], errors='coerce') \
+                    .dt.strftime('%Y-%m-%dT%H:%M:%S.%f').str[:-3] + 'Z'
 
             rename_map = {
                 'lat': 'latitude',
@@ -56,6 +63,7 @@ def load_and_combine(usgs_folder, emsc_folder, output_csv="data/combined/combine
                 'mag': 'magnitude',
                 'magnitude': 'magnitude',
                 'region': 'place',
+                'reg': 'place',
                 'location': 'place'
             }
             emsc = emsc.rename(columns=rename_map)
@@ -67,6 +75,8 @@ def load_and_combine(usgs_folder, emsc_folder, output_csv="data/combined/combine
                     emsc[col] = None
 
             emsc = emsc[expected_cols]
+            if emsc['time'].isna().all():
+                print(f"⚠️ {file}: kolom waktu tidak dikenali, semua {len(emsc)} baris akan terbuang")
             all_dfs.append(emsc)
         except Exception as e:
             print(f"⚠️ Gagal baca {file}: {e}")
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+import time
+
+# ======================================================================
+#            CONTENT STORE (posko & artikel, SQLite WAL)
+# ======================================================================
+# Posko pengungsian dan artikel referensi disimpan di SQLite (mode WAL)
+# supaya tidak hilang saat restart dan konsisten antar worker gunicorn.
+# Tulis selalu append (INSERT), baca dengan keyset pagination (id < cursor)
+# sehingga render ribuan baris tidak perlu memuat semuanya sekaligus.
+# Posko punya index bounding box R*Tree untuk query per viewport peta.
+
+DB_PATH = os.environ.get("SEISMO_DB_PATH", "data/app.db")
+
+_local = threading.local()
+
+SEED_POSTS = [
+    ('SDN Surabaya 1', -7.2575, 112.7521, 'Jl. Diponegoro No. 123'),
+    ('GOR Kertajaya', -7.2875, 112.7417, 'Jl. Kertajaya No. 45'),
+    ('Masjid Al-Akbar', -7.3305, 112.7277, 'Jl. Raya Masjid No. 1'),
+    ('Lapangan Manahan', -7.2658, 112.7378, 'Jl. Ahmad Yani No. 88'),
+    ('Balai Kota Surabaya', -7.2697, 112.7508, 'Jl. Taman Surya No. 1'),
+]
+
+SEED_ARTICLES = [
+    (
+        '10 Cara Menyelamatkan Diri dari Gempa Bumi yang Wajib Diketahui',
+        'https://www.kompas.com/skola/read/2025/08/21/143000269/10-cara-menyelamatkan-diri-dari-gempa-bumi-yang-wajib-diketahui',
+        'https://images.unsplash.com/photo-1590859808308-3d2d9c515b1a?w=600&h=400&fit=crop',
+        'Gempa bumi adalah bencana alam yang tidak dapat diprediksi. Kenali 10 langkah penting untuk menyelamatkan diri dan keluarga saat terjadi gempa bumi.'
+    ),
+    (
+        'Panduan Evakuasi Darurat untuk Keluarga',
+        'https://www.bnpb.go.id/artikel/evakuasi-gempa',
+        'https://images.unsplash.com/photo-1551836022-d5d88e9218df?w=600&h=400&fit=crop',
+        'Persiapkan rencana evakuasi keluarga Anda. Artikel ini membahas langkah-langkah praktis untuk menghadapi situasi darurat gempa bumi dengan aman.'
+    ),
+    (
+        'Pertolongan Pertama untuk Korban Gempa',
+        'https://www.pmi.or.id/p3k-gempa',
+        'https://images.unsplash.com/photo-1584820927498-cfe5211fd8bf?w=600&h=400&fit=crop',
+        'Pelajari teknik pertolongan pertama yang tepat untuk membantu korban gempa. Termasuk cara menangani luka, patah tulang, dan kondisi darurat lainnya.'
+    ),
+    (
+        'Membangun Rumah Tahan Gempa',
+        'https://www.pu.go.id/rumah-tahan-gempa',
+        'https://images.unsplash.com/photo-1503387762-592deb58ef4e?w=600&h=400&fit=crop',
+        'Konstruksi bangunan yang tepat dapat menyelamatkan nyawa. Simak panduan membangun dan merenovasi rumah agar lebih tahan terhadap guncangan gempa.'
+    ),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    address TEXT,
+    created_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_bbox USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    image TEXT,
+    description TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def connect():
+    """Koneksi per thread (dan per proses, aman setelah fork worker gunicorn --preload)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def init_db():
+    """Buat tabel kalau belum ada dan isi data contoh sekali saja."""
+    conn = connect()
+    conn.executescript(SCHEMA)
+    # BEGIN IMMEDIATE: kalau beberapa worker start bersamaan, seed hanya sekali
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 0:
+            for name, lat, lon, address in SEED_POSTS:
+                _insert_post(conn, name, lat, lon, address)
+        if conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 0:
+            for title, url, image, description in SEED_ARTICLES:
+                _insert_article(conn, title, url, image, description)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# ----------------------------------------------------------------------
+#                               POSKO
+# ----------------------------------------------------------------------
+def _insert_post(conn, name, lat, lon, address):
+    cur = conn.execute(
+        "INSERT INTO posts (name, lat, lon, address, created_at) VALUES (?, ?, ?, ?, ?)",
+        (name, lat, lon, address, time.time()))
+    conn.execute("INSERT INTO posts_bbox VALUES (?, ?, ?, ?, ?)", (cur.lastrowid, lat, lat, lon, lon))
+    return cur.lastrowid
+
+
+def add_post(name, lat, lon, address="Dari Google Maps"):
+    conn = connect()
+    with conn:
+        post_id = _insert_post(conn, name, lat, lon, address)
+    return get_post(post_id)
+
+
+def add_posts_bulk(rows):
+    """Simpan banyak posko (name, lat, lon, address) dalam SATU transaksi.
+
+    rows boleh berupa fungsi tanpa argumen; fungsi itu dipanggil setelah lock
+    tulis diambil, jadi cek duplikat terhadap isi DB tidak bisa balapan
+    dengan import lain.
+    """
+    if not callable(rows):
+        rows = list(rows)
+        if not rows:
+            return 0
+    conn = connect()
+    # BEGIN IMMEDIATE mengunci penulis lain, jadi blok id di bawah aman dipakai
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if callable(rows):
+            rows = list(rows())
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM posts").fetchone()[0]
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO posts (id, name, lat, lon, address, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(next_id + i, name, lat, lon, address, now) for i, (name, lat, lon, address) in enumerate(rows)])
+        conn.executemany(
+            "INSERT INTO posts_bbox VALUES (?, ?, ?, ?, ?)",
+            [(next_id + i, lat, lat, lon, lon) for i, (_, lat, lon, _) in enumerate(rows)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def get_post(post_id):
+    row = connect().execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def posts_page(limit=20, before_id=None):
+    """Posko terbaru dulu; before_id = id terkecil dari halaman sebelumnya."""
+    if before_id is None:
+        rows = connect().execute("SELECT * FROM posts ORDER BY id DESC LIMIT ?", (limit,))
+    else:
+        rows = connect().execute("SELECT * FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
+    return [dict(r) for r in rows]
+
+
+def posts_in_bbox(min_lat, max_lat, min_lon, max_lon, limit=2000):
+    """Posko di dalam viewport peta lewat index R*Tree (limit=-1: tanpa batas)."""
+    rows = connect().execute(
+        """SELECT p.* FROM posts_bbox b JOIN posts p ON p.id = b.id
+           WHERE b.max_lat >= ? AND b.min_lat <= ? AND b.max_lon >= ? AND b.min_lon <= ?
+           ORDER BY p.id DESC LIMIT ?""",
+        (min_lat, max_lat, min_lon, max_lon, limit))
+    return [dict(r) for r in rows]
+
+
+def posts_summary():
+    """Jumlah posko dan titik tengahnya (untuk posisi awal peta)."""
+    row = connect().execute("SELECT COUNT(*), AVG(lat), AVG(lon) FROM posts").fetchone()
+    return {"count": row[0], "lat": row[1], "lon": row[2]}
+
+
+# ----------------------------------------------------------------------
+#                               ARTIKEL
+# ----------------------------------------------------------------------
+def _insert_article(conn, title, url, image, description):
+    cur = conn.execute(
+        "INSERT INTO articles (title, url, image, description, created_at) VALUES (?, ?, ?, ?, ?)",
+        (title, url, image, description, time.time()))
+    return cur.lastrowid
+
+
+def add_article(title, url, image, description):
+    conn = connect()
+    with conn:
+        article_id = _insert_article(conn, title, url, image, description)
+    row = conn.execute("SELECT * FROM articles WHERE id = ?", (article_id,)).fetchone()
+    return dict(row)
+
+
+def articles_page(limit=12, before_id=None):
+    """Artikel terbaru dulu, keyset pagination seperti posts_page."""
+    if before_id is None:
+        rows = connect().execute("SELECT * FROM articles ORDER BY id DESC LIMIT ?", (limit,))
+    else:
+        rows = connect().execute("SELECT * FROM articles WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
+    return [dict(r) for r in rows]
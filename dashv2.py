@@ -5,68 +5,81 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+import dataclasses
 import re
-from sklearn.neighbors import BallTree
+import json
 import logging
+import os
+import base64
+import background_jobs
+from urllib.parse import urlencode
+from flask import Response, request
+import client_filter
+import cluster_analysis
+import content_store
+import cross_section
+import dataset_snapshot
+import event_table
+import export_stream
+import heatmap_tiles
+import live_feed
+import metrics
+import page_routes
+import posko_import
+import query_api
+import region_tree
+import seismo_engine
+import single_flight
+import startup_profile
+import swarm_detector
+import tile_cache
+import timelapse
 
 # Konfigurasi logging agar tidak terlalu verbose saat startup
 logging.basicConfig(level=logging.WARNING)
+startup_profile.mark("imports")
 
-# === Load data & Global Variables (Minimal) ===
-try:
-    df = pd.read_csv("data/combined/combined.csv", parse_dates=['time'])
-except FileNotFoundError:
-    print("Warning: 'data/combined/combined.csv' not found. Creating dummy data.")
-    # Dummy data for demonstration if file is missing
-    data = {
-        'time': pd.to_datetime(['2025-10-15T12:00:00Z', '2025-10-16T08:30:00Z', '2024-05-20T10:00:00Z', '2023-01-01T00:00:00Z', '2025-10-14T11:00:00Z']),
-        'latitude': [-6.2088, -7.7956, -8.4095, 0.7893, -6.9034],
-        'longitude': [106.8456, 110.3695, 115.1889, 113.9213, 107.6191],
-        'depth': [10.0, 50.5, 12.3, 150.0, 20.0],
-        'magnitude': [5.5, 4.2, 6.1, 7.0, 3.5],
-        'place': ['8km S of Jakarta', 'Yogyakarta Region', 'Bali', 'Kalimantan Tengah', 'Bandung'],
-    }
-    df = pd.DataFrame(data)
-
-# --- Deteksi provinsi Indonesia ---
-try:
-    worldcities = pd.read_csv("data/worldcities.csv")
-    indo = worldcities[worldcities["country"] == "Indonesia"].copy()
-    indo_coords = np.radians(indo[["lat", "lng"]].values)
-    tree = BallTree(indo_coords, metric="haversine")
-    
-    def detect_province_fast(lat, lon):
-        if pd.isna(lat) or pd.isna(lon): return "Lainnya"
-        dist, idx = tree.query(np.radians([[lat, lon]]), k=1)
-        nearest = indo.iloc[idx[0][0]]
-        if dist[0][0] * 6371 < 150: 
-            return str(nearest["admin_name"]).replace("Province", "").strip()
-        return "Lainnya"
-    
-    df["province"] = df.apply(lambda r: detect_province_fast(r["latitude"], r["longitude"]), axis=1)
-
-except FileNotFoundError:
-    print("Warning: 'data/worldcities.csv' not found. Using simple place matching.")
-    # Fallback province detection
-    def detect_province_fast_fallback(lat, lon):
-        if lat < -5 and lon < 110: return "Sumatera/Jawa Barat"
-        if lat > -1 and lon > 120: return "Sulawesi/Maluku"
-        return "Lainnya"
-    df["province"] = df.apply(lambda r: detect_province_fast_fallback(r["latitude"], r["longitude"]), axis=1)
-
-# === Pre-calculation and Constants ===
-valid_provinces = df[df["province"] != "Lainnya"]['province'].unique()
-top_province = (
-    df[df["province"] != "Lainnya"]["province"].value_counts().idxmax()
-    if len(valid_provinces) > 0 else 'Lainnya'
-)
-
-min_mag_data, max_mag_data = df['magnitude'].min(), df['magnitude'].max()
-min_year_data, max_year_data = df['time'].dt.year.min(), df['time'].dt.year.max()
-default_years_selection = sorted(df['time'].dt.year.unique(), reverse=True)[:5] # 5 tahun terakhir
-default_start_year = default_years_selection[-1] if default_years_selection else min_year_data
-default_end_year = default_years_selection[0] if default_years_selection else max_year_data
 center_lat, center_lon = -2.5489, 118.0149 # Pusat Indonesia
+TIMELAPSE_INTERVAL_MS = 250   # durasi satu frame playback
+
+# Detektor swarm: baseline dari katalog historis, warm-up dengan 7 hari terakhir.
+# Event baru dari ingestion cukup diteruskan ke swarm.consume(new_events).
+swarm = swarm_detector.SwarmDetector()
+
+
+@dataset_snapshot.on_prepare
+def warm_up_snapshot(snap):
+    """Precompute baseline swarm untuk versi baru sebelum swap."""
+    first_load = not swarm.baseline
+    # Versi upsert feed: baseline historis tidak berubah berarti, event barunya
+    # masuk ke counter lewat swarm.consume di push_new_events
+    if snap.parent_version is not None and not first_load:
+        return
+    with startup_profile.stage("swarm_baseline"):
+        swarm.fit_baseline(snap.df)
+    if first_load:
+        df = snap.df
+        swarm_detector.replay(df[df['time'] >= df['time'].max() - pd.Timedelta(days=7)], swarm)
+
+
+# Waktu event terbaru yang sudah dikirim; versi baru hanya mendorong selisihnya
+_last_event_time = None
+
+
+@dataset_snapshot.on_publish
+def push_new_events(snap):
+    """Kirim event yang baru masuk (dan delta agregatnya) ke dashboard yang terbuka."""
+    global _last_event_time
+    # Upsert feed: baris baru sudah diketahui; reload file: bandingkan waktu terbaru
+    if snap.appended is not None:
+        new_events = snap.appended
+    else:
+        new_events = live_feed.new_events_since(snap.df, _last_event_time)
+    _last_event_time = max(snap.df["time"].max(), _last_event_time or snap.df["time"].max())
+    if new_events.empty:
+        return
+    swarm.consume(new_events)
+    live_feed.feed.publish("events", live_feed.events_payload(new_events, snap.version))
 
 # === Setup aplikasi ===
 app = dash.Dash(
@@ -75,50 +88,138 @@ app = dash.Dash(
     suppress_callback_exceptions=True
 )
 app.title = "SeismoTrack - Earthquake Dashboard"
+server = app.server  # untuk gunicorn: gunicorn -w 4 dashv2:server
+metrics.install(app)  # /metrics (Prometheus), aktif dengan SEISMO_METRICS=1
+tile_cache.init_app(server)  # /tiles (proxy + cache tile peta), aktif dengan SEISMO_TILE_PROXY=1
+
+# Antrian job lokal (disk) untuk analitik berat; hasil di-cache per input + versi dataset
+job_manager = background_jobs.create_manager(cache_by=[lambda: dataset_snapshot.current().version])
+
+
+@metrics.register_collector
+def cache_metrics():
+    """Hit/miss cache tile heatmap, tile peta, cache versi dan single flight."""
+    tiles = heatmap_tiles.cache_info()
+    samples = [("seismo_cache_hits_total", "counter", {"cache": "heatmap_tiles"}, tiles["hits"]),
+               ("seismo_cache_misses_total", "counter", {"cache": "heatmap_tiles"}, tiles["misses"])]
+    if tile_cache.ENABLED:
+        map_tiles = tile_cache.cache_info()
+        samples += [("seismo_cache_hits_total", "counter", {"cache": "map_tiles"}, map_tiles["hits"]),
+                    ("seismo_cache_misses_total", "counter", {"cache": "map_tiles"}, map_tiles["misses"]),
+                    ("seismo_map_tile_upstream_errors_total", "counter", {}, map_tiles["upstream_errors"])]
+    for name, hits, misses, entries in dataset_snapshot.cache_stats():
+        samples += [("seismo_cache_hits_total", "counter", {"cache": name}, hits),
+                    ("seismo_cache_misses_total", "counter", {"cache": name}, misses),
+                    ("seismo_cache_entries", "gauge", {"cache": name}, entries)]
+    samples += [("seismo_single_flight_total", "counter", {"role": "leader"}, single_flight.flight.leaders),
+                ("seismo_single_flight_total", "counter", {"role": "follower"}, single_flight.flight.followers),
+                ("seismo_sse_subscribers", "gauge", {}, live_feed.feed.subscriber_count)]
+    return samples
 
 # ----------------------------------------------------------------------
-#                         HELPER FUNCTION: Data Filtering
+#                         HELPER FUNCTION: Map Figures
 # ----------------------------------------------------------------------
-def filter_data(provinces_input, mag_range, years, start_year, end_year):
-    """Fungsi pembantu untuk memfilter DataFrame berdasarkan semua input."""
-    
-    # 1. Handle Province Default
-    if not provinces_input:
-        provinces = [top_province] if top_province != 'Lainnya' else df['province'].unique().tolist()
-    else:
-        provinces = provinces_input
-        
-    # 2. Handle Year Filter dengan validasi yang lebih baik
-    all_years = df["time"].dt.year
-    year_filter = None
-    
-    # Cek apakah ada input year range yang valid
-    has_valid_range = (
-        start_year is not None and 
-        end_year is not None and 
-        start_year >= min_year_data and 
-        end_year <= max_year_data and 
-        start_year <= end_year
+def build_points_figure(dff, lat_center_view, lon_center_view, zoom_level):
+    """Peta titik event (layer default)."""
+    fig_map = px.scatter_mapbox(
+        event_table.display(dff),
+        lat="latitude",
+        lon="longitude",
+        color="magnitude",
+        size="magnitude",
+        hover_name="place",
+        hover_data={"depth": True, "time": True, "province": True, "latitude": ':.2f', "longitude": ':.2f', "magnitude": True},
+        color_continuous_scale="OrRd",
+        zoom=zoom_level,
+        center={"lat": lat_center_view, "lon": lon_center_view},
+        height=500,
     )
-    
-    if years and len(years) > 0:
-        # Prioritas 1: Multiple years selection (hanya jika ada isinya)
-        year_filter = all_years.isin(years)
-    elif has_valid_range:
-        # Prioritas 2: Year Range input (jika valid)
-        year_filter = all_years.between(start_year, end_year)
-    else:
-        # Default: 5 tahun terakhir
-        year_filter = all_years.between(max_year_data - 4, max_year_data)
-
-    # 3. Main Filter
-    dff = df[
-        (df["magnitude"].between(mag_range[0], mag_range[1])) &
-        (year_filter) &
-        (df["province"].isin(provinces))
-    ].sort_values("time", ascending=False)
-    
-    return dff, provinces
+
+    fig_map.update_layout(
+        mapbox=tile_cache.mapbox_layout(),
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        dragmode='pan'
+    )
+    return fig_map
+
+
+def build_heatmap_figure(snap, metric, mag_range, years, start_year, end_year, relayout_data, center, zoom):
+    """Layer heatmap dari tile pyramid yang sudah di-cache, hanya sel di viewport.
+
+    Heatmap memakai preset filter terdekat (magnitudo & jendela tahun) dan
+    mencakup semua provinsi sebagai konteks regional.
+    """
+    if isinstance(relayout_data, dict):
+        center = relayout_data.get("mapbox.center", center)
+        zoom = relayout_data.get("mapbox.zoom", zoom)
+    center = center or {"lat": center_lat, "lon": center_lon}
+    zoom = zoom if zoom is not None else 3.5
+
+    preset = heatmap_tiles.preset_for_filter(mag_range, years, start_year, end_year, snap.max_year)
+    view = heatmap_tiles.view_from_relayout(relayout_data, center, zoom)
+    cells, level = heatmap_tiles.get_cells(snap.version, preset, metric, zoom, view)
+
+    # Radius titik density ~1.5x ukuran sel dalam piksel
+    cell_px = heatmap_tiles.cell_deg(level) * 256 * 2 ** zoom / 360
+    fig = go.Figure(go.Densitymapbox(
+        lat=cells["latitude"], lon=cells["longitude"], z=cells["value"],
+        radius=max(int(cell_px * 1.5), 2),
+        colorscale="OrRd",
+        colorbar={"title": "Event" if metric == "count" else "log10 M0"},
+        hoverinfo="skip",
+    ))
+    fig.update_layout(
+        mapbox=tile_cache.mapbox_layout(center=center, zoom=zoom),
+        height=500,
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        dragmode='pan'
+    )
+    return fig
+
+
+# Garis profil contoh [[lat, lon], ...]: sepanjang busur Sunda (~1.500 km)
+# dan tegak lurus palung
+PROFILE_PRESETS = {
+    "Sumatera (sepanjang busur)": [[4.0, 95.0], [-6.0, 104.5]],
+    "Jawa Tengah (tegak lurus palung)": [[-11.5, 110.5], [-5.0, 110.5]],
+    "Laut Banda (utara-selatan)": [[-10.0, 127.0], [-5.0, 127.0]],
+}
+
+
+def build_cross_section_figure(snap, rows, along, offset):
+    """Jarak sepanjang garis vs kedalaman (sumbu kedalaman terbalik)."""
+    events = event_table.display(snap.df.iloc[rows][["time", "place", "magnitude", "depth"]])
+    fig = go.Figure(go.Scattergl(
+        x=along,
+        y=events["depth"],
+        mode="markers",
+        marker=dict(
+            color=events["magnitude"], colorscale="OrRd", showscale=True,
+            colorbar=dict(title="Mag"),
+            size=np.clip(events["magnitude"].to_numpy(dtype=np.float64) * 2, 3, 18),
+            line=dict(width=0.3, color="#475569"),
+        ),
+        customdata=np.column_stack([
+            events["place"].astype(str), events["time"].dt.strftime("%Y-%m-%d %H:%M"),
+            events["magnitude"], np.round(offset, 1),
+        ]),
+        hovertemplate=("<b>%{customdata[0]}</b><br>%{customdata[1]}<br>M %{customdata[2]}"
+                       "<br>Kedalaman %{y:.1f} km<br>Jarak %{x:.0f} km, offset %{customdata[3]} km"
+                       "<extra></extra>"),
+    ))
+    fig.update_layout(
+        xaxis_title="Jarak sepanjang garis (km)",
+        yaxis=dict(title="Kedalaman (km)", autorange="reversed"),
+        margin={"r": 10, "t": 10, "l": 10, "b": 10},
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        height=420,
+    )
+    return fig
 
 
 # ======================================================================
@@ -363,187 +464,365 @@ sidebar = dbc.Col([
 # ======================================================================
 #                            PAGE 1: Overview
 # ======================================================================
-overview_page = html.Div([
-    # Welcome Header
-    html.Div([
-        html.H2("Welcome Back, ! Seismie", className="mb-2"),
-        html.P("Explore today's earthquake updates and see what the Earth's been up to.", className="mb-0")
-    ], className="welcome-header"),
+def build_overview_page(snap):
+    """Layout overview; nilai default filter diambil dari snapshot dataset."""
+    top_province = snap.top_province
+    min_mag_data, max_mag_data = snap.min_mag, snap.max_mag
+    min_year_data, max_year_data = snap.min_year, snap.max_year
+    return html.Div([
+        # Welcome Header
+        html.Div([
+            html.H2("Welcome Back, ! Seismie", className="mb-2"),
+            html.P("Explore today's earthquake updates and see what the Earth's been up to.", className="mb-0"),
+            html.Span("● Live", id="live-status", className="small text-muted")
+        ], className="welcome-header"),
 
-    # --- Statistik Cards dengan Icon ---
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.Div("📊", className="stat-icon stat-icon-orange"),
-                html.Div(id="total-quakes", className="stat-value"),
-                html.Div("Total Earthquakes", className="stat-label")
-            ], className="stat-card-modern")
-        ], md=3, className="mb-3"),
+        # Event baru dari /stream/events & statistik filter aktif (diupdate di browser)
+        dcc.Store(id="live-events"),
+        dcc.Store(id="overview-stats"),
+        # Mode filter client-side: kolom cakupan kecil + pemicu filter ke server
+        dcc.Store(id="client-scope"),
+        dcc.Store(id="filter-request"),
 
-        dbc.Col([
-            html.Div([
-                html.Div("📈", className="stat-icon stat-icon-orange"),
-                html.Div(id="avg-mag", className="stat-value"),
-                html.Div("Avg. Magnitude", className="stat-label")
-            ], className="stat-card-modern")
-        ], md=3, className="mb-3"),
+        # --- Statistik Cards dengan Icon ---
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.Div("📊", className="stat-icon stat-icon-orange"),
+                    html.Div(id="total-quakes", className="stat-value"),
+                    html.Div("Total Earthquakes", className="stat-label")
+                ], className="stat-card-modern")
+            ], md=3, className="mb-3"),
 
-        dbc.Col([
-            html.Div([
-                html.Div("⬇️", className="stat-icon stat-icon-orange"),
-                html.Div(id="deepest", className="stat-value"),
-                html.Div("Deepest Earthquake", className="stat-label")
-            ], className="stat-card-modern")
-        ], md=3, className="mb-3"),
+            dbc.Col([
+                html.Div([
+                    html.Div("📈", className="stat-icon stat-icon-orange"),
+                    html.Div(id="avg-mag", className="stat-value"),
+                    html.Div("Avg. Magnitude", className="stat-label")
+                ], className="stat-card-modern")
+            ], md=3, className="mb-3"),
 
-        dbc.Col([
-            html.Div([
-                html.Div("⬆️", className="stat-icon stat-icon-orange"),
-                html.Div(id="shallowest", className="stat-value"),
-                html.Div("Shallowest Earthquake", className="stat-label")
-            ], className="stat-card-modern")
-        ], md=3, className="mb-3"),
-    ]),
-
-    # --- Filter Section ---
-    html.Div([
-        html.Div([
-            html.H5("🔍 Filter Options", className="mb-0"),
-            html.Button("🔄 Reset View", id="reset-view", n_clicks=0, className="btn-reset")
-        ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center", "marginBottom": "25px"}),
+            dbc.Col([
+                html.Div([
+                    html.Div("⬇️", className="stat-icon stat-icon-orange"),
+                    html.Div(id="deepest", className="stat-value"),
+                    html.Div("Deepest Earthquake", className="stat-label")
+                ], className="stat-card-modern")
+            ], md=3, className="mb-3"),
 
-        dbc.Row([
             dbc.Col([
-                html.Label("Regional (Province)", className="fw-semibold mb-2", style={"color": "#64748b"}),
+                html.Div([
+                    html.Div("⬆️", className="stat-icon stat-icon-orange"),
+                    html.Div(id="shallowest", className="stat-value"),
+                    html.Div("Shallowest Earthquake", className="stat-label")
+                ], className="stat-card-modern")
+            ], md=3, className="mb-3"),
+        ]),
+
+        # --- Swarm Alerts ---
+        html.Div([
+            html.H5("⚠️ Swarm & Anomaly Alerts"),
+            html.Div(id="swarm-alerts"),
+            dcc.Interval(id="swarm-interval", interval=30 * 1000, n_intervals=0)
+        ], className="chart-container"),
+
+        # --- Filter Section ---
+        html.Div([
+            html.Div([
+                html.H5("🔍 Filter Options", className="mb-0"),
+                html.Button("🔄 Reset View", id="reset-view", n_clicks=0, className="btn-reset")
+            ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center", "marginBottom": "25px"}),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Regional (Province)", className="fw-semibold mb-2", style={"color": "#64748b"}),
+                    dcc.Dropdown(
+                        id='province-filter',
+                        options=[{'label': p, 'value': p} for p in snap.province_options],
+                        value=[top_province] if top_province != 'Lainnya' else [], 
+                        multi=True,
+                        placeholder="Select provinces...",
+                        style={"borderRadius": "12px"}
+                    ),
+                ], md=6),
+
+                dbc.Col([
+                    html.Label("Magnitude Range", className="fw-semibold mb-2", style={"color": "#64748b"}),
+                    dcc.RangeSlider(
+                        id='mag-filter',
+                        min=min_mag_data, max=max_mag_data, step=0.1,
+                        marks={i: str(i) for i in range(int(min_mag_data), int(max_mag_data) + 1)},
+                        value=[min_mag_data, max_mag_data]
+                    ),
+                ], md=6),
+            ], className="mb-3"),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Select Years (Multi-select)", className="fw-semibold mb-2", style={"color": "#64748b"}),
+                    dcc.Dropdown(
+                        id='year-filter',
+                        options=[
+                            {'label': str(y), 'value': y}
+                            for y in snap.year_options
+                        ],
+                        value=[], 
+                        multi=True,
+                        placeholder="Select years (or use range below)...",
+                        style={"borderRadius": "12px"}
+                    ),
+                ], md=6),
+            
+                dbc.Col([
+                    html.Label("Or Year Range", className="fw-semibold mb-2", style={"color": "#64748b"}),
+                    html.Div([
+                        dcc.Input(
+                            id='start-year',
+                            type='number',
+                            placeholder=f'Start ({min_year_data})',
+                            min=min_year_data, max=max_year_data, step=1,
+                            value=snap.default_start_year,
+                            style={'width': '48%', 'marginRight': '4%', 'borderRadius': '12px', 'border': '1px solid #e2e8f0', 'padding': '8px'}
+                        ),
+                        dcc.Input(
+                            id='end-year',
+                            type='number',
+                            placeholder=f'End ({max_year_data})',
+                            min=min_year_data, max=max_year_data, step=1,
+                            value=snap.default_end_year,
+                            style={'width': '48%', 'borderRadius': '12px', 'border': '1px solid #e2e8f0', 'padding': '8px'}
+                        )
+                    ], style={'display': 'flex'})
+                ], md=6),
+            ]),
+        ], className="filter-section"),
+
+        # --- Map Section ---
+        html.Div([
+            html.Div([
+                html.H5("🗺️ Earthquake Distribution Map", className="mb-0"),
+                dcc.RadioItems(
+                    id="map-layer",
+                    options=[
+                        {"label": " Titik", "value": "points"},
+                        {"label": " Kepadatan", "value": "count"},
+                        {"label": " Momen Seismik", "value": "moment"},
+                    ],
+                    value="points",
+                    inline=True,
+                    inputStyle={"marginLeft": "12px"}
+                )
+            ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center", "marginBottom": "20px"}),
+            dcc.Graph(
+                id="map-graph", 
+                style={"height": "500px"},
+                config={
+                    'doubleClick': False,
+                    'scrollZoom': True,
+                    'displayModeBar': True,
+                    'modeBarButtonsToRemove': ['lasso2d', 'select2d']
+                }
+            ),
+            # Time-lapse: frame diambil bertahap dari /api/timelapse (clientside)
+            html.Div([
+                html.Button("▶️ Putar", id="timelapse-play", n_clicks=0, className="btn-reset"),
                 dcc.Dropdown(
-                    id='province-filter',
-                    options=[{'label': p, 'value': p} for p in sorted(df['province'].unique())],
-                    value=[top_province] if top_province != 'Lainnya' else [], 
-                    multi=True,
-                    placeholder="Select provinces...",
-                    style={"borderRadius": "12px"}
+                    id="timelapse-step",
+                    options=[{"label": timelapse.STEP_LABELS[step], "value": step} for step in timelapse.STEPS],
+                    value="month",
+                    clearable=False,
+                    style={"width": "140px"}
                 ),
-            ], md=6),
+                html.Div(dcc.Slider(id="timelapse-frame", min=0, max=1, step=1, value=0, marks=None,
+                                    updatemode="drag"), style={"flex": 1}),
+                html.Span(id="timelapse-label", className="small text-muted", style={"minWidth": "180px"}),
+                dcc.Interval(id="timelapse-interval", interval=TIMELAPSE_INTERVAL_MS, disabled=True),
+            ], style={"display": "flex", "gap": "12px", "alignItems": "center", "marginTop": "15px"}),
+        ], className="chart-container"),
 
-            dbc.Col([
-                html.Label("Magnitude Range", className="fw-semibold mb-2", style={"color": "#64748b"}),
-                dcc.RangeSlider(
-                    id='mag-filter',
-                    min=min_mag_data, max=max_mag_data, step=0.1,
-                    marks={i: str(i) for i in range(int(min_mag_data), int(max_mag_data) + 1)},
-                    value=[min_mag_data, max_mag_data]
+        # --- Depth Cross Section ---
+        html.Div([
+            html.H5("📐 Penampang Kedalaman", className="mb-3"),
+            dcc.Store(id="profile-line", data=[]),
+            dcc.Store(id="profile-presets", data=PROFILE_PRESETS),
+            html.Div([
+                dcc.Checklist(
+                    id="profile-draw",
+                    options=[{"label": " Gambar garis (klik peta)", "value": "on"}],
+                    value=[],
+                    inputStyle={"marginRight": "6px"}
                 ),
-            ], md=6),
-        ], className="mb-3"),
-
-        dbc.Row([
-            dbc.Col([
-                html.Label("Select Years (Multi-select)", className="fw-semibold mb-2", style={"color": "#64748b"}),
                 dcc.Dropdown(
-                    id='year-filter',
-                    options=[
-                        {'label': str(y), 'value': y}
-                        for y in sorted(df['time'].dt.year.unique(), reverse=True)
-                    ],
-                    value=[], 
-                    multi=True,
-                    placeholder="Select years (or use range below)...",
-                    style={"borderRadius": "12px"}
+                    id="profile-preset",
+                    options=[{"label": name, "value": name} for name in PROFILE_PRESETS],
+                    placeholder="Profil contoh...",
+                    style={"minWidth": "240px"}
                 ),
-            ], md=6),
-            
-            dbc.Col([
-                html.Label("Or Year Range", className="fw-semibold mb-2", style={"color": "#64748b"}),
                 html.Div([
+                    html.Label("Lebar koridor (km)", className="small mb-0 me-2", style={"color": "#64748b"}),
                     dcc.Input(
-                        id='start-year',
-                        type='number',
-                        placeholder=f'Start ({min_year_data})',
-                        min=min_year_data, max=max_year_data, step=1,
-                        value=default_start_year,
-                        style={'width': '48%', 'marginRight': '4%', 'borderRadius': '12px', 'border': '1px solid #e2e8f0', 'padding': '8px'}
+                        id="profile-width", type="number", value=50,
+                        min=5, max=cross_section.MAX_WIDTH_KM, step=5, debounce=True,
+                        style={'width': '90px', 'borderRadius': '12px', 'border': '1px solid #e2e8f0', 'padding': '6px'}
                     ),
-                    dcc.Input(
-                        id='end-year',
-                        type='number',
-                        placeholder=f'End ({max_year_data})',
-                        min=min_year_data, max=max_year_data, step=1,
-                        value=default_end_year,
-                        style={'width': '48%', 'borderRadius': '12px', 'border': '1px solid #e2e8f0', 'padding': '8px'}
-                    )
-                ], style={'display': 'flex'})
-            ], md=6),
-        ]),
-    ], className="filter-section"),
+                ], style={"display": "flex", "alignItems": "center"}),
+                html.Button("✖️ Hapus Garis", id="profile-clear", n_clicks=0, className="btn-reset"),
+            ], style={"display": "flex", "gap": "16px", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "15px"}),
+            html.Div(id="cross-section-summary", className="text-muted small mb-2"),
+            dcc.Graph(id="cross-section-graph", style={"height": "420px"}),
+        ], className="chart-container"),
 
-    # --- Map Section ---
-    html.Div([
-        html.H5("🗺️ Earthquake Distribution Map"),
-        dcc.Graph(
-            id="map-graph", 
-            style={"height": "500px"},
-            config={
-                'doubleClick': False,
-                'scrollZoom': True,
-                'displayModeBar': True,
-                'modeBarButtonsToRemove': ['lasso2d', 'select2d']
-            }
-        ),
-    ], className="chart-container"),
-
-    # --- Recent Earthquakes ---
-    html.Div([
+        # --- Recent Earthquakes ---
         html.Div([
-            html.H5("📋 Filtered Earthquake Data", className="mb-0"),
-            html.Button("⬇️ Download Data", id="download-btn", className="btn-reset")
-        ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center", "marginBottom": "20px"}),
-        html.Div(id="recent-table"),
-        dcc.Download(id="download-data")
-    ], className="chart-container")
-])
+            html.Div([
+                html.H5("📋 Filtered Earthquake Data", className="mb-0"),
+                html.Div([
+                    dcc.Dropdown(
+                        id="download-columns",
+                        options=[{"label": c, "value": c} for c in event_table.public_columns(snap.df)],
+                        multi=True,
+                        placeholder="Semua kolom",
+                        style={"minWidth": "220px"}
+                    ),
+                    dcc.Dropdown(
+                        id="download-format",
+                        options=[
+                            {"label": "CSV (gzip)", "value": "csv"},
+                            {"label": "Parquet", "value": "parquet"},
+                            {"label": "GeoJSON", "value": "geojson"},
+                        ],
+                        value="csv",
+                        clearable=False,
+                        style={"width": "140px"}
+                    ),
+                    html.A("⬇️ Download Data", id="download-btn", className="btn-reset", href=app.get_relative_path("/export/csv"))
+                ], style={"display": "flex", "gap": "10px", "alignItems": "center"})
+            ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center", "marginBottom": "20px"}),
+            html.Div(id="recent-table")
+        ], className="chart-container")
+    ])
 
 # ======================================================================
 #                            OTHER PAGES
 # ======================================================================
-analysis_page = html.Div([
-    html.Div([
-        html.H2("Frequency & Depth Analysis", className="mb-2"),
-        html.P("Analisis distribusi magnitudo dan kedalaman gempa di Indonesia.", className="mb-0")
-    ], className="welcome-header"),
+def build_analysis_page(snap):
+    df = event_table.display(snap.df)
+    return html.Div([
+        html.Div([
+            html.H2("Frequency & Depth Analysis", className="mb-2"),
+            html.P("Analisis distribusi magnitudo dan kedalaman gempa di Indonesia.", className="mb-0")
+        ], className="welcome-header"),
     
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H5("📊 Magnitude Distribution"),
-                dcc.Graph(figure=px.histogram(df, x="magnitude", nbins=20, color_discrete_sequence=["#ff6b35"], title=""))
-            ], className="chart-container")
-        ], md=6),
-        dbc.Col([
-            html.Div([
-                html.H5("📈 Magnitude vs Depth Correlation"),
-                dcc.Graph(figure=px.scatter(df, x="magnitude", y="depth", color="province", color_discrete_sequence=px.colors.qualitative.Set2, title=""))
-            ], className="chart-container")
-        ], md=6),
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H5("📊 Magnitude Distribution"),
+                    dcc.Graph(figure=px.histogram(df, x="magnitude", nbins=20, color_discrete_sequence=["#ff6b35"], title=""))
+                ], className="chart-container")
+            ], md=6),
+            dbc.Col([
+                html.Div([
+                    html.H5("📈 Magnitude vs Depth Correlation"),
+                    dcc.Graph(figure=px.scatter(df, x="magnitude", y="depth", color="province", color_discrete_sequence=px.colors.qualitative.Set2, title=""))
+                ], className="chart-container")
+            ], md=6),
+        ])
     ])
-])
 
-regional_page = html.Div([
-    html.Div([
-        html.H2("Regional Summary & Cluster", className="mb-2"),
-        html.P("Lihat ringkasan aktivitas gempa per provinsi dan pola klasternya.", className="mb-0")
-    ], className="welcome-header"),
-    
-    html.Div([
-        html.H5("📍 Average Magnitude by Province"),
-        dcc.Graph(
-            figure=px.bar(
-                df.groupby("province")["magnitude"].mean().reset_index().sort_values("magnitude", ascending=False),
-                x="province", y="magnitude", color="magnitude", color_continuous_scale="OrRd",
-                title=""
-            )
-        )
-    ], className="chart-container")
-])
+def _fmt(value, column, suffix=""):
+    return "-" if value is None or pd.isna(value) else f"{event_table.display_value(value, column):.2f}{suffix}"
+
+
+def build_region_view(tree, path):
+    """Breadcrumb, ringkasan node dan bar chart anak-anaknya (dari region_tree, tanpa groupby)."""
+    node = tree.node(path) or tree.node(())
+    path = node.path
+    children = tree.child_nodes(path)
+
+    crumbs = [region_tree.ROOT_NAME, *path]
+    breadcrumb = html.Div([
+        html.Span([
+            html.Span(" › ", className="text-muted") if i else None,
+            dbc.Button(name, id={"type": "region-crumb", "index": i}, color="link", size="sm",
+                       className="p-0 align-baseline", disabled=i == len(crumbs) - 1),
+        ]) for i, name in enumerate(crumbs)
+    ], className="mb-3")
+
+    latest = node.latest or {}
+    summary = dbc.Row([
+        dbc.Col(html.Div([html.Div(f"{node.count:,}", className="stat-value"),
+                          html.Div("Total Earthquakes", className="stat-label")], className="stat-card-modern"), md=3),
+        dbc.Col(html.Div([html.Div(f"{_fmt(node.mag_mean, 'magnitude')} / {_fmt(node.mag_max, 'magnitude')}",
+                                   className="stat-value"),
+                          html.Div("Avg. / Max Magnitude", className="stat-label")], className="stat-card-modern"), md=3),
+        dbc.Col(html.Div([html.Div(f"{_fmt(node.depth_mean, 'depth', ' km')}", className="stat-value"),
+                          html.Div(f"Avg. Depth ({_fmt(node.depth_min, 'depth')}–{_fmt(node.depth_max, 'depth', ' km')})",
+                                   className="stat-label")], className="stat-card-modern"), md=3),
+        dbc.Col(html.Div([html.Div(f"M {latest.get('magnitude', '-')}", className="stat-value"),
+                          html.Div(f"Terbaru: {latest.get('time', '-')} · {latest.get('place') or '-'}",
+                                   className="stat-label")], className="stat-card-modern"), md=3),
+    ], className="mb-3")
+
+    level = region_tree.LEVEL_LABELS.get(children[0].level, "") if children else ""
+    fig = go.Figure(go.Bar(
+        x=[c.name for c in children],
+        y=[c.count for c in children],
+        marker={"color": [None if pd.isna(c.mag_mean) else round(c.mag_mean, 2) for c in children],
+                "colorscale": "OrRd", "colorbar": {"title": "Avg. M"}},
+        customdata=[[_fmt(c.mag_mean, "magnitude"), _fmt(c.mag_max, "magnitude"), _fmt(c.depth_mean, "depth"),
+                     (c.latest or {}).get("time", "-"), "▶ klik untuk detail" if tree.has_children(c.path) else ""]
+                    for c in children],
+        hovertemplate=("<b>%{x}</b><br>%{y} event<br>M rata-rata %{customdata[0]}, maks %{customdata[1]}"
+                       "<br>Kedalaman rata-rata %{customdata[2]} km<br>Terbaru %{customdata[3]}"
+                       "<br>%{customdata[4]}<extra></extra>"),
+    ))
+    fig.update_layout(xaxis_title=level, yaxis_title="Jumlah event", height=450,
+                      margin={"r": 0, "t": 10, "l": 0, "b": 0},
+                      paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    return breadcrumb, summary, fig
+
+
+def build_regional_page(snap):
+    breadcrumb, summary, fig = build_region_view(region_tree.get(snap), ())
+    return html.Div([
+        html.Div([
+            html.H2("Regional Summary & Cluster", className="mb-2"),
+            html.P("Drill-down aktivitas gempa per pulau, provinsi, kabupaten/kota dan kecamatan.", className="mb-0")
+        ], className="welcome-header"),
+
+        dcc.Store(id="region-path", data=[]),
+        html.Div([
+            html.H5("📍 Regional Drill-down"),
+            html.Div(breadcrumb, id="region-breadcrumb"),
+            html.Div(summary, id="region-summary"),
+            dcc.Graph(id="region-graph", figure=fig),
+        ], className="chart-container"),
+
+        html.Div([
+            html.H5("🧩 Analisis Klaster Seismisitas", className="mb-1"),
+            html.P("Kelompok event yang berdekatan di seluruh katalog (DBSCAN), dihitung sebagai background job.",
+                   className="text-muted small"),
+            html.Div([
+                html.Div([
+                    html.Label("Radius", className="small text-muted"),
+                    dcc.Dropdown(id="cluster-radius", clearable=False, value=cluster_analysis.DEFAULT_RADIUS_KM,
+                                 options=[{"label": f"{r} km", "value": r} for r in cluster_analysis.RADIUS_OPTIONS_KM],
+                                 style={"width": "120px"}),
+                ]),
+                html.Div([
+                    html.Label("Min. event", className="small text-muted"),
+                    dcc.Dropdown(id="cluster-min-events", clearable=False, value=cluster_analysis.DEFAULT_MIN_EVENTS,
+                                 options=[{"label": str(n), "value": n} for n in (5, 10, 25, 50)],
+                                 style={"width": "120px"}),
+                ]),
+                html.Button("▶ Jalankan Analisis", id="cluster-run-btn", className="btn-reset"),
+                html.Button("✖ Batal", id="cluster-cancel-btn", className="btn-reset", style={"display": "none"}),
+            ], style={"display": "flex", "gap": "16px", "alignItems": "flex-end", "flexWrap": "wrap", "marginBottom": "15px"}),
+            dbc.Progress(id="cluster-progress", value=0, striped=True, animated=True,
+                         className="mb-3", style={"display": "none"}),
+            html.Div(id="cluster-result"),
+        ], className="chart-container")
+    ])
 
 settings_page = html.Div([
     html.Div([
@@ -602,7 +881,10 @@ settings_page = html.Div([
                 # Daftar artikel yang tersimpan
                 html.Div([
                     html.H6("📚 Artikel Referensi:", className="fw-bold mb-3"),
-                    html.Div(id="articles-list")
+                    html.Div(id="articles-list"),
+                    html.Button("Muat lebih banyak", id="articles-more-btn", n_clicks=0,
+                                className="btn btn-link p-0 small"),
+                    dcc.Store(id="articles-cursor")
                 ], className="mb-4"),
                 
                 html.Hr(),
@@ -669,7 +951,15 @@ settings_page = html.Div([
                             html.Button("➕ Tambah", id="add-posko-btn", className="btn-reset", style={'width': '100%'}),
                         ], md=3),
                     ]),
-                    html.Div(id="posko-feedback", className="small mt-2")
+                    html.Div(id="posko-feedback", className="small mt-2"),
+                    dcc.Upload(
+                        id="posko-upload",
+                        children=html.Button("📤 Import Posko (CSV/GeoJSON/KML)", className="btn btn-link p-0 small"),
+                        accept=".csv,.geojson,.json,.kml",
+                        className="mt-2"
+                    ),
+                    dcc.Loading(html.Div(id="posko-import-feedback", className="small mt-2"), type="dot"),
+                    dcc.Store(id="posko-import-result")
                 ], className="mb-3 p-3", style={'background': '#f8f9fa', 'borderRadius': '12px'}),
                 
                 # Peta
@@ -682,7 +972,10 @@ settings_page = html.Div([
                 # Daftar posko
                 html.Div([
                     html.H6("📍 Daftar Posko:", className="fw-bold mt-3 mb-2"),
-                    html.Div(id="posko-list")
+                    html.Div(id="posko-list"),
+                    html.Button("Muat lebih banyak", id="posko-more-btn", n_clicks=0,
+                                className="btn btn-link p-0 small"),
+                    dcc.Store(id="posko-cursor")
                 ])
             ], className="chart-container")
         ], md=6),
@@ -708,29 +1001,47 @@ app.layout = dbc.Container([
 ], fluid=True, style={"padding": "20px"})
 
 
-@app.callback(Output('page-content', 'children'), Input('url', 'pathname'))
-def display_page(pathname):
-    if pathname in ['/', '/overview']: 
-        return overview_page
-    elif pathname == '/analysis': 
-        return analysis_page
-    elif pathname == '/regional': 
-        return regional_page
-    elif pathname == '/settings': 
-        return settings_page
-    elif pathname == '/help': 
-        return help_page
-    else: 
-        return html.Div([
-            html.Div([
-                html.H2("404 - Page Not Found", className="text-danger mb-2"),
-                html.P("Halaman yang Anda cari tidak ditemukan.", className="mb-0")
-            ], className="welcome-header")
-        ])
+# Layout halaman diserialisasi ke JSON sekali per versi dataset dan diambil
+# browser dari /_pages/<route> dengan ETag (lihat page_routes)
+DATA_PAGES = {
+    '/overview': build_overview_page,
+    '/analysis': build_analysis_page,
+    '/regional': build_regional_page,
+}
+not_found_page = html.Div([
+    html.Div([
+        html.H2("404 - Page Not Found", className="text-danger mb-2"),
+        html.P("Halaman yang Anda cari tidak ditemukan.", className="mb-0")
+    ], className="welcome-header")
+])
+pages = page_routes.PageRoutes("page", DATA_PAGES, {'/settings': settings_page, '/help': help_page}, not_found_page)
+pages.install(app)
+
+
+@dataset_snapshot.on_prepare
+def warm_up_pages(snap):
+    # Figure statis (histogram, scatter, bar) dihitung dan diserialisasi sebelum swap, bukan saat request.
+    # Versi upsert feed (tiap poll) tidak di-warm: halaman dibangun saat pertama diminta.
+    if snap.parent_version is not None:
+        return
+    for path in DATA_PAGES:
+        with startup_profile.stage(path.strip("/")):
+            pages.get(snap, path)
+
+
+# display_page: fetch layout ter-serialisasi (navigasi ulang = 304 dari cache browser)
+app.clientside_callback(pages.router_js(app), Output('page-content', 'children'), Input('url', 'pathname'))
 
 # ======================================================================
 #                            CALLBACK UTAMA
 # ======================================================================
+def callback_key(*args):
+    """Key single flight: versi dataset + input yang memicu + semua argumen callback."""
+    ctx = dash.callback_context
+    triggered = [t["prop_id"] for t in ctx.triggered] if ctx.triggered else []
+    return repr((dataset_snapshot.current().version, triggered, args))
+
+
 @app.callback(
     Output("total-quakes", "children"),
     Output("avg-mag", "children"),
@@ -738,28 +1049,58 @@ def display_page(pathname):
     Output("shallowest", "children"),
     Output("map-graph", "figure"),
     Output("recent-table", "children"),
+    Output("overview-stats", "data"),
+    Output("client-scope", "data"),
 
     Input("province-filter", "value"),
-    Input("mag-filter", "value"),
-    Input("year-filter", "value"),
-    Input("start-year", "value"),
-    Input("end-year", "value"),
+    # Magnitudo & tahun masuk lewat route_filter (clientside) -> filter-request;
+    # di mode client-side perubahannya tidak sampai ke server
+    State("mag-filter", "value"),
+    State("year-filter", "value"),
+    State("start-year", "value"),
+    State("end-year", "value"),
     Input("map-graph", "clickData"),
     Input("reset-view", "n_clicks"),
+    Input("map-layer", "value"),
+    Input("map-graph", "relayoutData"),
+    Input("filter-request", "data"),
+    State("overview-stats", "data"),
+    State("profile-draw", "value"),
 )
-def update_dashboard(provinces_input, mag_range, years, start_year, end_year, clickData, n_clicks):
+@single_flight.coalesce(callback_key)
+def update_dashboard(provinces_input, mag_range, years, start_year, end_year, clickData, n_clicks,
+                     map_layer, relayout_data, filter_request=None, previous_stats=None, profile_draw=None):
     
+    snap = dataset_snapshot.current()
     ctx = dash.callback_context
-    triggered_id = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else None
+    triggered_prop = ctx.triggered[0]["prop_id"] if ctx.triggered else ""
+    triggered_id = triggered_prop.split(".")[0] if ctx.triggered else None
+
+    # Mode gambar garis profil: klik peta = titik garis, bukan zoom
+    if triggered_prop == "map-graph.clickData" and profile_draw:
+        raise dash.exceptions.PreventUpdate
+
+    # Pan/zoom hanya relevan untuk layer heatmap (ambil tile viewport baru)
+    if triggered_prop == "map-graph.relayoutData":
+        if map_layer == "points" or not isinstance(relayout_data, dict) or not any(
+                k.startswith("mapbox.") for k in relayout_data):
+            raise dash.exceptions.PreventUpdate
+        return (dash.no_update,) * 4 + (
+            build_heatmap_figure(snap, map_layer, mag_range, years, start_year, end_year,
+                                 relayout_data, None, None),
+            dash.no_update, dash.no_update, dash.no_update)
     
     # 1. FILTER DATA
-    dff, current_provinces = filter_data(provinces_input, mag_range, years, start_year, end_year)
+    with metrics.stage("update_dashboard", "filter"):
+        dff, current_provinces = seismo_engine.filter_data(provinces_input, mag_range, years, start_year, end_year, snap)
 
     # 2. CALCULATE STATISTICS
     total_quakes = len(dff)
-    avg_mag = f"{dff['magnitude'].mean():.2f}" if total_quakes else "0.00"
-    deepest = f"{dff['depth'].max():.1f} km" if total_quakes else "0.0 km"
-    shallowest = f"{dff['depth'].min():.1f} km" if total_quakes else "0.0 km"
+    metrics.observe_rows("update_dashboard", total_quakes)
+    with metrics.stage("update_dashboard", "stats"):
+        avg_mag = f"{dff['magnitude'].mean():.2f}" if total_quakes else "0.00"
+        deepest = f"{dff['depth'].max():.1f} km" if total_quakes else "0.0 km"
+        shallowest = f"{dff['depth'].min():.1f} km" if total_quakes else "0.0 km"
 
     # 3. MAP VIEW LOGIC
     lat_center_view, lon_center_view, zoom_level = center_lat, center_lon, 3.5 
@@ -780,168 +1121,748 @@ def update_dashboard(provinces_input, mag_range, years, start_year, end_year, cl
         elif triggered_id == "reset-view":
             lat_center_view, lon_center_view = data_lat_center, data_lon_center
             zoom_level = zoom_level_data
-        elif triggered_id in ["province-filter", "mag-filter", "year-filter", "start-year", "end-year"] or triggered_id is None:
+        elif triggered_id in ["province-filter", "filter-request"] or triggered_id is None:
             lat_center_view, lon_center_view = data_lat_center, data_lon_center
             zoom_level = zoom_level_data
             
     # Create Map
-    fig_map = px.scatter_mapbox(
-        dff,
-        lat="latitude",
-        lon="longitude",
-        color="magnitude",
-        size="magnitude",
-        hover_name="place",
-        hover_data={"depth": True, "time": True, "province": True, "latitude": ':.2f', "longitude": ':.2f', "magnitude": True},
-        color_continuous_scale="OrRd",
-        zoom=zoom_level,
-        center={"lat": lat_center_view, "lon": lon_center_view},
-        height=500,
-    )
-
-    fig_map.update_layout(
-        mapbox_style="open-street-map",
-        margin={"r": 0, "t": 0, "l": 0, "b": 0},
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        dragmode='pan'
-    )
+    with metrics.stage("update_dashboard", "figure"):
+        if map_layer in heatmap_tiles.METRICS:
+            fig_map = build_heatmap_figure(
+                snap, map_layer, mag_range, years, start_year, end_year,
+                None, {"lat": lat_center_view, "lon": lon_center_view}, zoom_level)
+        else:
+            fig_map = build_points_figure(dff, lat_center_view, lon_center_view, zoom_level)
 
     # 4. CREATE TABLE - Show ALL filtered data
-    if dff.empty:
-        table = html.P("No earthquake data available for the selected filters.", 
-                      className="text-muted text-center p-4")
-    else:
-        display_df = dff[["time", "place", "magnitude", "depth", "province"]].copy()
-        display_df['time'] = display_df['time'].dt.strftime('%Y-%m-%d %H:%M') 
-        display_df['depth'] = display_df['depth'].apply(lambda x: f"{x:.1f} km")
-        display_df.columns = ["Time", "Location", "Magnitude", "Depth", "Province"]
+    with metrics.stage("update_dashboard", "table"):
+        if dff.empty:
+            table = html.P("No earthquake data available for the selected filters.", 
+                          className="text-muted text-center p-4")
+        else:
+            display_df = event_table.display(dff[["time", "place", "magnitude", "depth", "province"]])
+            display_df['time'] = display_df['time'].dt.strftime('%Y-%m-%d %H:%M') 
+            display_df['depth'] = display_df['depth'].apply(lambda x: f"{x:.1f} km")
+            display_df.columns = ["Time", "Location", "Magnitude", "Depth", "Province"]
         
-        table = html.Div([
-            html.P(f"Showing all {len(dff)} filtered earthquakes", 
-                   className="text-muted small mb-2"),
-            dbc.Table.from_dataframe(
-                display_df,
-                striped=True,
-                bordered=False,
-                hover=True,
-                className="table-modern mb-0"
-            )
-        ])
+            table = html.Div([
+                html.P(f"Showing all {len(dff)} filtered earthquakes", 
+                       className="text-muted small mb-2"),
+                dbc.Table.from_dataframe(
+                    display_df,
+                    striped=True,
+                    bordered=False,
+                    hover=True,
+                    className="table-modern mb-0"
+                )
+            ])
 
-    return total_quakes, avg_mag, deepest, shallowest, fig_map, table
+    # Statistik mentah + filter efektif, supaya event live bisa ditambahkan di browser
+    stats = {
+        "count": total_quakes,
+        # float32 dijumlah dalam float64 supaya rata-rata tidak drift di jutaan baris
+        "magnitude_sum": float(dff["magnitude"].to_numpy(dtype=np.float64).sum()),
+        "max_depth": event_table.display_value(dff["depth"].max(), "depth") if total_quakes else None,
+        "min_depth": event_table.display_value(dff["depth"].min(), "depth") if total_quakes else None,
+        "provinces": [str(p) for p in current_provinces],
+        "mag_range": mag_range,
+        "years": seismo_engine.year_window(years, start_year, end_year, snap),
+        "map_layer": map_layer,
+    }
 
+    # Cakupan kecil dikirim sekali per (versi, provinsi); filter berikutnya di browser
+    scope = client_filter.scope_id(snap, provinces_input)
+    client_scope = (previous_stats or {}).get("client_scope")
+    scope_data = dash.no_update
+    if client_scope != scope:
+        with metrics.stage("update_dashboard", "client_scope"):
+            scope_data = client_filter.scope_payload(snap, current_provinces, scope)
+        client_scope = scope if scope_data is not None else None
+    stats["client_scope"] = client_scope
+    return total_quakes, avg_mag, deepest, shallowest, fig_map, table, stats, scope_data
 
-# Download Callback
-@app.callback(
-    Output("download-data", "data"),
-    Input("download-btn", "n_clicks"),
+
+# Live push: satu EventSource per tab; event baru ditambahkan ke peta (extendData)
+# dan kartu statistik tanpa menjalankan ulang update_dashboard di server.
+app.clientside_callback(
+    """
+    function(_) {
+        if (!window.seismoLive) {
+            window.seismoLive = new EventSource(%s);
+            window.seismoLive.addEventListener('events', function(e) {
+                if (document.getElementById('live-status')) {
+                    dash_clientside.set_props('live-events', {data: JSON.parse(e.data)});
+                }
+            });
+        }
+        return 'small text-success';
+    }
+    """ % json.dumps(app.get_relative_path("/stream/events")),
+    Output("live-status", "className"),
+    Input("live-status", "id"),
+)
+
+app.clientside_callback(
+    """
+    function(payload, stats) {
+        const nu = window.dash_clientside.no_update;
+        if (!payload || !stats) { return [nu, nu, nu, nu, nu, nu, nu]; }
+        const ev = payload.events;
+        const w = stats.years;
+        const lat = [], lon = [], mag = [], text = [], custom = [];
+        let inScope = false;
+        stats = Object.assign({}, stats);
+        for (let i = 0; i < ev.time.length; i++) {
+            if (!stats.provinces.includes(ev.province[i])) { continue; }
+            inScope = true;
+            const year = parseInt(ev.time[i].slice(0, 4));
+            const inYears = w.years ? w.years.includes(year) : (year >= w.start && year <= w.end);
+            if (!inYears || ev.magnitude[i] < stats.mag_range[0] || ev.magnitude[i] > stats.mag_range[1]) { continue; }
+            lat.push(ev.latitude[i]); lon.push(ev.longitude[i]); mag.push(ev.magnitude[i]);
+            text.push(ev.place[i]); custom.push([ev.depth[i], ev.time[i], ev.province[i], ev.latitude[i], ev.longitude[i], ev.magnitude[i]]);
+            stats.count += 1;
+            stats.magnitude_sum += ev.magnitude[i];
+            if (ev.depth[i] !== null) {
+                stats.max_depth = stats.max_depth === null ? ev.depth[i] : Math.max(stats.max_depth, ev.depth[i]);
+                stats.min_depth = stats.min_depth === null ? ev.depth[i] : Math.min(stats.min_depth, ev.depth[i]);
+            }
+        }
+        if (!inScope) { return [nu, nu, nu, nu, nu, nu, nu]; }
+        // Store client-side tidak berisi event baru ini: filter berikutnya lewat server lagi
+        const scope = stats.client_scope ? null : nu;
+        stats.client_scope = null;
+        if (!lat.length) { return [nu, nu, nu, nu, nu, stats, scope]; }
+        const extend = stats.map_layer === 'points'
+            ? [{lat: [lat], lon: [lon], 'marker.color': [mag], 'marker.size': [mag],
+                hovertext: [text], customdata: [custom]}, [0]]
+            : nu;
+        return [
+            stats.count,
+            (stats.magnitude_sum / stats.count).toFixed(2),
+            (stats.max_depth === null ? 0 : stats.max_depth).toFixed(1) + ' km',
+            (stats.min_depth === null ? 0 : stats.min_depth).toFixed(1) + ' km',
+            extend,
+            stats,
+            scope
+        ];
+    }
+    """,
+    Output("total-quakes", "children", allow_duplicate=True),
+    Output("avg-mag", "children", allow_duplicate=True),
+    Output("deepest", "children", allow_duplicate=True),
+    Output("shallowest", "children", allow_duplicate=True),
+    Output("map-graph", "extendData"),
+    Output("overview-stats", "data", allow_duplicate=True),
+    Output("client-scope", "data", allow_duplicate=True),
+    Input("live-events", "data"),
+    State("overview-stats", "data"),
+    prevent_initial_call=True
+)
+
+# Filter magnitudo/tahun: kalau cakupan ada di client-scope (layer titik),
+# statistik, peta dan tabel dihitung di browser; selain itu diteruskan ke
+# update_dashboard lewat filter-request. Logika sama dengan year_window,
+# build_points_figure dan tabel di update_dashboard.
+app.clientside_callback(
+    """
+    function(magRange, years, startYear, endYear, scope, stats, provinces, layer, figure) {
+        const nu = window.dash_clientside.no_update;
+        const key = JSON.stringify((provinces || []).slice().sort());
+        const current = stats && stats.client_scope;
+        if (!scope || !current || layer !== 'points' || !magRange ||
+                scope.version !== current.version || JSON.stringify(scope.key) !== key) {
+            return [nu, nu, nu, nu, nu, nu, nu,
+                    {mag_range: magRange, years: years, start_year: startYear, end_year: endYear}];
+        }
+
+        let w;
+        if (years && years.length) { w = {years: years}; }
+        else if (startYear !== null && startYear !== undefined && endYear !== null && endYear !== undefined &&
+                 startYear >= scope.min_year && endYear <= scope.max_year && startYear <= endYear) {
+            w = {start: startYear, end: endYear};
+        } else { w = {start: scope.max_year - 4, end: scope.max_year}; }
+
+        const c = scope.columns, places = scope.categories.place, provs = scope.categories.province;
+        const lat = [], lon = [], mag = [], text = [], custom = [], rows = [];
+        let sum = 0, maxDepth = null, minDepth = null, latSum = 0, lonSum = 0;
+        for (let i = 0; i < scope.rows; i++) {
+            const y = c.year[i], m = c.magnitude[i];
+            const inYears = w.years ? w.years.includes(y) : (y >= w.start && y <= w.end);
+            if (!inYears || m === null || m < magRange[0] || m > magRange[1]) { continue; }
+            const d = c.depth[i], place = places[c.place[i]] || '', prov = provs[c.province[i]];
+            lat.push(c.latitude[i]); lon.push(c.longitude[i]); mag.push(m); text.push(place);
+            custom.push([d, c.time[i], prov, c.latitude[i], c.longitude[i], m]);
+            sum += m; latSum += c.latitude[i]; lonSum += c.longitude[i];
+            if (d !== null) {
+                maxDepth = maxDepth === null ? d : Math.max(maxDepth, d);
+                minDepth = minDepth === null ? d : Math.min(minDepth, d);
+            }
+            rows.push({namespace: 'dash_html_components', type: 'Tr', props: {children: [
+                c.time[i].slice(0, 16), place, Number.isInteger(m) ? m.toFixed(1) : m,
+                d === null ? 'nan km' : d.toFixed(1) + ' km', prov
+            ].map(v => ({namespace: 'dash_html_components', type: 'Td', props: {children: v}}))}});
+        }
+        const n = lat.length;
+
+        const fig = Object.assign({}, figure);
+        const trace = Object.assign({}, fig.data[0], {lat: lat, lon: lon, hovertext: text, customdata: custom});
+        trace.marker = Object.assign({}, trace.marker, {color: mag, size: mag,
+            sizeref: n ? mag.reduce((a, b) => Math.max(a, b), 0) / (20 * 20) : 1});   // sama dengan px (max_size 20)
+        fig.data = [trace].concat(fig.data.slice(1));
+        let center = {lat: -2.5489, lon: 118.0149}, zoom = 3.5;
+        if (n) {
+            center = {lat: latSum / n, lon: lonSum / n};
+            zoom = n > 500 ? 4.0 : n > 100 ? 5.0 : n > 20 ? 6.0 : 7.0;
+        }
+        fig.layout = Object.assign({}, fig.layout, {mapbox: Object.assign({}, fig.layout.mapbox, {center: center, zoom: zoom})});
+
+        const table = !n
+            ? {namespace: 'dash_html_components', type: 'P', props: {
+                children: 'No earthquake data available for the selected filters.',
+                className: 'text-muted text-center p-4'}}
+            : {namespace: 'dash_html_components', type: 'Div', props: {children: [
+                {namespace: 'dash_html_components', type: 'P', props: {
+                    children: 'Showing all ' + n + ' filtered earthquakes', className: 'text-muted small mb-2'}},
+                {namespace: 'dash_bootstrap_components', type: 'Table', props: {
+                    striped: true, bordered: false, hover: true, className: 'table-modern mb-0', children: [
+                    {namespace: 'dash_html_components', type: 'Thead', props: {children: [
+                        {namespace: 'dash_html_components', type: 'Tr', props: {children:
+                            ['Time', 'Location', 'Magnitude', 'Depth', 'Province'].map(h => (
+                                {namespace: 'dash_html_components', type: 'Th', props: {children: h, colSpan: 1}}))}}]}},
+                    {namespace: 'dash_html_components', type: 'Tbody', props: {children: rows}}]}}]}};
+
+        const newStats = Object.assign({}, stats, {
+            count: n, magnitude_sum: sum, max_depth: maxDepth, min_depth: minDepth,
+            provinces: scope.provinces, mag_range: magRange, years: w, map_layer: layer});
+        return [
+            n,
+            n ? (sum / n).toFixed(2) : '0.00',
+            (n ? maxDepth : 0).toFixed(1) + ' km',
+            (n ? minDepth : 0).toFixed(1) + ' km',
+            fig,
+            table,
+            newStats,
+            nu
+        ];
+    }
+    """,
+    Output("total-quakes", "children", allow_duplicate=True),
+    Output("avg-mag", "children", allow_duplicate=True),
+    Output("deepest", "children", allow_duplicate=True),
+    Output("shallowest", "children", allow_duplicate=True),
+    Output("map-graph", "figure", allow_duplicate=True),
+    Output("recent-table", "children", allow_duplicate=True),
+    Output("overview-stats", "data", allow_duplicate=True),
+    Output("filter-request", "data"),
+    Input("mag-filter", "value"),
+    Input("year-filter", "value"),
+    Input("start-year", "value"),
+    Input("end-year", "value"),
+    State("client-scope", "data"),
+    State("overview-stats", "data"),
     State("province-filter", "value"),
-    State("mag-filter", "value"),
-    State("year-filter", "value"),
-    State("start-year", "value"),
-    State("end-year", "value"),
+    State("map-layer", "value"),
+    State("map-graph", "figure"),
     prevent_initial_call=True
 )
-def download_filtered_data(n_clicks, provinces_input, mag_range, years, start_year, end_year):
-    if n_clicks:
-        dff, _ = filter_data(provinces_input, mag_range, years, start_year, end_year)
-        return dcc.send_data_frame(dff.to_csv, "filtered_earthquake_data.csv", index=False)
 
 
-# Evacuation Map Callback with Dynamic Data
+# Time-lapse: tombol putar/jeda menyiapkan window.seismoTimelapse (query dari
+# filter aktif di overview-stats). Chunk frame diambil dari /api/timelapse
+# di depan playhead; frame f menampilkan event offsets[f-trail+1]..offsets[f+1]
+# dari buffer, chunk yang sudah lewat jejak dibuang.
+app.clientside_callback(
+    """
+    function(playClicks, step, stats, disabled) {
+        const nu = window.dash_clientside.no_update;
+        const trig = window.dash_clientside.callback_context.triggered_id;
+        const tl = window.seismoTimelapse = window.seismoTimelapse || {
+            state: null,
+            covered(f) { return this.state.chunks.some(c => f >= c.start && f < c.end); },
+            offset(f) {
+                const c = this.state.chunks.find(c => f >= c.start && f <= c.end);
+                return c ? c.offsets[f - c.start] : null;
+            },
+            label(f) {
+                const c = this.state.chunks.find(c => f >= c.start && f < c.end);
+                return c ? c.labels[f - c.start] : '';
+            },
+            load(from) {
+                const s = this.state;
+                if (s.pending || from >= s.total) { return; }
+                s.pending = true;
+                fetch(%s + '?' + s.query + '&start=' + from + '&frames=' + %d, {credentials: 'same-origin'})
+                    .then(resp => resp.json())
+                    .then(d => {
+                        if (this.state !== s) { return; }        // playback sudah di-reset
+                        s.pending = false;
+                        s.total = d.total_frames;
+                        s.trail = d.trail;
+                        if (d.labels.length) {
+                            s.chunks.push({start: d.start, end: d.start + d.labels.length,
+                                           offsets: d.offsets, labels: d.labels, events: d.events});
+                            s.chunks.sort((a, b) => a.start - b.start);
+                        }
+                        dash_clientside.set_props('timelapse-frame', {max: Math.max(s.total - 1, 0), value: s.frame});
+                    })
+                    .catch(() => { s.pending = false; });
+            },
+        };
+        if (trig === 'timelapse-step' || !stats) {
+            tl.state = null;
+            return [true, '▶️ Putar', ''];
+        }
+        if (stats.map_layer !== 'points') { return [true, '▶️ Putar', 'Time-lapse hanya untuk layer Titik']; }
+        if (!disabled) { return [true, '▶️ Putar', nu]; }      // jeda
+
+        const p = new URLSearchParams({step: step, mag_min: stats.mag_range[0], mag_max: stats.mag_range[1]});
+        stats.provinces.forEach(v => p.append('province', v));
+        if (stats.years.years) { stats.years.years.forEach(y => p.append('year', y)); }
+        else { p.append('start_year', stats.years.start); p.append('end_year', stats.years.end); }
+        const query = p.toString();
+        if (!tl.state || tl.state.query !== query) {
+            tl.state = {query: query, chunks: [], total: Infinity, trail: 1, frame: 0, shown: -1, pending: false};
+            tl.load(0);
+        } else if (tl.state.shown >= tl.state.total - 1) {
+            tl.state.frame = 0;                                // ulang dari awal
+            tl.state.shown = -1;
+        }
+        return [false, '⏸️ Jeda', 'Memuat...'];
+    }
+    """ % (json.dumps(app.get_relative_path("/api/timelapse")), timelapse.CHUNK_FRAMES),
+    Output("timelapse-interval", "disabled"),
+    Output("timelapse-play", "children"),
+    Output("timelapse-label", "children"),
+    Input("timelapse-play", "n_clicks"),
+    Input("timelapse-step", "value"),
+    State("overview-stats", "data"),
+    State("timelapse-interval", "disabled"),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    """
+    function(n, value, figure, stats) {
+        const nu = window.dash_clientside.no_update;
+        const tl = window.seismoTimelapse, s = tl && tl.state;
+        if (!s || !figure || !figure.data || !figure.data.length) { return [nu, nu, nu, nu, nu]; }
+        if (!stats || stats.map_layer !== 'points') { return [nu, nu, nu, true, '▶️ Putar']; }
+        const f = window.dash_clientside.callback_context.triggered_id === 'timelapse-interval'
+            ? s.shown + 1 : (value || 0);
+        if (f >= s.total) { return [nu, nu, nu, true, '▶️ Putar']; }     // selesai
+
+        // Semua frame dalam jejak harus sudah di buffer; kalau belum, tunggu chunk
+        s.frame = f;
+        const from = Math.max(0, f - s.trail + 1);
+        for (let g = from; g <= f; g++) {
+            if (!tl.covered(g)) { tl.load(g); return [nu, nu, 'Memuat...', nu, nu]; }
+        }
+        // Buang chunk yang seluruhnya sudah keluar dari jejak, ambil chunk berikutnya lebih awal
+        s.chunks = s.chunks.filter(c => c.end > from);
+        let ahead = f;
+        for (const c of s.chunks) { if (c.start <= ahead && c.end > ahead) { ahead = c.end; } }
+        if (ahead < s.total && ahead - f < %d) { tl.load(ahead); }
+
+        const lo = tl.offset(from), hi = tl.offset(f + 1);
+        const lat = [], lon = [], mag = [], text = [], custom = [];
+        let next = lo;
+        for (const c of s.chunks) {
+            const c0 = c.offsets[0], e = c.events;
+            const b = Math.min(hi, c.offsets[c.offsets.length - 1]);
+            for (let i = Math.max(next, c0) - c0; i < b - c0; i++) {
+                lat.push(e.latitude[i]); lon.push(e.longitude[i]); mag.push(e.magnitude[i]); text.push(e.time[i]);
+                custom.push([e.depth[i], e.time[i], '', e.latitude[i], e.longitude[i], e.magnitude[i]]);
+            }
+            next = Math.max(next, b);
+        }
+        const fig = Object.assign({}, figure);
+        const trace = Object.assign({}, fig.data[0], {lat: lat, lon: lon, hovertext: text, customdata: custom});
+        trace.marker = Object.assign({}, trace.marker, {color: mag, size: mag});
+        fig.data = [trace].concat(fig.data.slice(1));
+        fig.layout = Object.assign({}, fig.layout, {uirevision: 'timelapse'});     // pan/zoom user dipertahankan
+        s.shown = f;
+        return [fig, f, tl.label(f) + ' · ' + lat.length + ' event', nu, nu];
+    }
+    """ % (timelapse.CHUNK_FRAMES // 2),
+    Output("map-graph", "figure", allow_duplicate=True),
+    Output("timelapse-frame", "value"),
+    Output("timelapse-label", "children", allow_duplicate=True),
+    Output("timelapse-interval", "disabled", allow_duplicate=True),
+    Output("timelapse-play", "children", allow_duplicate=True),
+    Input("timelapse-interval", "n_intervals"),
+    Input("timelapse-frame", "value"),
+    State("map-graph", "figure"),
+    State("overview-stats", "data"),
+    prevent_initial_call=True
+)
+
+# Penampang kedalaman: titik garis profil dari klik peta (mode gambar) atau
+# profil contoh; garisnya digambar di peta sebagai trace "profile-line".
+# Plotly mapbox tidak punya alat gambar garis, jadi vertex diambil dari klik.
+app.clientside_callback(
+    """
+    function(clickData, preset, clearClicks, draw, line, presets) {
+        const nu = window.dash_clientside.no_update;
+        const trig = window.dash_clientside.callback_context.triggered_id;
+        if (trig === 'profile-clear') { return [[], null]; }
+        if (trig === 'profile-preset') { return [preset ? presets[preset] : [], nu]; }
+        const point = clickData && clickData.points && clickData.points[0];
+        if (!draw || !draw.length || !point || point.lat === undefined || point.lon === undefined) {
+            return [nu, nu];
+        }
+        const next = (line || []).concat([[point.lat, point.lon]]);
+        return [next.slice(-%d), null];
+    }
+    """ % cross_section.MAX_VERTICES,
+    Output("profile-line", "data"),
+    Output("profile-preset", "value"),
+    Input("map-graph", "clickData"),
+    Input("profile-preset", "value"),
+    Input("profile-clear", "n_clicks"),
+    State("profile-draw", "value"),
+    State("profile-line", "data"),
+    State("profile-presets", "data"),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    """
+    function(line, figure) {
+        const nu = window.dash_clientside.no_update;
+        if (!figure || !figure.data) { return nu; }
+        line = line || [];
+        const others = figure.data.filter(t => t.name !== 'profile-line');
+        const current = figure.data.find(t => t.name === 'profile-line');
+        const lat = line.map(p => p[0]), lon = line.map(p => p[1]);
+        if (current ? JSON.stringify([current.lat, current.lon]) === JSON.stringify([lat, lon]) : !line.length) {
+            return nu;
+        }
+        const fig = Object.assign({}, figure, {data: others});
+        if (line.length) {
+            fig.data = others.concat([{
+                type: 'scattermapbox', name: 'profile-line', mode: 'lines+markers',
+                lat: lat, lon: lon, hoverinfo: 'skip', showlegend: false,
+                line: {color: '#2563eb', width: 3}, marker: {size: 8, color: '#2563eb'}
+            }]);
+        }
+        return fig;
+    }
+    """,
+    Output("map-graph", "figure", allow_duplicate=True),
+    Input("profile-line", "data"),
+    Input("map-graph", "figure"),
+    prevent_initial_call=True
+)
+
+
+@app.callback(
+    Output("cross-section-graph", "figure"),
+    Output("cross-section-summary", "children"),
+    Input("profile-line", "data"),
+    Input("profile-width", "value"),
+    Input("mag-filter", "value"),
+    Input("year-filter", "value"),
+    Input("start-year", "value"),
+    Input("end-year", "value"),
+)
+def update_cross_section(line, width_km, mag_range, years, start_year, end_year):
+    snap = dataset_snapshot.current()
+    try:
+        cross_section.validate_line(line or [])
+    except ValueError:
+        return build_cross_section_figure(snap, np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)), \
+            "Pilih profil contoh atau aktifkan mode gambar lalu klik minimal dua titik di peta."
+    width_km = min(max(width_km or 50, 1), cross_section.MAX_WIDTH_KM)
+    # Koridor sudah membatasi wilayah; filter provinsi dashboard tidak dipakai
+    q = dataclasses.replace(
+        seismo_engine.dashboard_query([], mag_range, years, start_year, end_year, snap), provinces=())
+    with metrics.stage("update_cross_section", "query"):
+        rows, along, offset = seismo_engine.section_positions(line, width_km, q, snap)
+    metrics.observe_rows("update_cross_section", len(rows))
+    with metrics.stage("update_cross_section", "figure"):
+        fig = build_cross_section_figure(snap, rows, along, offset)
+    summary = (f"{len(rows):,} event dalam koridor {width_km:g} km sepanjang "
+               f"{cross_section.line_length_km(line):,.0f} km ({len(line)} titik)")
+    return fig, summary
+
+
+# Drill-down regional: klik bar = turun satu level, klik breadcrumb = naik
+@app.callback(
+    Output("region-path", "data"),
+    Input("region-graph", "clickData"),
+    Input({"type": "region-crumb", "index": dash.ALL}, "n_clicks"),
+    State("region-path", "data"),
+    prevent_initial_call=True
+)
+def navigate_region(click_data, crumb_clicks, path):
+    path = list(path or [])
+    triggered = dash.callback_context.triggered_id
+    if isinstance(triggered, dict):
+        if not any(crumb_clicks):
+            raise dash.exceptions.PreventUpdate
+        return path[:triggered["index"]]
+    name = ((click_data or {}).get("points") or [{}])[0].get("x")
+    if name is None or not region_tree.get(dataset_snapshot.current()).has_children(path + [name]):
+        raise dash.exceptions.PreventUpdate
+    return path + [name]
+
+
+@app.callback(
+    Output("region-breadcrumb", "children"),
+    Output("region-summary", "children"),
+    Output("region-graph", "figure"),
+    Input("region-path", "data"),
+    prevent_initial_call=True
+)
+def update_region_view(path):
+    return build_region_view(region_tree.get(dataset_snapshot.current()), tuple(path or ()))
+
+
+# Analisis klaster: background job (progress + batal), hasil di-cache per input + versi dataset
+@background_jobs.background_callback(
+    app, job_manager,
+    Output("cluster-result", "children"),
+    Input("cluster-run-btn", "n_clicks"),
+    State("cluster-radius", "value"),
+    State("cluster-min-events", "value"),
+    progress=[Output("cluster-progress", "value"), Output("cluster-progress", "label")],
+    running=[
+        (Output("cluster-run-btn", "disabled"), True, False),
+        (Output("cluster-cancel-btn", "style"), {"display": "inline-block"}, {"display": "none"}),
+        (Output("cluster-progress", "style"), {"display": "flex"}, {"display": "none"}),
+    ],
+    cancel=[Input("cluster-cancel-btn", "n_clicks")],
+    cache_args_to_ignore=[0],   # n_clicks tidak menentukan hasil
+    prevent_initial_call=True
+)
+def run_cluster_analysis(set_progress, n_clicks, radius_km, min_events):
+    snap = dataset_snapshot.current()
+    set_progress((0, "Menyiapkan..."))
+    clusters = cluster_analysis.find_clusters(
+        snap.df, radius_km, min_events,
+        progress=lambda done, total, label: set_progress((int(done * 100 / total), f"{label} ({done}/{total})")))
+    if clusters.empty:
+        return html.P("Tidak ada klaster dengan parameter ini.", className="text-muted mb-0")
+
+    table = clusters.assign(
+        center=[f"{lat:.2f}, {lon:.2f}" for lat, lon in zip(clusters["latitude"], clusters["longitude"])],
+        period=[f"{a:%Y-%m-%d} – {b:%Y-%m-%d}" for a, b in zip(clusters["first"], clusters["last"])],
+    )[["island", "province", "events", "center", "max_magnitude", "period"]]
+    table.columns = ["Pulau", "Provinsi", "Event", "Pusat (lat, lon)", "M maks", "Periode"]
+    return html.Div([
+        html.P(f"{len(clusters)} klaster terbesar (radius {radius_km} km, min. {min_events} event) · versi {snap.version}",
+               className="text-muted small mb-2"),
+        dbc.Table.from_dataframe(table, striped=True, bordered=False, hover=True, className="table-modern mb-0"),
+    ])
+
+
+@server.route("/debug/startup")
+def startup_report():
+    """Timeline startup/reload + memori per kolom dataset (SEISMO_DEBUG=1)."""
+    if not startup_profile.DEBUG_ENABLED:
+        return Response("Not found", status=404, mimetype="text/plain")
+    report = startup_profile.report(dataset_snapshot.current())
+    return Response(json.dumps(report, indent=2), mimetype="application/json")
+
+
+@server.route("/stream/events")
+def stream_events():
+    return live_feed.feed.response(request.headers.get("Last-Event-ID", type=int))
+
+
+# Swarm Alerts Callback
+@app.callback(Output("swarm-alerts", "children"), Input("swarm-interval", "n_intervals"))
+@single_flight.coalesce(lambda n_intervals: "alerts")   # isi sama untuk semua tab
+def update_swarm_alerts(n_intervals):
+    alerts = swarm.recent_alerts(limit=10)
+    if not alerts:
+        return html.P("Tidak ada aktivitas swarm di atas baseline historis.",
+                      className="text-muted mb-0")
+    return html.Ul([
+        html.Li([
+            html.Span(f"{a['time']} UTC", className="fw-semibold me-2"),
+            html.Span(f"{'Provinsi' if a['scope'] == 'province' else 'Grid'} {a['label']}: "),
+            html.Span(f"{a['count']:.0f} event / {swarm_detector.WINDOW_HOURS} jam "
+                      f"(baseline {a['expected']:.2f}, x{a['ratio']:.0f}), M maks {a['max_magnitude']:.1f}",
+                      className="text-orange"),
+        ], className="mb-1")
+        for a in alerts
+    ], className="mb-0", style={"color": "#64748b"})
+
+
+# Download: link ke endpoint export streaming (file tidak pernah dibangun utuh di memori)
+@app.callback(
+    Output("download-btn", "href"),
+    Input("download-format", "value"),
+    Input("download-columns", "value"),
+    Input("province-filter", "value"),
+    Input("mag-filter", "value"),
+    Input("year-filter", "value"),
+    Input("start-year", "value"),
+    Input("end-year", "value"),
+)
+def update_download_link(fmt, columns, provinces_input, mag_range, years, start_year, end_year):
+    params = {
+        "province": provinces_input or [],
+        "mag_min": mag_range[0] if mag_range else None,
+        "mag_max": mag_range[1] if mag_range else None,
+        "year": years or [],
+        "start_year": start_year,
+        "end_year": end_year,
+        "columns": ",".join(columns or []) or None,
+    }
+    query = urlencode({k: v for k, v in params.items() if v not in (None, [])}, doseq=True)
+    return app.get_relative_path(f"/export/{fmt or 'csv'}") + f"?{query}"
+
+
+@server.route("/export/<fmt>")
+def export_filtered_data(fmt):
+    """Export streaming hasil filter; parameter query sama dengan filter dashboard."""
+    snap = dataset_snapshot.current()     # satu snapshot untuk seluruh stream
+    mag_range = [request.args.get("mag_min", snap.min_mag, type=float),
+                 request.args.get("mag_max", snap.max_mag, type=float)]
+    positions, _ = seismo_engine.filter_positions(
+        request.args.getlist("province"), mag_range, request.args.getlist("year", type=int),
+        request.args.get("start_year", type=int), request.args.get("end_year", type=int), snap)
+    columns = [c for c in request.args.get("columns", "").split(",") if c]
+    return export_stream.export_response(snap, positions, fmt, columns, basename="filtered_earthquake_data")
+
+
+# API read-only (/api/events, /api/aggregates) memakai filter & index yang sama
+server.register_blueprint(query_api.create_blueprint(seismo_engine.filter_positions, seismo_engine.section_positions))
+
+
+# Evacuation Map Callback (data dari content_store, update inkremental via Patch)
+POSKO_PAGE_SIZE = 20
+POSKO_MAP_LIMIT = 2000
+
+
+def render_posko_item(post):
+    return html.P(f"🏫 {post['name']} - {post['address']}", className="mb-2", style={"color": "#64748b"})
+
+
+def build_evacuation_figure(relayout_data=None):
+    """Peta posko: hanya posko di viewport (query R*Tree), maksimal POSKO_MAP_LIMIT."""
+    summary = content_store.posts_summary()
+    center = {"lat": summary["lat"] or center_lat, "lon": summary["lon"] or center_lon}
+    zoom = 12
+    if isinstance(relayout_data, dict):
+        center = relayout_data.get("mapbox.center", center)
+        zoom = relayout_data.get("mapbox.zoom", zoom)
+    view = heatmap_tiles.view_from_relayout(relayout_data, center, zoom, width_px=700, height_px=400)
+    posts = content_store.posts_in_bbox(view["lat_min"], view["lat_max"], view["lon_min"], view["lon_max"],
+                                        limit=POSKO_MAP_LIMIT)
+
+    fig = go.Figure(go.Scattermapbox(
+        lat=[p["lat"] for p in posts],
+        lon=[p["lon"] for p in posts],
+        text=[p["name"] for p in posts],
+        customdata=[p["address"] for p in posts],
+        hovertemplate="<b>%{text}</b><br>%{customdata}<extra></extra>",
+        marker=dict(size=20, color='#ff6b35', symbol='marker'),
+    ))
+    fig.update_layout(
+        mapbox=tile_cache.mapbox_layout(center=center, zoom=zoom),
+        height=400,
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+
 @app.callback(
     Output("evacuation-map", "figure"),
     Output("posko-list", "children"),
+    Output("posko-cursor", "data"),
     Output("posko-feedback", "children"),
     Output("posko-feedback", "className"),
     Input("add-posko-btn", "n_clicks"),
+    Input("posko-more-btn", "n_clicks"),
+    Input("evacuation-map", "relayoutData"),
+    Input("posko-import-result", "data"),
     State("posko-name-input", "value"),
     State("posko-gmaps-input", "value"),
-    State("evacuation-map", "figure"),
+    State("posko-cursor", "data"),
     prevent_initial_call=False
 )
-def update_evacuation_map(n_clicks, name, gmaps_link, current_fig):
-    # Initialize dengan data dummy
-    if 'evacuation_data' not in globals():
-        global evacuation_data
-        evacuation_data = pd.DataFrame({
-            'name': [
-                'SDN Surabaya 1',
-                'GOR Kertajaya', 
-                'Masjid Al-Akbar',
-                'Lapangan Manahan',
-                'Balai Kota Surabaya'
-            ],
-            'lat': [-7.2575, -7.2875, -7.3305, -7.2658, -7.2697],
-            'lon': [112.7521, 112.7417, 112.7277, 112.7378, 112.7508],
-            'address': [
-                'Jl. Diponegoro No. 123',
-                'Jl. Kertajaya No. 45',
-                'Jl. Raya Masjid No. 1',
-                'Jl. Ahmad Yani No. 88',
-                'Jl. Taman Surya No. 1'
-            ]
-        })
-    
+def update_evacuation_map(n_clicks, n_more, relayout_data, import_result, name, gmaps_link, cursor):
+    ctx = dash.callback_context
+    triggered = ctx.triggered[0]["prop_id"] if ctx.triggered else ""
     feedback = ""
     feedback_class = "small mt-2"
-    
-    # Tambah posko baru jika tombol diklik
-    ctx = dash.callback_context
-    if ctx.triggered and ctx.triggered[0]["prop_id"] == "add-posko-btn.n_clicks":
+
+    # Tambah posko baru: append ke DB, lalu kirim hanya titik & item baru (Patch)
+    if triggered == "add-posko-btn.n_clicks":
         if name and gmaps_link:
             # Extract koordinat dari Google Maps link
             lat, lon = extract_coordinates_from_gmaps(gmaps_link)
-            
+
             if lat and lon:
-                new_posko = pd.DataFrame({
-                    'name': [name],
-                    'lat': [lat],
-                    'lon': [lon],
-                    'address': ['Dari Google Maps']
-                })
-                evacuation_data = pd.concat([evacuation_data, new_posko], ignore_index=True)
-                feedback = f"✓ Posko '{name}' berhasil ditambahkan!"
-                feedback_class = "small mt-2 text-success"
-            else:
-                feedback = "⚠️ Link Google Maps tidak valid atau koordinat tidak ditemukan"
-                feedback_class = "small mt-2 text-warning"
+                post = content_store.add_post(name, lat, lon)
+                fig_patch, list_patch = dash.Patch(), dash.Patch()
+                fig_patch["data"][0]["lat"].append(lat)
+                fig_patch["data"][0]["lon"].append(lon)
+                fig_patch["data"][0]["text"].append(post["name"])
+                fig_patch["data"][0]["customdata"].append(post["address"])
+                list_patch.prepend(render_posko_item(post))
+                return (fig_patch, list_patch, dash.no_update,
+                        f"✓ Posko '{name}' berhasil ditambahkan!", "small mt-2 text-success")
+            feedback = "⚠️ Link Google Maps tidak valid atau koordinat tidak ditemukan"
+            feedback_class = "small mt-2 text-warning"
         else:
             feedback = "⚠️ Mohon isi nama dan link Google Maps"
             feedback_class = "small mt-2 text-danger"
-    
-    # Buat peta
-    fig = px.scatter_mapbox(
-        evacuation_data,
-        lat="lat",
-        lon="lon",
-        hover_name="name",
-        hover_data={"address": True, "lat": False, "lon": False},
-        zoom=12,
-        center={"lat": evacuation_data['lat'].mean(), "lon": evacuation_data['lon'].mean()},
-        height=400,
-    )
-    
-    fig.update_traces(
-        marker=dict(size=20, color='#ff6b35', symbol='marker'),
-    )
-    
-    fig.update_layout(
-        mapbox_style="open-street-map",
-        margin={"r": 0, "t": 0, "l": 0, "b": 0},
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-    )
-    
-    # Buat daftar posko
-    posko_list = []
-    for idx, row in evacuation_data.iterrows():
-        posko_list.append(
-            html.P(f"🏫 {row['name']} - {row['address']}", className="mb-2", style={"color": "#64748b"})
-        )
-    
-    return fig, posko_list, feedback, feedback_class
+        return dash.no_update, dash.no_update, dash.no_update, feedback, feedback_class
+
+    # Halaman berikutnya dari daftar posko (keyset pagination)
+    if triggered == "posko-more-btn.n_clicks":
+        posts = content_store.posts_page(POSKO_PAGE_SIZE, before_id=cursor)
+        if not posts:
+            raise dash.exceptions.PreventUpdate
+        list_patch = dash.Patch()
+        list_patch.extend([render_posko_item(p) for p in posts])
+        return dash.no_update, list_patch, posts[-1]["id"], feedback, feedback_class
+
+    # Pan/zoom peta: ambil ulang posko di viewport baru
+    if triggered == "evacuation-map.relayoutData":
+        if not isinstance(relayout_data, dict) or not any(k.startswith("mapbox.") for k in relayout_data):
+            raise dash.exceptions.PreventUpdate
+        return build_evacuation_figure(relayout_data), dash.no_update, dash.no_update, feedback, feedback_class
+
+    # Render awal (atau setelah import massal): peta viewport default + halaman pertama daftar
+    posts = content_store.posts_page(POSKO_PAGE_SIZE)
+    return (build_evacuation_figure(), [render_posko_item(p) for p in posts],
+            posts[-1]["id"] if posts else None, feedback, feedback_class)
+
+
+@app.callback(
+    Output("posko-import-feedback", "children"),
+    Output("posko-import-result", "data"),
+    Input("posko-upload", "contents"),
+    State("posko-upload", "filename"),
+    prevent_initial_call=True
+)
+def import_posko_file(contents, filename):
+    """Import posko massal dari file upload; ringkasan + error per baris."""
+    if not contents:
+        raise dash.exceptions.PreventUpdate
+    try:
+        raw = base64.b64decode(contents.split(",", 1)[1])
+        result = posko_import.import_posts(raw, filename or "")
+    except Exception as e:
+        return html.Span(f"⚠️ Gagal membaca {filename}: {e}", className="text-danger"), dash.no_update
+
+    summary = html.Span(
+        f"✓ {result['imported']:,} dari {result['total']:,} posko diimport "
+        f"({result['duplicates']:,} duplikat, {result['error_count'] - result['duplicates']:,} tidak valid).",
+        className="text-success" if result["imported"] else "text-warning")
+    errors = [html.Li(f"Baris {e['row']}: {e['name'] or '-'} — {e['error']}") for e in result["errors"]]
+    if result["error_count"] > len(errors):
+        errors.append(html.Li(f"... dan {result['error_count'] - len(errors):,} baris lainnya"))
+    # Peta & daftar hanya perlu dirender ulang kalau ada posko baru
+    return [summary, html.Ul(errors, className="mb-0 mt-1")] if errors else summary, \
+        (result if result["imported"] else dash.no_update)
 
 
 def extract_coordinates_from_gmaps(url):
@@ -972,89 +1893,85 @@ def extract_coordinates_from_gmaps(url):
 
 
 # Articles Management Callback
+ARTICLE_PAGE_SIZE = 12
+DEFAULT_ARTICLE_IMAGE = 'https://images.unsplash.com/photo-1451187580459-43490279c0fa?w=600&h=400&fit=crop'
+DEFAULT_ARTICLE_DESC = 'Baca artikel lengkap untuk informasi lebih detail tentang keselamatan gempa bumi.'
+
+
+def render_article_card(article):
+    return html.Div([
+        # Image
+        html.Img(
+            src=article['image'],
+            className="article-image"
+        ),
+        # Content
+        html.Div([
+            html.Div(article['title'], className="article-title"),
+            html.Div(article['description'], className="article-desc"),
+            html.A(
+                "Baca Selengkapnya →",
+                href=article['url'],
+                target="_blank",
+                className="article-link"
+            ),
+        ], className="article-content")
+    ], className="article-card")
+
+
 @app.callback(
     Output("articles-list", "children"),
+    Output("articles-cursor", "data"),
     Output("article-feedback", "children"),
     Input("add-article-btn", "n_clicks"),
+    Input("articles-more-btn", "n_clicks"),
     State("article-title-input", "value"),
     State("article-url-input", "value"),
     State("article-image-input", "value"),
     State("article-desc-input", "value"),
+    State("articles-cursor", "data"),
     prevent_initial_call=False
 )
-def manage_articles(n_clicks, title, url, image_url, description):
-    # Initialize artikel dummy dengan gambar dan deskripsi
-    if 'articles' not in globals():
-        global articles
-        articles = [
-            {
-                'title': '10 Cara Menyelamatkan Diri dari Gempa Bumi yang Wajib Diketahui',
-                'url': 'https://www.kompas.com/skola/read/2025/08/21/143000269/10-cara-menyelamatkan-diri-dari-gempa-bumi-yang-wajib-diketahui',
-                'image': 'https://images.unsplash.com/photo-1590859808308-3d2d9c515b1a?w=600&h=400&fit=crop',
-                'description': 'Gempa bumi adalah bencana alam yang tidak dapat diprediksi. Kenali 10 langkah penting untuk menyelamatkan diri dan keluarga saat terjadi gempa bumi.'
-            },
-            {
-                'title': 'Panduan Evakuasi Darurat untuk Keluarga',
-                'url': 'https://www.bnpb.go.id/artikel/evakuasi-gempa',
-                'image': 'https://images.unsplash.com/photo-1551836022-d5d88e9218df?w=600&h=400&fit=crop',
-                'description': 'Persiapkan rencana evakuasi keluarga Anda. Artikel ini membahas langkah-langkah praktis untuk menghadapi situasi darurat gempa bumi dengan aman.'
-            },
-            {
-                'title': 'Pertolongan Pertama untuk Korban Gempa',
-                'url': 'https://www.pmi.or.id/p3k-gempa',
-                'image': 'https://images.unsplash.com/photo-1584820927498-cfe5211fd8bf?w=600&h=400&fit=crop',
-                'description': 'Pelajari teknik pertolongan pertama yang tepat untuk membantu korban gempa. Termasuk cara menangani luka, patah tulang, dan kondisi darurat lainnya.'
-            },
-            {
-                'title': 'Membangun Rumah Tahan Gempa',
-                'url': 'https://www.pu.go.id/rumah-tahan-gempa',
-                'image': 'https://images.unsplash.com/photo-1503387762-592deb58ef4e?w=600&h=400&fit=crop',
-                'description': 'Konstruksi bangunan yang tepat dapat menyelamatkan nyawa. Simak panduan membangun dan merenovasi rumah agar lebih tahan terhadap guncangan gempa.'
-            }
-        ]
-    
-    feedback = ""
-    
-    # Tambah artikel baru
+def manage_articles(n_clicks, n_more, title, url, image_url, description, cursor):
     ctx = dash.callback_context
-    if ctx.triggered and ctx.triggered[0]["prop_id"] == "add-article-btn.n_clicks":
+    triggered = ctx.triggered[0]["prop_id"] if ctx.triggered else ""
+
+    # Tambah artikel baru (append ke DB, kirim satu card baru saja)
+    if triggered == "add-article-btn.n_clicks":
         if title and url:
-            new_article = {
-                'title': title,
-                'url': url,
-                'image': image_url if image_url else 'https://images.unsplash.com/photo-1451187580459-43490279c0fa?w=600&h=400&fit=crop',
-                'description': description if description else 'Baca artikel lengkap untuk informasi lebih detail tentang keselamatan gempa bumi.'
-            }
-            articles.append(new_article)
-            feedback = f"✓ Artikel '{title}' berhasil ditambahkan!"
-        else:
-            feedback = "⚠️ Mohon isi minimal judul dan URL artikel"
-    
-    # Render daftar artikel dengan card style
-    article_items = []
-    for idx, article in enumerate(articles):
-        article_card = html.Div([
-            # Image
-            html.Img(
-                src=article['image'],
-                className="article-image"
-            ),
-            # Content
-            html.Div([
-                html.Div(article['title'], className="article-title"),
-                html.Div(article['description'], className="article-desc"),
-                html.A(
-                    "Baca Selengkapnya →",
-                    href=article['url'],
-                    target="_blank",
-                    className="article-link"
-                ),
-            ], className="article-content")
-        ], className="article-card")
-        
-        article_items.append(article_card)
-    
-    return article_items, feedback
+            article = content_store.add_article(
+                title, url, image_url or DEFAULT_ARTICLE_IMAGE, description or DEFAULT_ARTICLE_DESC)
+            list_patch = dash.Patch()
+            list_patch.prepend(render_article_card(article))
+            return list_patch, dash.no_update, f"✓ Artikel '{title}' berhasil ditambahkan!"
+        return dash.no_update, dash.no_update, "⚠️ Mohon isi minimal judul dan URL artikel"
+
+    if triggered == "articles-more-btn.n_clicks":
+        articles = content_store.articles_page(ARTICLE_PAGE_SIZE, before_id=cursor)
+        if not articles:
+            raise dash.exceptions.PreventUpdate
+        list_patch = dash.Patch()
+        list_patch.extend([render_article_card(a) for a in articles])
+        return list_patch, articles[-1]["id"], ""
+
+    # Render awal: halaman pertama (artikel terbaru dulu)
+    articles = content_store.articles_page(ARTICLE_PAGE_SIZE)
+    return [render_article_card(a) for a in articles], (articles[-1]["id"] if articles else None), ""
+
+
+# === Load dataset & hot reload ===
+# Snapshot pertama dibangun saat import (seismo_engine); watcher mengecek file
+# sumber secara berkala dan men-swap versi baru tanpa restart.
+startup_profile.mark("app_layout_callbacks")
+seismo_engine.start()
+
+# Dashboard lama (gempa_dash) bisa di-mount di server yang sama: satu proses,
+# satu salinan dataset. Mis. GEMPA_DASH_PREFIX=/classic/
+if os.environ.get("GEMPA_DASH_PREFIX"):
+    import gempa_dash
+    gempa_dash.mount(server)
+content_store.init_db()
+startup_profile.mark("services")
 
 if __name__ == "__main__": 
     app.run(debug=True)
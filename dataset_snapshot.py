@@ -0,0 +1,326 @@
+import os
+import threading
+import time
+import dataclasses
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import dataset_store
+import event_table
+import startup_profile
+
+# ======================================================================
+#            DATASET SNAPSHOT (immutable, di-swap secara atomik)
+# ======================================================================
+# Semua nilai turunan dataset (df, provinsi teratas, rentang magnitudo/tahun,
+# agregat) dikumpulkan dalam satu objek immutable. Callback mengambil
+# snapshot sekali di awal (`current()`), jadi kalau ada reload di tengah
+# jalan callback tetap selesai dengan data lama. Reload membangun snapshot
+# baru di thread background lalu mengganti referensi global sekali assign.
+
+RELOAD_INTERVAL_SECONDS = 120
+FOLLOW_INTERVAL_SECONDS = 5      # worker non-poller mengecek versi upsert baru di store
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    version: str
+    df: pd.DataFrame
+    province_rows: dict = field(default=None, repr=False)
+    valid_provinces: tuple = ()
+    top_province: str = "Lainnya"
+    min_mag: float = 0.0
+    max_mag: float = 10.0
+    min_year: int = 0
+    max_year: int = 0
+    default_years: tuple = ()
+    default_start_year: int = 0
+    default_end_year: int = 0
+    province_options: tuple = ()
+    year_options: tuple = ()
+    mag_by_province: pd.DataFrame = field(default=None, repr=False)
+    # Delta versi hasil upsert (semua None = load penuh, index dibangun ulang):
+    appended: pd.DataFrame = field(default=None, repr=False)   # event baru (id belum pernah ada)
+    upserted: pd.DataFrame = field(default=None, repr=False)   # semua baris upsert = ekor df (baru + versi terbaru)
+    replaced: pd.DataFrame = field(default=None, repr=False)   # baris induk yang diganti; index = posisi di induk
+    parent_version: str = None                                 # versi asal upsert
+    created: float = field(default_factory=time.time)
+
+
+def build_snapshot(df, version, province_rows=None):
+    """Hitung semua nilai turunan yang dulu berupa global modul di dashv2."""
+    valid = df[df["province"] != "Lainnya"]["province"]
+    valid_provinces = tuple(str(p) for p in valid.unique())
+    top_province = str(valid.value_counts().idxmax()) if len(valid_provinces) > 0 else "Lainnya"
+
+    years = event_table.years(df)
+    min_year, max_year = int(years.min()), int(years.max())
+    default_years = tuple(int(y) for y in sorted(years.unique(), reverse=True)[:5])  # 5 tahun terakhir
+
+    mag_by_province = (
+        df.groupby("province", observed=True)["magnitude"].mean()
+        .reset_index().sort_values("magnitude", ascending=False)
+    )
+    return DatasetSnapshot(
+        version=version,
+        df=df,
+        province_rows=province_rows,
+        valid_provinces=valid_provinces,
+        top_province=top_province,
+        min_mag=event_table.display_value(df["magnitude"].min(), "magnitude"),
+        max_mag=event_table.display_value(df["magnitude"].max(), "magnitude"),
+        min_year=min_year,
+        max_year=max_year,
+        default_years=default_years,
+        default_start_year=default_years[-1] if default_years else min_year,
+        default_end_year=default_years[0] if default_years else max_year,
+        province_options=tuple(sorted(str(p) for p in df["province"].unique())),
+        year_options=tuple(int(y) for y in sorted(years.unique(), reverse=True)),
+        mag_by_province=mag_by_province,
+    )
+
+
+# ----------------------------------------------------------------------
+#                    SNAPSHOT AKTIF & CACHE PER VERSI
+# ----------------------------------------------------------------------
+_current = None
+_preparing_version = None
+_publish_lock = threading.Lock()
+_prepare_hooks = []      # dipanggil dengan snapshot baru SEBELUM swap (warm-up)
+_publish_hooks = []      # dipanggil SETELAH swap (buang state versi lama)
+_versioned_caches = []
+_upsert_lock = threading.Lock()
+
+
+def current():
+    """Snapshot aktif. Ambil sekali per callback lalu pakai referensinya."""
+    return _current
+
+
+def _register(hooks, hook):
+    with _publish_lock:
+        hooks.append(hook)
+        # App yang di-import setelah dataset di-load (beberapa app di satu
+        # proses) tetap mendapat warm-up untuk snapshot yang sudah aktif
+        if _current is not None:
+            hook(_current)
+    return hook
+
+
+def on_prepare(hook):
+    """Daftarkan fungsi warm-up (pyramid, figure statis, baseline) untuk versi baru."""
+    return _register(_prepare_hooks, hook)
+
+
+def on_publish(hook):
+    """Daftarkan fungsi yang dipanggil setelah swap, mis. untuk evict cache lain."""
+    return _register(_publish_hooks, hook)
+
+
+class VersionedCache:
+    """Cache yang key-nya selalu diawali versi dataset; versi lama dibuang saat swap.
+
+    max_entries membatasi jumlah entri (yang paling lama dimasukkan dibuang
+    dulu), untuk key yang variasinya tak terbatas seperti query API.
+    """
+
+    def __init__(self, max_entries=None, name=None):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        _versioned_caches.append(self)
+
+    def get_or_build(self, version, key, build):
+        with self._lock:
+            if (version, key) in self._data:
+                self.hits += 1
+                return self._data[(version, key)]
+            self.misses += 1
+        value = build()
+        # Callback yang masih jalan di snapshot lama tidak mengisi cache lagi
+        if _current is None or version in (_current.version, _preparing_version):
+            with self._lock:
+                self._data[(version, key)] = value
+                if self.max_entries is not None:
+                    while len(self._data) > self.max_entries:
+                        del self._data[next(iter(self._data))]
+        return value
+
+    def evict_except(self, version):
+        with self._lock:
+            for k in [k for k in self._data if k[0] != version]:
+                del self._data[k]
+
+
+def cache_stats():
+    """(nama, hits, misses, entri) untuk setiap VersionedCache yang diberi nama."""
+    return [(c.name, c.hits, c.misses, len(c._data)) for c in _versioned_caches if c.name]
+
+
+def publish(snapshot):
+    """Jalankan warm-up untuk snapshot baru lalu swap secara atomik."""
+    global _current, _preparing_version
+    with _publish_lock:
+        _preparing_version = snapshot.version
+        try:
+            for hook in _prepare_hooks:
+                with startup_profile.stage(hook.__name__):
+                    hook(snapshot)
+            _current = snapshot          # satu assign referensi = swap atomik
+        finally:
+            _preparing_version = None
+        for cache in _versioned_caches:
+            cache.evict_except(snapshot.version)
+        for hook in _publish_hooks:
+            with startup_profile.stage(hook.__name__):
+                hook(snapshot)
+    return snapshot
+
+
+def _next_upsert_version(version):
+    base, _, suffix = version.partition("+u")
+    return f"{base}+u{int(suffix or 0) + 1}"
+
+
+def _with_delta(snapshot, parent, replaced_positions, n_upserted, key):
+    """Tempelkan delta upsert (relatif ke parent) ke snapshot baru."""
+    df = snapshot.df
+    upserted = df.iloc[len(df) - n_upserted:]
+    replaced = parent.df.iloc[replaced_positions]
+    appended = upserted[~upserted[key].isin(replaced[key])] if len(replaced) else upserted
+    return dataclasses.replace(snapshot, appended=appended, upserted=upserted, replaced=replaced,
+                               parent_version=parent.version)
+
+
+def _stored(snap):
+    """Snapshot dari dataset_store (bukan build langsung ke memori)."""
+    return not snap.version.startswith("mem-")
+
+
+def upsert(rows, key="event_id"):
+    """Ganti/tambah baris berdasarkan `key` lalu publish versi baru.
+
+    Dipakai ingestion feed (satu proses per host, lihat feed_poller): hanya
+    baris baru yang di-compact, lalu versi baru ditulis ke dataset_store dan
+    di-mmap, jadi tabel tetap dibagi antar worker dan index provinsi tetap
+    ada. Worker lain mengikuti lewat adopt_store_version(). Hook on_prepare
+    memakai delta (upserted/replaced) untuk update index secara inkremental.
+    """
+    with _upsert_lock:
+        if not _stored(_current):
+            return publish(_merge(_current, rows, key, _next_upsert_version(_current.version)))
+        try:
+            with dataset_store.lock():
+                # Worker lain bisa sudah menulis versi lebih baru (reload penuh / upsert
+                # dari poller sebelumnya); upsert selalu di atas versi terbaru store
+                _adopt(dataset_store.current_version(), any_base=True)
+                snapshot = _merge(_current, rows, key, _next_upsert_version(_current.version), store=True)
+        except OSError as e:
+            print(f"⚠️ Store tidak bisa ditulis ({e}), upsert hanya di memori worker ini.")
+            snapshot = _merge(_current, rows, key, "mem-" + _next_upsert_version(_current.version))
+        return publish(snapshot)
+
+
+def _merge(snap, rows, key, version, store=False):
+    df = snap.df
+    # dropna: baris CSV tanpa event_id (NaN) tidak boleh ikut "diganti"
+    existing = df[key].isin(rows[key].dropna()).to_numpy() if key in df.columns else np.zeros(len(df), dtype=bool)
+    replaced_positions = np.flatnonzero(existing)
+    merged = event_table.concat([df[~existing], event_table.compact(rows)])
+    province_rows = None
+    if store:
+        dataset_store.materialize(merged, version, upsert={"parent": snap.version, "rows": len(rows)},
+                                  replaced_positions=replaced_positions)
+        merged, _, province_rows = dataset_store.load_mapped(version)
+    snapshot = build_snapshot(merged, version, province_rows)
+    return _with_delta(snapshot, snap, replaced_positions, len(rows), key)
+
+
+def _adopt(version, key="event_id", any_base=False):
+    """Publish versi store `version` kalau berbeda dari snapshot aktif.
+
+    Tanpa any_base hanya versi dengan basis sama (upsert); reload penuh
+    (basis beda) urusan watcher.
+    """
+    snap = _current
+    if version is None or snap is None or version == snap.version:
+        return None
+    if not any_base and dataset_store.base_version(version) != dataset_store.base_version(snap.version):
+        return None
+    df, manifest, index = dataset_store.load_mapped(version)
+    snapshot = build_snapshot(df, version, index)
+    delta = manifest.get("upsert")
+    if delta and delta["parent"] == snap.version:
+        snapshot = _with_delta(snapshot, snap, delta["replaced"], delta["rows"], key)
+    return publish(snapshot)
+
+
+def adopt_store_version():
+    """Ikuti versi upsert terbaru di store (worker yang tidak menjalankan poller)."""
+    with _upsert_lock:
+        if _current is not None and _stored(_current):
+            return _adopt(dataset_store.current_version())
+    return None
+
+
+def _follow(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            adopt_store_version()
+        except Exception as e:
+            print(f"⚠️ Gagal mengikuti versi store: {e}")
+
+
+def start_follower(interval=FOLLOW_INTERVAL_SECONDS):
+    """Thread yang me-mmap versi upsert baru dari store (cukup baca file CURRENT)."""
+    thread = threading.Thread(target=_follow, args=(interval,), name="dataset-follower", daemon=True)
+    thread.start()
+    return thread
+
+
+def load(build_fn, sources):
+    """Load (atau build) dataset lewat dataset_store lalu publish sebagai snapshot."""
+    with startup_profile.profiler.run("load") as run:
+        df, store_version, province_rows = dataset_store.load_or_build(build_fn, sources)
+        version = run["version"] = store_version or f"mem-{int(time.time())}"
+        with startup_profile.stage("build_snapshot"):
+            snapshot = build_snapshot(df, version, province_rows)
+        publish(snapshot)
+    startup_profile.save_report(snapshot)
+    return snapshot
+
+
+# ----------------------------------------------------------------------
+#                          WATCHER (hot reload)
+# ----------------------------------------------------------------------
+def _watch(build_fn, sources, interval):
+    last_signature = dataset_store.source_signature(sources)
+    while True:
+        time.sleep(interval)
+        try:
+            signature = dataset_store.source_signature(sources)
+            if signature is None or signature == last_signature:
+                continue
+            started = time.perf_counter()
+            snapshot = load(build_fn, sources)
+            last_signature = signature
+            print(f"✅ Dataset reload ke versi {snapshot.version} ({len(snapshot.df)} baris) "
+                  f"dalam {time.perf_counter() - started:.1f} detik.")
+        except Exception as e:
+            # Versi lama tetap dipakai; coba lagi di interval berikutnya
+            print(f"⚠️ Gagal reload dataset: {e}")
+
+
+def start_watcher(build_fn, sources, interval=None):
+    """Pantau file sumber; kalau berubah, build versi baru di background lalu swap."""
+    interval = interval or int(os.environ.get("DATASET_RELOAD_SECONDS", RELOAD_INTERVAL_SECONDS))
+    thread = threading.Thread(target=_watch, args=(build_fn, sources, interval),
+                              name="dataset-watcher", daemon=True)
+    thread.start()
+    return thread
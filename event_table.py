@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# ======================================================================
+#            EVENT TABLE (representasi kompak DataFrame event)
+# ======================================================================
+# Loader menghasilkan tabel kompak:
+#   place, province,          category (string di-intern, kode int8/int16);
+#   regency, district,        regency/district hanya ada kalau polygon
+#   source                    kab/kota / kecamatan tersedia
+#   latitude, longitude,      float32 (presisi ~1 m untuk koordinat,
+#   depth, magnitude                   cukup untuk katalog 3-4 desimal)
+#   time                      datetime64[ns] naive UTC = int64 epoch ns,
+#                             di store ditulis sebagai int64 dan di-mmap tanpa salinan
+#   year                      int16, di-cache supaya filter tidak menghitung dt.year
+#
+# Callback tetap memakai df seperti biasa; pakai accessor di bawah untuk
+# kolom turunan (years) dan sebelum nilai ditampilkan/diserialisasi ke JSON
+# (display), supaya float32 tidak muncul sebagai 5.0999999046.
+
+FLOAT32_COLUMNS = ("latitude", "longitude", "depth", "magnitude")
+CATEGORY_COLUMNS = ("place", "province", "regency", "district", "source")
+DERIVED_COLUMNS = ("year",)
+
+# Desimal yang dipertahankan saat float32 dikembalikan ke float64
+DISPLAY_DECIMALS = {"latitude": 4, "longitude": 4, "depth": 3, "magnitude": 2}
+
+
+def compact(df):
+    """DataFrame event -> representasi kompak (kolom lain dibiarkan apa adanya)."""
+    columns = {}
+    for col in df.columns:
+        if col in DERIVED_COLUMNS:
+            continue
+        series = df[col]
+        if col in FLOAT32_COLUMNS:
+            series = pd.to_numeric(series, errors="coerce").astype(np.float32)
+        elif col in CATEGORY_COLUMNS and not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        elif col == "time":
+            series = pd.to_datetime(series)
+            if series.dt.tz is not None:
+                series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+            series = series.astype("datetime64[ns]")
+        columns[col] = series.reset_index(drop=True)
+    out = pd.DataFrame(columns)
+    if "time" in out.columns:
+        out["year"] = out["time"].dt.year.astype(np.int16)
+    return out
+
+
+def concat(frames):
+    """Gabung tabel kompak tanpa kembali ke object/float64.
+
+    Kolom kategori disatukan dengan union_categoricals (kode dipetakan ulang,
+    string tidak di-intern ulang); kolom yang tidak ada di salah satu frame
+    diisi NaN/NaT dengan dtype frame lain.
+    """
+    columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+    out = {}
+    for col in columns:
+        dtype = next(frame[col].dtype for frame in frames if col in frame.columns)
+        parts = [frame[col].reset_index(drop=True) if col in frame.columns
+                 else pd.Series(index=pd.RangeIndex(len(frame)),
+                                dtype="category" if isinstance(dtype, pd.CategoricalDtype) else dtype)
+                 for frame in frames]
+        if any(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            parts = [part if isinstance(part.dtype, pd.CategoricalDtype) else part.astype("category") for part in parts]
+            out[col] = pd.Series(pd.api.types.union_categoricals(parts, ignore_order=True))
+        else:
+            out[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(out)
+
+
+def years(df):
+    """Tahun per baris: kolom cache kalau ada, selain itu dihitung dari time."""
+    if "year" in df.columns:
+        return df["year"]
+    return df["time"].dt.year
+
+
+def epoch_ns(df):
+    """Waktu sebagai int64 epoch nanodetik (view, tanpa salinan)."""
+    return df["time"].to_numpy().view("int64")
+
+
+def public_columns(df):
+    """Kolom yang ditawarkan ke user (export, API); kolom turunan disembunyikan."""
+    return [c for c in df.columns if c not in DERIVED_COLUMNS]
+
+
+def display(df):
+    """Salinan untuk tampilan/JSON: float32 -> float64 dibulatkan, kolom turunan dibuang."""
+    out = df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns])
+    for col, decimals in DISPLAY_DECIMALS.items():
+        if col in out.columns and out[col].dtype == np.float32:
+            out[col] = np.round(out[col].astype(np.float64), decimals)
+    return out
+
+
+def display_value(value, column):
+    """Satu nilai float32 -> float Python yang dibulatkan seperti display()."""
+    return round(float(value), DISPLAY_DECIMALS.get(column, 6))
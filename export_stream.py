@@ -0,0 +1,157 @@
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+from flask import Response, stream_with_context
+
+import event_table
+
+# ======================================================================
+#            EXPORT STREAMING (CSV gzip / Parquet / GeoJSON)
+# ======================================================================
+# Hasil filter tidak pernah diserialisasi utuh di memori: baris diambil per
+# chunk dari snapshot (lewat posisi baris), diubah ke format tujuan, lalu
+# langsung dikirim ke klien. Byte pertama terkirim segera, jadi export
+# seluruh katalog tidak kena timeout dan memori tetap sebesar satu chunk.
+#
+# Parquet butuh pyarrow (opsional); tanpa itu format lain tetap jalan.
+
+EXPORT_CHUNK_ROWS = 50000
+
+EXPORT_FORMATS = {
+    "csv": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "geojson": ("application/geo+json", "geojson"),
+}
+
+
+def select_columns(df, columns):
+    """Kolom yang diminta (urutan dipertahankan); kosong/tidak dikenal = semua kolom."""
+    available = event_table.public_columns(df)
+    selected = [c for c in (columns or []) if c in available]
+    return selected or available
+
+
+def iter_chunks(df, positions, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Baris per chunk; hasil kosong tetap satu chunk kosong (header CSV / schema Parquet)."""
+    if len(positions) == 0:
+        yield df.iloc[[]][columns]
+        return
+    for start in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows]][columns]
+
+
+def _iso_times(chunk):
+    # Waktu di snapshot = UTC naive; tulis eksplisit sebagai ISO 8601 UTC
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        if pd.api.types.is_datetime64_any_dtype(chunk[col]):
+            chunk[col] = chunk[col].dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return chunk
+
+
+def iter_csv_gzip(chunks):
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits 31 = container gzip
+    first = True
+    for chunk in chunks:
+        data = gz.compress(_iso_times(chunk).to_csv(index=False, header=first).encode("utf-8"))
+        first = False
+        if data:
+            yield data
+    yield gz.flush()
+
+
+def iter_geojson(chunks):
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for chunk in chunks:
+        chunk = event_table.display(chunk)
+        lon, lat = chunk.get("longitude"), chunk.get("latitude")
+        if lon is None or lat is None:
+            raise ValueError("GeoJSON butuh kolom latitude dan longitude")
+        props = _iso_times(chunk.drop(columns=["latitude", "longitude"]))
+        props = props.astype(object).where(props.notna(), None).to_dict("records")
+        features = [
+            json.dumps({"type": "Feature",
+                        "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+                        "properties": p}, ensure_ascii=False)
+            for x, y, p in zip(lon.to_numpy(), lat.to_numpy(), props)
+        ]
+        if features:
+            yield ((b"" if first else b",") + ",".join(features).encode("utf-8"))
+            first = False
+    yield b"]}"
+
+
+class _ChunkSink:
+    """File-like minimal untuk ParquetWriter: byte yang ditulis diambil per row group."""
+
+    def __init__(self):
+        self.parts, self.position, self.closed = [], 0, False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def iter_parquet(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink, writer = _ChunkSink(), None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(event_table.display(chunk), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression="zstd")
+        writer.write_table(table)       # satu chunk = satu row group
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def export_response(snap, positions, fmt, columns=None, basename="earthquake_data"):
+    """Flask Response streaming untuk baris `positions` dari snapshot dalam format `fmt`."""
+    if fmt not in EXPORT_FORMATS:
+        return Response(f"Format tidak dikenal: {fmt}", status=400, mimetype="text/plain")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return Response("Export Parquet butuh pyarrow (pip install pyarrow)", status=501, mimetype="text/plain")
+
+    df = snap.df
+    columns = select_columns(df, columns)
+    if fmt == "geojson":
+        # Koordinat jadi geometry; tetap ikut walaupun tidak dipilih
+        columns = ["latitude", "longitude"] + [c for c in columns if c not in ("latitude", "longitude")]
+    chunks = iter_chunks(df, np.asarray(positions), columns)
+    body = {"csv": iter_csv_gzip, "parquet": iter_parquet, "geojson": iter_geojson}[fmt](chunks)
+
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{basename}.{ext}"',
+            "X-Dataset-Version": snap.version,
+            "Cache-Control": "no-store",
+        },
+    )
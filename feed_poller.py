@@ -0,0 +1,285 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa file lock, cukup untuk single worker
+    fcntl = None
+
+# ======================================================================
+#            FEED POLLER (FDSN / GeoJSON, asyncio)
+# ======================================================================
+# Mengambil update katalog secara inkremental dari beberapa feed sekaligus:
+# - satu aiohttp.ClientSession per poller (koneksi keep-alive dipakai ulang)
+# - request bersyarat (If-None-Match / If-Modified-Since -> 304 = tidak ada data)
+# - cursor `updatedafter` per feed, jadi hanya event baru/berubah yang dikirim
+# Hasilnya (satu baris per event id, versi `updated` terbaru) diteruskan ke
+# callback ingestion. Event yang sudah dikenal tapi `updated`-nya berubah
+# menjadi upsert, bukan reload penuh.
+#
+# Dengan beberapa worker gunicorn hanya satu proses per host yang polling
+# (lock file LEADER_LOCK_PATH); worker lain menunggu lock itu sebagai
+# cadangan dan mengikuti versi dataset hasil upsert lewat dataset_store.
+# Tulis ke FEED_EVENTS_PATH diserialisasi dengan lock file tersendiri.
+#
+# Butuh: pip install aiohttp. Untuk uji offline jalankan mock_feed_server.py
+# lalu SEISMO_FEEDS=mock.
+#
+#   SEISMO_FEEDS=usgs,emsc        (nama preset atau URL lengkap, dipisah koma)
+#   SEISMO_POLL_SECONDS=60
+
+POLL_INTERVAL_SECONDS = 60
+REQUEST_TIMEOUT_SECONDS = 30
+FEED_EVENTS_PATH = "data/feed/events.csv"
+LEADER_LOCK_PATH = "data/feed/poller.lock"
+
+_REGION = "minlatitude=-15&maxlatitude=10&minlongitude=90&maxlongitude=145"
+FEED_PRESETS = {
+    "usgs": f"https://earthquake.usgs.gov/fdsnws/event/1/query?format=geojson&{_REGION}",
+    "emsc": f"https://www.seismicportal.eu/fdsnws/event/1/query?format=json&{_REGION}",
+    "mock": "http://127.0.0.1:8765/fdsnws/event/1/query?format=geojson",
+}
+
+EVENT_COLUMNS = ["event_id", "updated", "time", "latitude", "longitude", "depth", "magnitude", "place", "source"]
+
+# Tanpa cursor: ambil 1 hari terakhir saja, histori tetap dari CSV
+INITIAL_LOOKBACK = pd.Timedelta(days=1)
+
+
+def _to_time(value):
+    # USGS: epoch milidetik; EMSC: string ISO
+    if value is None:
+        return pd.NaT
+    if isinstance(value, (int, float)):
+        return pd.to_datetime(value, unit="ms")
+    return pd.to_datetime(value, utc=True).tz_localize(None)
+
+
+def parse_geojson(data, source):
+    """FeatureCollection FDSN/USGS/EMSC -> DataFrame EVENT_COLUMNS (waktu UTC naive)."""
+    rows = []
+    for feature in data.get("features", []):
+        props = feature.get("properties") or {}
+        coords = (feature.get("geometry") or {}).get("coordinates") or [None, None, None]
+        time_value = _to_time(props.get("time"))
+        updated = props.get("updated") or props.get("lastupdate")
+        rows.append({
+            "event_id": str(feature.get("id") or props.get("unid") or props.get("source_id")),
+            "updated": _to_time(updated) if updated else time_value,
+            "time": time_value,
+            "latitude": coords[1] if len(coords) > 1 else props.get("lat"),
+            "longitude": coords[0] if coords else props.get("lon"),
+            # EMSC memberi depth positif di geometry dan di properties
+            "depth": props.get("depth", abs(coords[2]) if len(coords) > 2 and coords[2] is not None else None),
+            "magnitude": props.get("mag"),
+            "place": props.get("place") or props.get("flynn_region"),
+            "source": source,
+        })
+    df = pd.DataFrame(rows, columns=EVENT_COLUMNS)
+    for col in ("latitude", "longitude", "depth", "magnitude"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["time"] = pd.to_datetime(df["time"])
+    df["updated"] = pd.to_datetime(df["updated"])
+    return df.dropna(subset=["time", "latitude", "longitude", "magnitude"])
+
+
+def latest_versions(events):
+    """Satu baris per event_id: versi dengan `updated` paling baru."""
+    return (events.sort_values("updated", kind="stable")
+            .drop_duplicates("event_id", keep="last")
+            .reset_index(drop=True))
+
+
+class FeedState:
+    """Cursor & validator HTTP untuk satu feed."""
+
+    def __init__(self, url, source=None):
+        self.url = url
+        self.source = source or url
+        self.updated_after = pd.Timestamp.now(tz="UTC").tz_localize(None) - INITIAL_LOOKBACK
+        self.etag = None
+        self.last_modified = None
+        self.requests = 0
+        self.not_modified = 0
+
+    def params(self):
+        # Presisi milidetik: cursor yang dibulatkan ke detik akan mengambil ulang event yang sama
+        return {"updatedafter": self.updated_after.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]}
+
+    def headers(self):
+        headers = {"Accept": "application/json"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+async def fetch_feed(session, state):
+    """Satu request bersyarat; return DataFrame event baru/berubah (boleh kosong)."""
+    state.requests += 1
+    async with session.get(state.url, params=state.params(), headers=state.headers()) as resp:
+        if resp.status in (204, 304):      # FDSN: 204 = tidak ada event
+            state.not_modified += resp.status == 304
+            return parse_geojson({}, state.source)
+        resp.raise_for_status()
+        data = await resp.json(content_type=None)
+        state.etag = resp.headers.get("ETag", state.etag)
+        state.last_modified = resp.headers.get("Last-Modified", state.last_modified)
+
+    events = parse_geojson(data, state.source)
+    if not events.empty:
+        # Cursor maju ke update terbaru yang sudah diterima
+        state.updated_after = max(state.updated_after, events["updated"].max())
+    return events
+
+
+async def poll_once(session, states):
+    """Ambil semua feed secara bersamaan; feed yang gagal tidak menghentikan yang lain."""
+    results = await asyncio.gather(*(fetch_feed(session, s) for s in states), return_exceptions=True)
+    frames = []
+    for state, result in zip(states, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Feed {state.source} gagal: {result}")
+        elif not result.empty:
+            frames.append(result)
+    return latest_versions(pd.concat(frames, ignore_index=True)) if frames else None
+
+
+class FeedPoller:
+    def __init__(self, feeds, on_events, interval=POLL_INTERVAL_SECONDS):
+        self.states = [FeedState(FEED_PRESETS.get(f, f), source=f.upper() if f in FEED_PRESETS else None)
+                       for f in feeds]
+        self.on_events = on_events
+        self.interval = interval
+        self.seen = {}             # event_id -> updated terakhir yang sudah di-ingest
+        self._stop = threading.Event()
+
+    def _unseen(self, events):
+        """Buang event yang versi `updated`-nya sudah pernah diteruskan."""
+        known = pd.to_datetime(events["event_id"].map(self.seen))
+        fresh = events[known.isna() | (events["updated"] > known)]
+        self.seen.update(zip(fresh["event_id"], fresh["updated"]))
+        return fresh
+
+    async def run(self, iterations=None):
+        import aiohttp
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+        connector = aiohttp.TCPConnector(limit_per_host=2, keepalive_timeout=self.interval * 2)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            count = 0
+            while not self._stop.is_set() and (iterations is None or count < iterations):
+                count += 1
+                started = time.perf_counter()
+                events = await poll_once(session, self.states)
+                if events is not None:
+                    events = self._unseen(events)
+                if events is not None and not events.empty:
+                    try:
+                        self.on_events(events)
+                    except Exception as e:
+                        print(f"⚠️ Ingestion feed gagal: {e}")
+                await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def stop(self):
+        self._stop.set()
+
+
+class LeaderLock:
+    """Lock file non-blocking: hanya satu proses per host yang memegangnya.
+
+    Lock dilepas OS saat proses mati, jadi worker lain bisa mengambil alih.
+    """
+
+    def __init__(self, path=LEADER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    def try_acquire(self):
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        self._file = f
+        return True
+
+
+def start_in_thread(on_events, feeds=None, interval=None, on_leader=None):
+    """Jalankan poller di thread daemon (event loop sendiri). Return poller atau None.
+
+    Thread menunggu LeaderLock dulu; on_leader() dipanggil sekali saat proses
+    ini menjadi poller (mis. replay event feed yang belum ada di store).
+    """
+    feeds = feeds or [f.strip() for f in os.environ.get("SEISMO_FEEDS", "").split(",") if f.strip()]
+    if not feeds:
+        return None
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        print("⚠️ aiohttp belum terpasang, poller feed tidak dijalankan.")
+        return None
+    interval = interval or int(os.environ.get("SEISMO_POLL_SECONDS", POLL_INTERVAL_SECONDS))
+    poller = FeedPoller(feeds, on_events, interval)
+    lock = LeaderLock()
+
+    def run():
+        while not lock.try_acquire():
+            time.sleep(interval)
+        if on_leader is not None:
+            try:
+                on_leader()
+            except Exception as e:
+                print(f"⚠️ Replay event feed gagal: {e}")
+        asyncio.run(poller.run())
+
+    threading.Thread(target=run, name="feed-poller", daemon=True).start()
+    return poller
+
+
+# ----------------------------------------------------------------------
+#                  PENYIMPANAN EVENT FEED (upsert per id)
+# ----------------------------------------------------------------------
+def load_feed_events(path=FEED_EVENTS_PATH):
+    try:
+        df = pd.read_csv(path, parse_dates=["time", "updated"], dtype={"event_id": str})
+    except FileNotFoundError:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return df
+
+
+@contextmanager
+def _write_lock(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def save_feed_events(events, path=FEED_EVENTS_PATH):
+    """Upsert event ke file feed (ditulis atomik); dipakai lagi saat dataset di-build ulang.
+
+    Read-modify-write dijaga lock file antar proses supaya tidak ada update yang hilang.
+    """
+    with _write_lock(path):
+        merged = latest_versions(pd.concat([load_feed_events(path), events[EVENT_COLUMNS]], ignore_index=True))
+        tmp = f"{path}.tmp-{os.getpid()}"
+        merged.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    return merged
+
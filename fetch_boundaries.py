@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import urllib.error
+import urllib.request
+
+import admin_regions
+
+# ======================================================================
+#      UNDUH POLYGON BATAS ADMINISTRASI (geoBoundaries IDN ADM1/ADM2/ADM3)
+# ======================================================================
+# admin_regions butuh GeoJSON batas provinsi (dan opsional kab/kota,
+# kecamatan) di BOUNDARY_FILES. File itu tidak ikut di repo (ADM2/ADM3
+# puluhan MB); skrip ini mengambil versi yang sudah disederhanakan dari API
+# geoBoundaries (lisensi CC BY 4.0, cantumkan atribusi) dan menulisnya
+# secara atomik, jadi watcher dataset langsung memicu reload:
+#
+#   python fetch_boundaries.py                          # provinsi + kab/kota
+#   python fetch_boundaries.py --levels province,regency,district
+#   python fetch_boundaries.py --full                   # geometri penuh (besar)
+
+API_URL = "https://www.geoboundaries.org/api/current/gbOpen/IDN/{adm}/"
+ADM_LEVELS = {"province": "ADM1", "regency": "ADM2", "district": "ADM3"}
+DEFAULT_LEVELS = "province,regency"
+USER_AGENT = "SeismoTrack/1.0 (boundary fetch)"
+REQUEST_TIMEOUT_SECONDS = 120
+
+
+def _get(url):
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT_SECONDS) as resp:
+        return resp.read()
+
+
+def fetch_level(level, full=False, api_url=API_URL):
+    """Unduh satu level ke BOUNDARY_FILES[level]; return jumlah polygon."""
+    meta = json.loads(_get(api_url.format(adm=ADM_LEVELS[level])))
+    url = meta["gjDownloadURL"] if full else meta.get("simplifiedGeometryGeoJSON") or meta["gjDownloadURL"]
+    raw = _get(url)
+    features = json.loads(raw).get("features") or []
+    if not features:
+        raise ValueError(f"{url} tidak berisi fitur GeoJSON")
+
+    path = admin_regions.BOUNDARY_FILES[level]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)
+    print(f"✅ {level}: {len(features)} polygon ({meta.get('boundaryYearRepresented', '?')}) -> {path}")
+    return len(features)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Unduh polygon batas administrasi Indonesia (geoBoundaries)")
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help="province,regency,district")
+    parser.add_argument("--full", action="store_true", help="geometri penuh, bukan versi disederhanakan")
+    parser.add_argument("--api-url", default=API_URL, help="template URL metadata ({adm} = ADM1/ADM2/ADM3)")
+    args = parser.parse_args()
+
+    failed = False
+    for level in [lv.strip() for lv in args.levels.split(",") if lv.strip()]:
+        if level not in ADM_LEVELS:
+            parser.error(f"level tidak dikenal: {level}")
+        try:
+            fetch_level(level, full=args.full, api_url=args.api_url)
+        except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Gagal mengunduh {level}: {e}")
+            failed = True
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,361 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import event_table
+
+# ======================================================================
+#                 HEATMAP PYRAMID (kepadatan & momen seismik)
+# ======================================================================
+# Grid lat/lon reguler di atas wilayah Indonesia. Level 0 paling kasar,
+# setiap level berikutnya membagi sel menjadi 2x2. Grid paling halus
+# dihitung sekali dari event, level lain hasil penjumlahan (downsample).
+# Versi hasil upsert feed tidak dibangun ulang: pyramid versi induk disalin,
+# baris yang diganti dikurangi, baris upsert ditambah, dan tile cache yang
+# tidak tersentuh ikut dibawa ke versi baru.
+
+GRID_BOUNDS = {"lon_min": 90.0, "lon_max": 145.0, "lat_min": -15.0, "lat_max": 10.0}
+BASE_CELL_DEG = 0.5          # ukuran sel di level 0
+MAX_LEVEL = 3                # level 3 = 0.0625° (~7 km)
+TILE_SIZE = 32               # jumlah sel per sisi tile
+SMOOTH_KERNEL = np.array([1, 4, 6, 4, 1], dtype=np.float32) / 16.0  # ~gaussian, sigma 1 sel
+HALO = len(SMOOTH_KERNEL) // 2
+
+METRICS = ("count", "moment")
+
+# Preset filter yang umum dipakai: batas bawah magnitudo x jendela tahun
+MAG_PRESETS = {"all": None, "m4": 4.0, "m5": 5.0}
+YEAR_PRESETS = {"all": None, "5y": 5}
+
+
+def seismic_moment(magnitude):
+    """Momen seismik (N·m) dari magnitudo momen, Hanks & Kanamori."""
+    return np.power(10.0, 1.5 * np.asarray(magnitude, dtype=np.float64) + 9.1)
+
+
+def cell_deg(level):
+    return BASE_CELL_DEG / (2 ** level)
+
+
+def grid_shape(level):
+    d = cell_deg(level)
+    nx = int(np.ceil((GRID_BOUNDS["lon_max"] - GRID_BOUNDS["lon_min"]) / d))
+    ny = int(np.ceil((GRID_BOUNDS["lat_max"] - GRID_BOUNDS["lat_min"]) / d))
+    return ny, nx
+
+
+def zoom_to_level(zoom):
+    """Pilih level pyramid supaya satu sel kira-kira 5-10 piksel di layar."""
+    if zoom is None:
+        return 0
+    return int(min(max(round(zoom) - 4, 0), MAX_LEVEL))
+
+
+def _preset_mask(df, preset, max_year=None):
+    mag_key, year_key = preset
+    mask = np.ones(len(df), dtype=bool)
+    mag_min = MAG_PRESETS[mag_key]
+    if mag_min is not None:
+        mask &= (df["magnitude"] >= mag_min).to_numpy()
+    n_years = YEAR_PRESETS[year_key]
+    if n_years is not None and len(df):
+        years = event_table.years(df)
+        max_year = years.max() if max_year is None else max_year
+        mask &= (years > max_year - n_years).to_numpy()
+    return mask
+
+
+def preset_for_filter(mag_range, years, start_year, end_year, max_year):
+    """Cari preset terdekat (tidak lebih ketat) untuk kombinasi filter di UI."""
+    mag_key = "all"
+    if mag_range:
+        for key, mag_min in MAG_PRESETS.items():
+            if mag_min is not None and mag_range[0] >= mag_min:
+                mag_key = key
+    if years:
+        first_year = min(years)
+    elif start_year is not None:
+        first_year = start_year
+    else:
+        first_year = max_year - 4
+    year_key = "5y" if first_year is not None and first_year > max_year - 5 else "all"
+    return mag_key, year_key
+
+
+class _LRUCache:
+    """Cache LRU sederhana yang aman dipakai lintas thread."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def carry(self, old_version, new_version, predicate):
+        """Salin entri versi lama yang lolos predicate ke key versi baru."""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == old_version and predicate(k)]:
+                self._data[(new_version,) + key[1:]] = self._data[key]
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+
+class HeatmapPyramid:
+    """Pyramid grid multi-resolusi untuk satu versi dataset dan satu preset."""
+
+    def __init__(self, max_year=None):
+        self.max_year = max_year          # batas jendela preset tahun saat dibangun
+        self.levels = {
+            metric: [np.zeros(grid_shape(lvl), dtype=np.float32) for lvl in range(MAX_LEVEL + 1)]
+            for metric in METRICS
+        }
+
+    def copy(self):
+        clone = HeatmapPyramid.__new__(HeatmapPyramid)
+        clone.max_year = self.max_year
+        clone.levels = {metric: [grid.copy() for grid in grids] for metric, grids in self.levels.items()}
+        return clone
+
+    def add_events(self, lat, lon, magnitude, sign=1.0):
+        """Tambahkan (sign=-1: kurangi) event ke semua level; return set (level, ty, tx) yang berubah."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        mag = np.asarray(magnitude, dtype=np.float64)
+        ny, nx = grid_shape(MAX_LEVEL)
+        d = cell_deg(MAX_LEVEL)
+        ix = np.floor((lon - GRID_BOUNDS["lon_min"]) / d).astype(np.int64)
+        iy = np.floor((lat - GRID_BOUNDS["lat_min"]) / d).astype(np.int64)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny) & np.isfinite(mag)
+        ix, iy, mag = ix[inside], iy[inside], mag[inside]
+        weights = {"count": np.full(len(mag), sign, dtype=np.float32),
+                   "moment": (sign * seismic_moment(mag)).astype(np.float32)}
+
+        touched = set()
+        for lvl in range(MAX_LEVEL + 1):
+            shift = MAX_LEVEL - lvl
+            lx, ly = ix >> shift, iy >> shift
+            lny, lnx = grid_shape(lvl)
+            flat = ly * lnx + lx
+            # bincount jauh lebih cepat daripada np.add.at untuk jutaan event
+            for metric in METRICS:
+                grid = self.levels[metric][lvl]
+                grid += np.bincount(flat, weights=weights[metric], minlength=lny * lnx).reshape(lny, lnx).astype(np.float32)
+            if sign < 0:
+                # Sisa pembulatan float32 setelah pengurangan: sel kosong harus benar-benar 0
+                empty = self.levels["count"][lvl] <= 0.5
+                for metric in METRICS:
+                    grid = self.levels[metric][lvl]
+                    grid[empty] = 0.0
+                    np.maximum(grid, 0.0, out=grid)
+            n_tx = -(-lnx // TILE_SIZE)
+            for tile_id in np.unique((ly // TILE_SIZE) * n_tx + lx // TILE_SIZE):
+                touched.add((lvl, int(tile_id // n_tx), int(tile_id % n_tx)))
+        return touched
+
+    def smoothed_tile(self, metric, level, ty, tx):
+        """Tile TILE_SIZE x TILE_SIZE yang sudah dihaluskan (dengan halo dari tetangga)."""
+        grid = self.levels[metric][level]
+        ny, nx = grid.shape
+        y0, x0 = ty * TILE_SIZE - HALO, tx * TILE_SIZE - HALO
+        size = TILE_SIZE + 2 * HALO
+        block = np.zeros((size, size), dtype=np.float32)
+        sy0, sx0 = max(y0, 0), max(x0, 0)
+        sy1, sx1 = min(y0 + size, ny), min(x0 + size, nx)
+        if sy1 > sy0 and sx1 > sx0:
+            block[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = grid[sy0:sy1, sx0:sx1]
+
+        # Gaussian terpisah: horizontal lalu vertikal
+        rows = sum(w * block[:, k:k + TILE_SIZE] for k, w in enumerate(SMOOTH_KERNEL))
+        return sum(w * rows[k:k + TILE_SIZE, :] for k, w in enumerate(SMOOTH_KERNEL))
+
+
+# ----------------------------------------------------------------------
+#                         REGISTRY & CACHE
+# ----------------------------------------------------------------------
+_pyramids = {}                    # (version, preset) -> HeatmapPyramid
+_pyramid_lock = threading.Lock()
+_tile_cache = _LRUCache(maxsize=2048)
+
+
+def _max_year(df):
+    return int(event_table.years(df).max()) if len(df) else None
+
+
+def _build_pyramid(df, preset, max_year):
+    sub = df[_preset_mask(df, preset, max_year)]
+    pyramid = HeatmapPyramid(max_year)
+    pyramid.add_events(sub["latitude"], sub["longitude"], sub["magnitude"])
+    return pyramid
+
+
+def build_pyramids(df, version):
+    """Precompute pyramid untuk semua preset pada satu versi dataset (snap.version)."""
+    max_year = _max_year(df)
+    built = {(version, (mag_key, year_key)): _build_pyramid(df, (mag_key, year_key), max_year)
+             for mag_key in MAG_PRESETS for year_key in YEAR_PRESETS}
+    with _pyramid_lock:
+        _pyramids.update(built)
+    return version
+
+
+def update(snap):
+    """Pyramid untuk versi baru: inkremental dari versi induk kalau snapshot hasil upsert.
+
+    Preset jendela tahun ("5y") dibangun ulang kalau tahun terakhir dataset
+    bergeser, karena event lama keluar dari jendela.
+    """
+    with _pyramid_lock:
+        parent = {k[1]: p for k, p in _pyramids.items() if snap.parent_version and k[0] == snap.parent_version}
+    if snap.upserted is None or len(parent) < len(MAG_PRESETS) * len(YEAR_PRESETS):
+        return build_pyramids(snap.df, snap.version)
+
+    max_year = _max_year(snap.df)
+    carried, rebuilt = {}, {}
+    for preset, pyramid in parent.items():
+        if YEAR_PRESETS[preset[1]] is not None and pyramid.max_year != max_year:
+            rebuilt[(snap.version, preset)] = _build_pyramid(snap.df, preset, max_year)
+        else:
+            carried[(snap.version, preset)] = pyramid.copy()
+    with _pyramid_lock:
+        _pyramids.update(carried)
+        _pyramids.update(rebuilt)
+    presets = {key[1] for key in carried}
+    _tile_cache.carry(snap.parent_version, snap.version, lambda k: k[1] in presets)
+    add_events(snap.version, snap.upserted, max_year, removed=snap.replaced, presets=presets)
+    return snap.version
+
+
+def evict_except(version):
+    """Buang pyramid & tile versi lain (dipanggil setelah versi baru aktif)."""
+    with _pyramid_lock:
+        for key in [k for k in _pyramids if k[0] != version]:
+            del _pyramids[key]
+    _tile_cache.discard(lambda k: k[0] != version)
+
+
+def add_events(version, new_events, max_year=None, removed=None, presets=None):
+    """Update pyramid secara inkremental: tambah event baru, kurangi event `removed`."""
+    with _pyramid_lock:
+        items = [(k, p) for k, p in _pyramids.items()
+                 if k[0] == version and (presets is None or k[1] in presets)]
+    for (ver, preset), pyramid in items:
+        touched = set()
+        for events, sign in ((removed, -1.0), (new_events, 1.0)):
+            if events is None or events.empty:
+                continue
+            sub = events[_preset_mask(events, preset, max_year)]
+            if not sub.empty:
+                touched |= pyramid.add_events(sub["latitude"], sub["longitude"], sub["magnitude"], sign)
+        if not touched:
+            continue
+        # Tile tetangga ikut berubah karena halo smoothing
+        stale = {(lvl, ty + dy, tx + dx) for lvl, ty, tx in touched
+                 for dy in (-1, 0, 1) for dx in (-1, 0, 1)}
+        _tile_cache.discard(lambda k, ver=ver, preset=preset: (
+            k[0] == ver and k[1] == preset and (k[3], k[4], k[5]) in stale))
+
+
+def _view_bounds(view):
+    lon_min = max(view["lon_min"], GRID_BOUNDS["lon_min"])
+    lon_max = min(view["lon_max"], GRID_BOUNDS["lon_max"])
+    lat_min = max(view["lat_min"], GRID_BOUNDS["lat_min"])
+    lat_max = min(view["lat_max"], GRID_BOUNDS["lat_max"])
+    return lon_min, lon_max, lat_min, lat_max
+
+
+def get_cells(version, preset, metric, zoom, view):
+    """Ambil sel grid (lat, lon, nilai) yang terlihat di viewport dari cache tile."""
+    with _pyramid_lock:
+        pyramid = _pyramids.get((version, preset))
+    if pyramid is None:
+        return pd.DataFrame(columns=["latitude", "longitude", "value"]), 0
+
+    level = zoom_to_level(zoom)
+    d = cell_deg(level)
+    ny, nx = grid_shape(level)
+    lon_min, lon_max, lat_min, lat_max = _view_bounds(view)
+    if lon_min >= lon_max or lat_min >= lat_max:
+        return pd.DataFrame(columns=["latitude", "longitude", "value"]), level
+
+    tx0 = int((lon_min - GRID_BOUNDS["lon_min"]) / d) // TILE_SIZE
+    tx1 = min(int((lon_max - GRID_BOUNDS["lon_min"]) / d), nx - 1) // TILE_SIZE
+    ty0 = int((lat_min - GRID_BOUNDS["lat_min"]) / d) // TILE_SIZE
+    ty1 = min(int((lat_max - GRID_BOUNDS["lat_min"]) / d), ny - 1) // TILE_SIZE
+
+    lats, lons, values = [], [], []
+    for ty in range(ty0, ty1 + 1):
+        for tx in range(tx0, tx1 + 1):
+            key = (version, preset, metric, level, ty, tx)
+            cells = _tile_cache.get(key)
+            if cells is None:
+                tile = pyramid.smoothed_tile(metric, level, ty, tx)
+                yy, xx = np.nonzero(tile > 0)
+                cells = (
+                    GRID_BOUNDS["lat_min"] + (ty * TILE_SIZE + yy + 0.5) * d,
+                    GRID_BOUNDS["lon_min"] + (tx * TILE_SIZE + xx + 0.5) * d,
+                    tile[yy, xx],
+                )
+                _tile_cache.put(key, cells)
+            lats.append(cells[0])
+            lons.append(cells[1])
+            values.append(cells[2])
+
+    if not lats:
+        return pd.DataFrame(columns=["latitude", "longitude", "value"]), level
+    cells_df = pd.DataFrame({
+        "latitude": np.concatenate(lats),
+        "longitude": np.concatenate(lons),
+        "value": np.concatenate(values),
+    })
+    if metric == "moment":
+        # Momen seismik rentangnya belasan orde, tampilkan dalam log10
+        cells_df["value"] = np.log10(cells_df["value"].clip(lower=1.0))
+    return cells_df, level
+
+
+def view_from_relayout(relayout_data, center, zoom, width_px=900, height_px=500):
+    """Hitung bounding box viewport dari relayoutData mapbox (atau center+zoom)."""
+    if isinstance(relayout_data, dict):
+        derived = relayout_data.get("mapbox._derived", {}).get("coordinates")
+        if derived:
+            lons = [c[0] for c in derived]
+            lats = [c[1] for c in derived]
+            return {"lon_min": min(lons), "lon_max": max(lons),
+                    "lat_min": min(lats), "lat_max": max(lats)}
+        if "mapbox.center" in relayout_data:
+            center = relayout_data["mapbox.center"]
+        if "mapbox.zoom" in relayout_data:
+            zoom = relayout_data["mapbox.zoom"]
+    deg_per_px = 360.0 / (256 * 2 ** zoom)
+    half_w, half_h = width_px / 2 * deg_per_px, height_px / 2 * deg_per_px
+    return {"lon_min": center["lon"] - half_w, "lon_max": center["lon"] + half_w,
+            "lat_min": center["lat"] - half_h, "lat_max": center["lat"] + half_h}
+
+
+def cache_info():
+    return {"pyramids": len(_pyramids), "tiles": len(_tile_cache._data),
+            "hits": _tile_cache.hits, "misses": _tile_cache.misses}
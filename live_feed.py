@@ -0,0 +1,121 @@
+import collections
+import itertools
+import json
+import queue
+import threading
+
+import pandas as pd
+from flask import Response, stream_with_context
+
+import event_table
+
+# ======================================================================
+#            LIVE FEED (server-sent events ke dashboard yang terbuka)
+# ======================================================================
+# Event baru hasil ingestion dikirim ke semua tab yang terbuka lewat SSE
+# (/stream/events). Payload diserialisasi SEKALI per batch lalu frame yang
+# sama dimasukkan ke antrian setiap subscriber, jadi biaya per viewer hanya
+# satu put ke queue — tidak ada filter ulang atau figure baru per tab.
+# Browser menambahkan titik ke peta & memperbarui kartu statistik sendiri.
+#
+# Koneksi SSE menahan satu thread; jalankan gunicorn dengan worker thread
+# (-k gthread --threads N) atau gevent untuk ratusan viewer.
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 100          # subscriber yang tertinggal sejauh ini diputus
+REPLAY_FRAMES = 200       # untuk reconnect dengan Last-Event-ID
+
+EVENT_FIELDS = ["time", "latitude", "longitude", "depth", "magnitude", "place", "province"]
+
+
+class LiveFeed:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._recent = collections.deque(maxlen=REPLAY_FRAMES)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, kind, payload):
+        """Kirim satu frame ke semua subscriber; return jumlah penerima."""
+        with self._lock:
+            event_id = next(self._ids)
+            frame = f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+            self._recent.append((event_id, frame))
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                # Klien lambat: putus, browser akan reconnect dan replay dari Last-Event-ID
+                self._unsubscribe(q)
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+        return len(subscribers)
+
+    def _unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def stream(self, last_event_id=None):
+        """Generator frame SSE untuk satu koneksi."""
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            missed = [frame for event_id, frame in self._recent
+                      if last_event_id is not None and event_id > last_event_id]
+            self._subscribers.add(q)
+        try:
+            yield b"retry: 3000\n\n"
+            for frame in missed:
+                yield frame
+            while True:
+                try:
+                    frame = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield b": ping\n\n"      # jaga koneksi tetap hidup lewat proxy
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._unsubscribe(q)
+
+    def response(self, last_event_id=None):
+        return Response(
+            stream_with_context(self.stream(last_event_id)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+def events_payload(new_events, version):
+    """Event baru + delta agregat per provinsi, siap dikirim sebagai satu frame."""
+    new_events = event_table.display(new_events)      # float32 -> float biasa untuk JSON
+    events = new_events[EVENT_FIELDS].sort_values("time").copy()
+    events["time"] = events["time"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    events["province"] = events["province"].astype(str)
+    by_province = (
+        new_events.assign(province=new_events["province"].astype(str))
+        .groupby("province")
+        .agg(count=("magnitude", "size"), magnitude_sum=("magnitude", "sum"),
+             max_depth=("depth", "max"), min_depth=("depth", "min"))
+    )
+    return {
+        "version": version,
+        "events": events.astype(object).where(events.notna(), None).to_dict("list"),
+        "delta": {"count": int(len(new_events)), "by_province": by_province.to_dict("index")},
+    }
+
+
+def new_events_since(df, last_time):
+    """Baris yang lebih baru dari last_time (waktu maks snapshot sebelumnya)."""
+    if last_time is None:
+        return df.iloc[0:0]
+    return df[df["time"] > pd.Timestamp(last_time)]
+
+
+feed = LiveFeed()
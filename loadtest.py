@@ -0,0 +1,378 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import numpy as np
+
+# ======================================================================
+#            LOAD TEST (banyak user simultan ke /_dash-update-component)
+# ======================================================================
+# Mensimulasikan operator yang membuka overview lalu berinteraksi seperti di
+# browser: ganti filter provinsi, geser slider magnitudo beberapa kali, klik
+# peta, reset view dan download. Setiap perubahan input memicu callback
+# server yang sama seperti renderer Dash (semua callback yang input-nya
+# berubah, dengan changedPropIds), jadi beban per aksi realistis.
+#
+# Jumlah user dinaikkan bertahap (default 1,10,50,100,200); per tahap
+# dicatat throughput, latensi p50/p95/p99 dan error rate per callback.
+#
+#   python loadtest.py                                   # WSGI test client (in-process)
+#   python loadtest.py --url http://127.0.0.1:8050 --users 1,10,50 --duration 60
+#
+# Mode in-process berguna untuk membandingkan perubahan kode; untuk sizing
+# worker gunicorn pakai --url ke server sungguhan dengan konfigurasi produksi.
+
+DEFAULT_USERS = "1,10,50,100,200"
+DEFAULT_DURATION_SECONDS = 30
+DEFAULT_THINK_SECONDS = 1.0
+RESULTS_PATH = "data/bench/loadtest-latest.json"
+
+# Nama callback per output pertama (sama dengan nama fungsi di dashv2)
+CALLBACK_NAMES = {
+    "page-content": "display_page",
+    "total-quakes": "update_dashboard",
+    "download-btn": "update_download_link",
+    "swarm-alerts": "update_swarm_alerts",
+    "cross-section-graph": "update_cross_section",
+    "region-path": "navigate_region",
+    "region-breadcrumb": "update_region_view",
+    "evacuation-map": "update_evacuation_map",
+    "posko-import-feedback": "import_posko_file",
+    "articles-list": "manage_articles",
+    "cluster-result": "run_cluster_analysis",
+}
+
+# Prop besar yang tidak berisi komponen (tidak perlu ditelusuri)
+SKIP_PROPS = {"figure", "data", "options", "marks", "style", "columns"}
+
+# Input filter yang lewat route_filter (clientside) di dashv2: di mode
+# client-side tidak ada request sama sekali, di mode server diteruskan lewat
+# filter-request. Session meniru keputusan router ini.
+ROUTED_PROPS = ("mag-filter.value", "year-filter.value", "start-year.value", "end-year.value")
+CLIENT_FILTER = "client_filter"
+
+# Aksi user dan bobotnya
+ACTIONS = {"filter": 3, "slider": 3, "click_map": 2, "reset": 1, "download": 1}
+
+
+# ----------------------------------------------------------------------
+#                              TRANSPORT
+# ----------------------------------------------------------------------
+class WsgiTransport:
+    """Flask test client (satu per user); tanpa jaringan, satu proses."""
+
+    def __init__(self, server):
+        self.client = server.test_client()
+
+    def get(self, path, headers=None):
+        resp = self.client.get(path, headers=headers or {})
+        return resp.status_code, resp.get_data(), resp.headers
+
+    def post_json(self, path, body):
+        resp = self.client.post(path, data=json.dumps(body), content_type="application/json")
+        return resp.status_code, resp.get_data()
+
+
+class HttpTransport:
+    """Satu koneksi keep-alive per user ke server lokal."""
+
+    def __init__(self, base_url):
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.conn = None
+
+    def _request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                resp = self.conn.getresponse()
+                return resp.status, resp.read(), resp.headers
+            except (http.client.HTTPException, ConnectionError):
+                # Koneksi keep-alive ditutup server: buka ulang sekali
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def get(self, path, headers=None):
+        return self._request("GET", path, headers=headers)
+
+    def post_json(self, path, body):
+        return self._request("POST", path, json.dumps(body), {"Content-Type": "application/json"})[:2]
+
+
+# ----------------------------------------------------------------------
+#                       STATE KOMPONEN & CALLBACK
+# ----------------------------------------------------------------------
+def _outputs(dep):
+    spec = dep["output"]
+    if spec.startswith(".."):
+        parts = spec[2:-2].split("...")
+        return [dict(zip(("id", "property"), p.split("@")[0].rsplit(".", 1))) for p in parts]
+    return dict(zip(("id", "property"), spec.rsplit(".", 1)))
+
+
+def callback_name(dep):
+    first = dep["output"].strip(".").split(".")[0]
+    return CALLBACK_NAMES.get(first, first)
+
+
+def collect_props(node, values, options):
+    """Ambil nilai awal (dan options) semua komponen ber-id dari layout JSON."""
+    if isinstance(node, list):
+        for child in node:
+            collect_props(child, values, options)
+    elif isinstance(node, dict):
+        props = node.get("props")
+        if isinstance(props, dict):
+            component_id = props.get("id")
+            for prop, value in props.items():
+                if isinstance(component_id, str):
+                    values[f"{component_id}.{prop}"] = value
+                    if prop == "options":
+                        options[component_id] = value
+                if isinstance(value, (list, dict)) and prop not in SKIP_PROPS:
+                    collect_props(value, values, options)
+
+
+class Session:
+    """Satu user simulasi: state komponen di browser + pemicu callback."""
+
+    def __init__(self, transport, dependencies, record, rng):
+        self.transport = transport
+        self.deps = [d for d in dependencies if not d.get("clientside_function")]
+        self.record = record
+        self.rng = rng
+        self.values = {"url.pathname": "/"}
+        self.options = {}
+        self.etags = {}           # cache HTTP browser untuk /_pages/<route>
+
+    def _call(self, dep, changed):
+        inputs = [{**i, "value": self.values.get(f"{i['id']}.{i['property']}")} for i in dep["inputs"]]
+        state = [{**s, "value": self.values.get(f"{s['id']}.{s['property']}")} for s in dep["state"]]
+        body = {"output": dep["output"], "outputs": _outputs(dep), "inputs": inputs,
+                "state": state, "changedPropIds": changed}
+        name = callback_name(dep)
+        started = time.perf_counter()
+        try:
+            status, data = self.transport.post_json("/_dash-update-component", body)
+        except Exception:
+            self.record(name, time.perf_counter() - started, False, 0)
+            return
+        elapsed = time.perf_counter() - started
+        ok = status in (200, 204)     # 204 = PreventUpdate
+        self.record(name, elapsed, ok, len(data))
+        if status == 200:
+            response = json.loads(data).get("response", {})
+            for component_id, props in response.items():
+                for prop, value in props.items():
+                    self.values[f"{component_id}.{prop}"] = value
+                    if prop == "children":
+                        collect_props(value, self.values, self.options)
+
+    def fire(self, changed, initial=False):
+        """Jalankan semua callback server yang punya input di `changed`."""
+        changed = set(changed)
+        for dep in self.deps:
+            keys = {f"{i['id']}.{i['property']}" for i in dep["inputs"]}
+            if initial:
+                # Initial call: semua komponen input ada di layout dan tidak prevent_initial_call
+                present = all(f"{i['id']}.id" in self.values for i in dep["inputs"])
+                if dep.get("prevent_initial_call") or not present or "url.pathname" in keys:
+                    continue
+                self._call(dep, [])
+            elif keys & changed:
+                self._call(dep, sorted(keys & changed))
+
+    def client_mode(self):
+        """Sama dengan route_filter: cakupan ada di browser dan layer titik."""
+        scope = self.values.get("client-scope.data")
+        stats = self.values.get("overview-stats.data") or {}
+        return bool(scope and stats.get("client_scope") and self.values.get("map-layer.value") == "points"
+                    and scope["version"] == stats["client_scope"]["version"]
+                    and scope["key"] == sorted(self.values.get("province-filter.value") or []))
+
+    def set(self, props):
+        """Ubah prop komponen ({"id.prop": nilai}) seperti interaksi di browser."""
+        self.values.update(props)
+        changed = list(props)
+        if any(p in props for p in ROUTED_PROPS):
+            changed = [p for p in changed if p not in ROUTED_PROPS]
+            if self.client_mode():
+                self.record(CLIENT_FILTER, 0.0, True, 0)
+            else:
+                self.values["filter-request.data"] = {
+                    "mag_range": self.values.get("mag-filter.value"), "years": self.values.get("year-filter.value"),
+                    "start_year": self.values.get("start-year.value"), "end_year": self.values.get("end-year.value")}
+                changed.append("filter-request.data")
+        self.fire(changed)
+
+    def navigate(self, path):
+        """display_page (clientside): fetch layout halaman, revalidasi dengan ETag seperti browser."""
+        url = "/_pages/" + path.strip("/")
+        cached = self.etags.get(url)
+        started = time.perf_counter()
+        try:
+            status, data, headers = self.transport.get(url, {"If-None-Match": cached[0]} if cached else None)
+        except Exception:
+            self.record(CALLBACK_NAMES["page-content"], time.perf_counter() - started, False, 0)
+            return
+        self.record(CALLBACK_NAMES["page-content"], time.perf_counter() - started, status in (200, 304), len(data))
+        if status == 200:
+            cached = self.etags[url] = (headers.get("ETag"), json.loads(data))
+        if cached:
+            self.values["url.pathname"] = path
+            collect_props(cached[1], self.values, self.options)
+
+    def open_page(self):
+        status, data, _ = self.transport.get("/_dash-layout")
+        if status == 200:
+            collect_props(json.loads(data), self.values, self.options)
+        self.navigate("/")
+        self.fire(["url.pathname"])
+        self.fire([], initial=True)
+
+    # --- aksi user -----------------------------------------------------
+    def action_filter(self):
+        provinces = [o["value"] if isinstance(o, dict) else o for o in self.options.get("province-filter", [])]
+        choice = self.rng.sample(provinces, k=min(len(provinces), self.rng.randint(1, 3))) if provinces else []
+        self.set({"province-filter.value": choice})
+
+    def action_slider(self):
+        low, high = self.values.get("mag-filter.min", 2.5), self.values.get("mag-filter.max", 9.0)
+        # Geser beberapa kali berturut-turut (updatemode mouseup: satu request per lepas)
+        for _ in range(self.rng.randint(2, 4)):
+            start = round(self.rng.uniform(low, (low + high) / 2), 1)
+            self.set({"mag-filter.value": [start, high]})
+            time.sleep(self.rng.uniform(0.05, 0.3))
+
+    def action_click_map(self):
+        lat, lon = self.rng.uniform(-10, 5), self.rng.uniform(95, 140)
+        self.set({"map-graph.clickData": {"points": [{"lat": lat, "lon": lon}]}})
+
+    def action_reset(self):
+        self.set({"reset-view.n_clicks": (self.values.get("reset-view.n_clicks") or 0) + 1})
+
+    def action_download(self):
+        href = self.values.get("download-btn.href")
+        if not href:
+            return
+        started = time.perf_counter()
+        try:
+            status, data, _ = self.transport.get(href)
+        except Exception:
+            self.record("export", time.perf_counter() - started, False, 0)
+            return
+        self.record("export", time.perf_counter() - started, status == 200, len(data))
+
+
+# ----------------------------------------------------------------------
+#                              RUNNER
+# ----------------------------------------------------------------------
+def run_stage(make_transport, dependencies, users, duration, think, seed):
+    samples = []                  # (nama, detik, ok, bytes)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def record(name, elapsed, ok, size):
+        with lock:
+            samples.append((name, elapsed, ok, size))
+
+    def user(i):
+        rng = random.Random(seed * 1000 + i)
+        time.sleep(rng.uniform(0, min(1.0, duration / 10)))     # start tidak serentak
+        session = Session(make_transport(), dependencies, record, rng)
+        session.open_page()
+        actions, weights = list(ACTIONS), list(ACTIONS.values())
+        while time.monotonic() < deadline:
+            if think:
+                time.sleep(rng.uniform(think / 2, think * 1.5))
+            getattr(session, f"action_{rng.choices(actions, weights)[0]}")()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(samples, time.monotonic() - started)
+
+
+def summarize(samples, wall_seconds):
+    by_name = defaultdict(list)
+    for name, elapsed, ok, size in samples:
+        by_name[name].append((elapsed, ok, size))
+    # Interaksi yang ditangani di browser bukan request server
+    by_name["ALL"] = [(e, ok, s) for name, e, ok, s in samples if name != CLIENT_FILTER]
+    report = {}
+    for name, rows in sorted(by_name.items()):
+        ms = np.asarray([r[0] for r in rows]) * 1000
+        errors = sum(1 for r in rows if not r[1])
+        report[name] = {
+            "requests": len(rows),
+            "rps": round(len(rows) / wall_seconds, 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 1) if len(ms) else None,
+            "p95_ms": round(float(np.percentile(ms, 95)), 1) if len(ms) else None,
+            "p99_ms": round(float(np.percentile(ms, 99)), 1) if len(ms) else None,
+            "max_ms": round(float(ms.max()), 1) if len(ms) else None,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "mean_bytes": int(np.mean([r[2] for r in rows])) if rows else 0,
+        }
+    return report
+
+
+def print_stage(users, report):
+    print(f"▶ {users} user")
+    print(f"  {'callback':<22}{'req':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'err%':>7}")
+    for name, s in report.items():
+        print(f"  {name:<22}{s['requests']:>7}{s['rps']:>9.1f}{s['p50_ms'] or 0:>9.0f}{s['p95_ms'] or 0:>9.0f}"
+              f"{s['p99_ms'] or 0:>9.0f}{s['max_ms'] or 0:>9.0f}{s['error_rate'] * 100:>7.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test callback dashboard dengan user simulasi")
+    parser.add_argument("--url", help="server lokal (mis. http://127.0.0.1:8050); default WSGI in-process")
+    parser.add_argument("--users", default=DEFAULT_USERS, help="tahap jumlah user, mis. 1,10,50")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_SECONDS, help="detik per tahap")
+    parser.add_argument("--think", type=float, default=DEFAULT_THINK_SECONDS, help="jeda rata-rata antar aksi")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", default=RESULTS_PATH)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        make_transport = lambda: HttpTransport(args.url)  # noqa: E731
+    else:
+        os.environ.setdefault("DATASET_RELOAD_SECONDS", "1000000")
+        import dashv2
+        make_transport = lambda: WsgiTransport(dashv2.server)  # noqa: E731
+
+    status, data, _ = make_transport().get("/_dash-dependencies")
+    if status != 200:
+        print(f"⚠️ Gagal mengambil /_dash-dependencies (status {status})")
+        return 1
+    dependencies = json.loads(data)
+
+    report = {"target": args.url or "wsgi", "duration": args.duration, "think": args.think, "stages": {}}
+    for users in (int(u) for u in args.users.split(",")):
+        stage = run_stage(make_transport, dependencies, users, args.duration, args.think, args.seed)
+        report["stages"][str(users)] = stage
+        print_stage(users, stage)
+
+    os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+    with open(args.save, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Hasil disimpan di {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
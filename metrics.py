@@ -0,0 +1,207 @@
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+# ======================================================================
+#            METRICS (histogram per callback, format Prometheus)
+# ======================================================================
+# Aktif dengan SEISMO_METRICS=1. Yang dicatat:
+#   dash_callback_seconds{callback}            durasi request callback end-to-end
+#   dash_callback_stage_seconds{callback,stage} tahap di dalam callback (filter, figure, ...)
+#   dash_callback_serialize_seconds{callback}  sisa waktu di luar fungsi (JSON + Flask)
+#   dash_callback_response_bytes{callback}     ukuran payload respons
+#   dash_callback_rows{callback}               jumlah baris hasil filter
+#   dash_callback_errors_total{callback}
+#   dash_page_serialize_seconds{route}          serialisasi layout halaman (sekali per versi)
+#   dash_page_bytes{route}                      ukuran JSON layout halaman
+#   <cache>_hits_total / <cache>_misses_total  dari collector (heatmap, cache halaman, dll)
+# Saat nonaktif, stage() mengembalikan context manager kosong yang dipakai
+# bersama, jadi overhead-nya hanya satu pengecekan boolean.
+
+ENABLED = os.environ.get("SEISMO_METRICS", "") == "1"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+ROWS_BUCKETS = (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name, self.help, self.buckets, self.label_names = name, help_text, buckets, label_names
+        self._series = {}     # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name, self.help, self.label_names = name, help_text, label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{{{_labels(self.label_names, labels)}}} {value}" for labels, value in items]
+        return lines
+
+
+def _escape(value):
+    """Escape nilai label sesuai format teks Prometheus (backslash, kutip, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+callback_seconds = Histogram("dash_callback_seconds", "Durasi request callback Dash", SECONDS_BUCKETS, ("callback",))
+stage_seconds = Histogram("dash_callback_stage_seconds", "Durasi tahap di dalam callback", SECONDS_BUCKETS,
+                          ("callback", "stage"))
+serialize_seconds = Histogram("dash_callback_serialize_seconds", "Waktu di luar tahap callback (serialisasi JSON, Flask)",
+                              SECONDS_BUCKETS, ("callback",))
+response_bytes = Histogram("dash_callback_response_bytes", "Ukuran payload respons callback", BYTES_BUCKETS, ("callback",))
+filtered_rows = Histogram("dash_callback_rows", "Jumlah baris hasil filter", ROWS_BUCKETS, ("callback",))
+callback_errors = Counter("dash_callback_errors_total", "Callback yang gagal (status >= 500)", ("callback",))
+page_serialize_seconds = Histogram("dash_page_serialize_seconds", "Durasi serialisasi layout halaman ke JSON",
+                                   SECONDS_BUCKETS, ("route",))
+page_bytes = Histogram("dash_page_bytes", "Ukuran JSON layout halaman", BYTES_BUCKETS, ("route",))
+
+_METRICS = [callback_seconds, stage_seconds, serialize_seconds, response_bytes, filtered_rows, callback_errors,
+            page_serialize_seconds, page_bytes]
+_collectors = []
+
+
+def register_collector(fn):
+    """fn() -> list (nama, tipe, {label: nilai}, value); dipanggil saat /metrics di-scrape."""
+    _collectors.append(fn)
+    return fn
+
+
+# ----------------------------------------------------------------------
+#                     API UNTUK KODE CALLBACK
+# ----------------------------------------------------------------------
+@contextlib.contextmanager
+def _timed_stage(callback, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, callback, name)
+        if has_request_context():
+            g.metrics_stage_seconds = g.get("metrics_stage_seconds", 0.0) + elapsed
+
+
+def stage(callback, name):
+    """`with metrics.stage("update_dashboard", "filter"):` — no-op kalau metrics nonaktif."""
+    return _timed_stage(callback, name) if ENABLED else _NULL_STAGE
+
+
+def observe_rows(callback, rows):
+    if ENABLED:
+        filtered_rows.observe(rows, callback)
+
+
+def observe_page(route, seconds, size):
+    if ENABLED:
+        page_serialize_seconds.observe(seconds, route)
+        page_bytes.observe(size, route)
+
+
+# ----------------------------------------------------------------------
+#                       FLASK HOOKS & /metrics
+# ----------------------------------------------------------------------
+def _callback_name(app):
+    body = request.get_json(silent=True) or {}
+    output = body.get("output", "")
+    entry = app.callback_map.get(output) or {}
+    fn = entry.get("callback")
+    if fn is not None:
+        return fn.__name__
+    # Fallback: id komponen output pertama
+    return output.strip(".").split(".")[0] or "unknown"
+
+
+def render():
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    typed = set()
+    for collector in _collectors:
+        for name, kind, labels, value in sorted(collector(), key=lambda sample: sample[0]):
+            if name not in typed:          # satu baris TYPE per metric family
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{{{_labels(labels.keys(), labels.values())}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def install(app):
+    """Pasang hook timing untuk /_dash-update-component dan route /metrics di app.server."""
+    server = app.server
+
+    @server.route("/metrics")
+    def metrics_view():
+        if not ENABLED:
+            return Response("# metrics nonaktif (set SEISMO_METRICS=1)\n", mimetype="text/plain")
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    if not ENABLED:
+        return
+
+    @server.before_request
+    def _start_timer():
+        if request.path.endswith("_dash-update-component"):
+            g.metrics_started = time.perf_counter()
+
+    @server.after_request
+    def _record(response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        name = _callback_name(app)
+        elapsed = time.perf_counter() - started
+        callback_seconds.observe(elapsed, name)
+        serialize_seconds.observe(max(0.0, elapsed - g.get("metrics_stage_seconds", 0.0)), name)
+        if response.status_code >= 500:
+            callback_errors.inc(name)
+        if not response.direct_passthrough:
+            response_bytes.observe(response.calculate_content_length() or 0, name)
+        return response
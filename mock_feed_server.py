@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ======================================================================
+#            MOCK FEED SERVER (pengganti FDSN untuk uji offline)
+# ======================================================================
+# Meniru endpoint FDSN event (format=geojson, gaya USGS): mendukung
+# `updatedafter`, ETag / Last-Modified (304) dan koneksi keep-alive.
+# Setiap TICK_SECONDS ditambahkan beberapa event baru di sekitar Indonesia
+# dan sebagian event lama direvisi (magnitudo berubah, `updated` naik),
+# sehingga jalur upsert ikut teruji.
+#
+#   python mock_feed_server.py --port 8765 --tick 5
+#   SEISMO_FEEDS=mock python dashv2.py
+
+DEFAULT_PORT = 8765
+TICK_SECONDS = 10
+PATH = "/fdsnws/event/1/query"
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class MockCatalog:
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.events = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.last_change = time.time()
+
+    def tick(self, new=3, revise=1):
+        """Tambah event baru dan revisi sebagian event lama."""
+        with self.lock:
+            now = _now_ms()
+            for _ in range(new):
+                event_id = f"mock{self.next_id:06d}"
+                self.next_id += 1
+                lat, lon = self.random.uniform(-10, 5), self.random.uniform(95, 140)
+                self.events[event_id] = {
+                    "type": "Feature",
+                    "id": event_id,
+                    "properties": {
+                        "mag": round(self.random.uniform(2.5, 6.5), 1),
+                        "place": f"Mock event near {lat:.1f}, {lon:.1f}",
+                        "time": now - self.random.randint(0, 60_000),
+                        "updated": now,
+                    },
+                    "geometry": {"type": "Point",
+                                 "coordinates": [round(lon, 4), round(lat, 4), round(self.random.uniform(5, 300), 1)]},
+                }
+            for event_id in self.random.sample(sorted(self.events), min(revise, len(self.events))):
+                props = self.events[event_id]["properties"]
+                props["mag"] = round(props["mag"] + self.random.choice([-0.2, -0.1, 0.1, 0.2]), 1)
+                props["updated"] = now
+            self.last_change = time.time()
+
+    def query(self, updated_after_ms=None):
+        with self.lock:
+            features = [f for f in self.events.values()
+                        if updated_after_ms is None or f["properties"]["updated"] > updated_after_ms]
+            return sorted(features, key=lambda f: f["properties"]["updated"]), self.last_change
+
+
+def _parse_time_ms(value):
+    # updatedafter = ISO 8601 UTC tanpa zona, seperti di spesifikasi FDSN
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def make_handler(catalog):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"      # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != PATH:
+                return self._send(404, b"not found", "text/plain")
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            updated_after = params.get("updatedafter")
+            features, last_change = catalog.query(_parse_time_ms(updated_after) if updated_after else None)
+            if not features:
+                return self._send(204, b"", "text/plain")   # FDSN: tidak ada event
+
+            features_json = json.dumps(features)
+            body = ('{"type": "FeatureCollection", "metadata": %s, "features": %s}' % (
+                json.dumps({"generated": _now_ms(), "count": len(features)}), features_json)).encode()
+            # ETag dari isi event saja (metadata.generated selalu berubah)
+            etag = '"' + hashlib.sha1(features_json.encode()).hexdigest()[:16] + '"'
+            last_modified = formatdate(last_change, usegmt=True)
+            # If-None-Match lebih diutamakan; If-Modified-Since hanya kalau tidak ada ETag
+            if_none_match, since = self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")
+            if (if_none_match == etag if if_none_match else
+                    since and parsedate_to_datetime(since).timestamp() >= int(last_change)):
+                return self._send(304, b"", None, {"ETag": etag, "Last-Modified": last_modified})
+            self._send(200, body, "application/json", {"ETag": etag, "Last-Modified": last_modified})
+
+        def _send(self, status, body, content_type, headers=None):
+            self.send_response(status)
+            if content_type:
+                self.send_header("Content-Type", content_type)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+    return Handler
+
+
+def serve(port=DEFAULT_PORT, tick=TICK_SECONDS, background=False):
+    """Jalankan mock server; background=True untuk dipakai dari skrip/tes."""
+    catalog = MockCatalog()
+    catalog.tick(new=10, revise=0)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(catalog))
+    server.daemon_threads = True
+
+    def ticker():
+        while True:
+            time.sleep(tick)
+            catalog.tick()
+
+    threading.Thread(target=ticker, name="mock-feed-ticker", daemon=True).start()
+    if background:
+        threading.Thread(target=server.serve_forever, name="mock-feed", daemon=True).start()
+        return server, catalog
+    print(f"Mock FDSN feed di http://127.0.0.1:{port}{PATH}?format=geojson (tick {tick} detik)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock feed FDSN/GeoJSON untuk uji poller offline")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--tick", type=float, default=TICK_SECONDS)
+    args = parser.parse_args()
+    serve(args.port, args.tick)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import time
+
+from flask import Response, request
+from plotly.io.json import to_json_plotly
+
+import dataset_snapshot
+import metrics
+
+# ======================================================================
+#            PAGE ROUTES (layout halaman ter-serialisasi + ETag)
+# ======================================================================
+# Layout halaman (overview, analysis dengan figure seluruh katalog, dll)
+# diserialisasi ke JSON sekali per versi dataset, bukan setiap navigasi.
+# Browser mengambilnya dari GET <prefix>_pages/<route> lewat callback
+# clientside (router_js): respons membawa ETag = versi dataset + hash isi
+# dan Cache-Control no-cache, jadi navigasi ulang dan reload browser hanya
+# revalidasi (304) tanpa serialisasi dan tanpa download ulang.
+# Durasi serialisasi dan ukuran per route masuk ke /metrics
+# (dash_page_serialize_seconds, dash_page_bytes).
+
+ENDPOINT = "/_pages/"
+NOT_FOUND_ROUTE = "/404"
+
+
+class PageRoutes:
+    """Route -> body JSON + ETag, di-cache per versi dataset."""
+
+    def __init__(self, name, data_pages, static_pages, not_found, default_route="/overview"):
+        self.name = name
+        self.data_pages = data_pages          # route -> builder(snap)
+        self.static_pages = static_pages      # route -> komponen (tidak bergantung data)
+        self.not_found = not_found
+        self.default_route = default_route
+        self.cache = dataset_snapshot.VersionedCache(name=f"{name}_json")
+
+    def route_for(self, path):
+        path = "/" + (path or "").strip("/")
+        if path == "/":
+            return self.default_route
+        if path in self.data_pages or path in self.static_pages:
+            return path
+        return NOT_FOUND_ROUTE
+
+    def _serialize(self, snap, route):
+        if route in self.data_pages:
+            layout = self.data_pages[route](snap)
+        else:
+            layout = self.static_pages.get(route, self.not_found)
+        started = time.perf_counter()
+        body = to_json_plotly(layout).encode()
+        metrics.observe_page(route, time.perf_counter() - started, len(body))
+        etag = f"{snap.version}-{hashlib.sha1(body).hexdigest()[:12]}"
+        return body, etag
+
+    def get(self, snap, path):
+        """(body JSON, etag) untuk path; dibangun sekali per versi."""
+        route = self.route_for(path)
+        return self.cache.get_or_build(snap.version, route, lambda: self._serialize(snap, route))
+
+    def response(self, path):
+        snap = dataset_snapshot.current()
+        body, etag = self.get(snap, path)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"       # boleh disimpan, wajib revalidasi
+        response.headers["X-Dataset-Version"] = snap.version
+        return response
+
+    def install(self, app, server=None):
+        """Pasang route Flask <prefix>_pages/<route> (server default: app.server)."""
+        server = server or app.server
+        url = app.get_relative_path(ENDPOINT)
+        server.add_url_rule(f"{url}<path:path>", f"{self.name}_pages", self.response)
+        server.add_url_rule(url, f"{self.name}_pages_root", lambda: self.response("/"))
+
+    def router_js(self, app):
+        """Callback clientside display_page: fetch layout (HTTP cache + ETag)."""
+        return """
+        function(pathname) {
+            const prefix = %s;
+            let path = pathname || '/';
+            if (path.startsWith(prefix)) { path = path.slice(prefix.length); }
+            return fetch(%s + path.replace(/^\\/+/, ''), {credentials: 'same-origin'})
+                .then(resp => {
+                    if (!resp.ok) { throw new Error(resp.status); }
+                    return resp.json();
+                })
+                .catch(err => ({namespace: 'dash_html_components', type: 'P',
+                                props: {children: 'Gagal memuat halaman (' + err.message + ').',
+                                        className: 'text-danger'}}));
+        }
+        """ % (json.dumps(app.get_relative_path("/")), json.dumps(app.get_relative_path(ENDPOINT)))
@@ -0,0 +1,202 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+import content_store
+
+# ======================================================================
+#            IMPORT POSKO MASSAL (CSV / GeoJSON / KML)
+# ======================================================================
+# Satu file berisi ribuan posko diparse sekaligus (vektor, bukan per baris),
+# dicek duplikat berdasarkan jarak terhadap posko yang sudah ada dan sesama
+# isi file, lalu disimpan. Cek terhadap posko lama dan INSERT berjalan di
+# transaksi tulis yang sama, jadi dua import bersamaan tidak saling lolos.
+
+DEDUP_RADIUS_M = 50
+EARTH_RADIUS_M = 6371000.0
+MAX_REPORTED_ERRORS = 50
+
+COLUMN_ALIASES = {
+    "name": ["name", "nama", "nama_posko", "posko"],
+    "lat": ["lat", "latitude", "lintang"],
+    "lon": ["lon", "lng", "long", "longitude", "bujur"],
+    "address": ["address", "alamat", "keterangan", "description"],
+    "gmaps": ["gmaps", "google_maps", "link", "url", "maps"],
+}
+
+# Format URL sama dengan extract_coordinates_from_gmaps di dashv2
+GMAPS_PATTERNS = [
+    r"@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)",
+    r"[?&]q=(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)",
+]
+
+
+def _normalize_columns(df):
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    out = pd.DataFrame(index=df.index)
+    for target, aliases in COLUMN_ALIASES.items():
+        match = next((a for a in aliases if a in df.columns), None)
+        out[target] = df[match] if match else None
+    return out
+
+
+def extract_coordinates_vectorized(urls):
+    """Versi vektor extract_coordinates_from_gmaps: return (lat, lon) Series."""
+    urls = pd.Series(urls, dtype="object").fillna("").astype(str)
+    lat = pd.Series(np.nan, index=urls.index)
+    lon = pd.Series(np.nan, index=urls.index)
+    for pattern in GMAPS_PATTERNS:
+        found = urls.str.extract(pattern).astype(float)
+        missing = lat.isna()
+        lat[missing] = found[0][missing]
+        lon[missing] = found[1][missing]
+    return lat, lon
+
+
+def _read_csv(raw):
+    return _normalize_columns(pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False))
+
+
+def _read_geojson(raw):
+    data = json.loads(raw.decode("utf-8"))
+    features = data.get("features", []) if data.get("type") == "FeatureCollection" else [data]
+    records = []
+    for feature in features:
+        props = feature.get("properties") or {}
+        geom = feature.get("geometry") or {}
+        coords = geom.get("coordinates") if geom.get("type") == "Point" else None
+        record = {k.lower(): v for k, v in props.items()}
+        record["lon"], record["lat"] = (coords[0], coords[1]) if coords and len(coords) >= 2 else (None, None)
+        records.append(record)
+    return _normalize_columns(pd.DataFrame.from_records(records))
+
+
+def _read_kml(raw):
+    root = ET.fromstring(raw)
+    records = []
+    # Abaikan namespace KML supaya file dari berbagai tool tetap terbaca
+    for placemark in root.iter():
+        if not placemark.tag.endswith("Placemark"):
+            continue
+        record = {"name": None, "address": None, "lat": None, "lon": None}
+        for child in placemark.iter():
+            tag = child.tag.rsplit("}", 1)[-1]
+            if tag == "name":
+                record["name"] = (child.text or "").strip()
+            elif tag in ("address", "description") and not record["address"]:
+                record["address"] = (child.text or "").strip()
+            elif tag == "coordinates" and child.text:
+                parts = child.text.strip().split()[0].split(",")
+                if len(parts) >= 2:
+                    record["lon"], record["lat"] = parts[0], parts[1]
+        records.append(record)
+    return _normalize_columns(pd.DataFrame.from_records(records))
+
+
+def read_posts_file(raw, filename):
+    """Parse isi file menjadi DataFrame name/lat/lon/address/gmaps.
+
+    Index hasil = nomor baris (CSV, baris 1 = header) atau nomor fitur/placemark,
+    dipakai untuk laporan error per baris.
+    """
+    ext = filename.lower().rsplit(".", 1)[-1]
+    if ext == "csv":
+        posts, first_row = _read_csv(raw), 2
+    elif ext in ("geojson", "json"):
+        posts, first_row = _read_geojson(raw), 1
+    elif ext == "kml":
+        posts, first_row = _read_kml(raw), 1
+    else:
+        raise ValueError(f"Format file .{ext} tidak didukung (pakai CSV, GeoJSON, atau KML)")
+    posts.index = pd.RangeIndex(first_row, first_row + len(posts))
+    return posts
+
+
+def validate_posts(posts):
+    """Lengkapi koordinat dari link Google Maps dan tandai baris yang tidak valid."""
+    posts = posts.copy()
+    posts["name"] = posts["name"].fillna("").astype(str).str.strip()
+    posts["address"] = posts["address"].fillna("").astype(str).str.strip().replace("", "Import massal")
+    posts["lat"] = pd.to_numeric(posts["lat"], errors="coerce")
+    posts["lon"] = pd.to_numeric(posts["lon"], errors="coerce")
+
+    gmaps_lat, gmaps_lon = extract_coordinates_vectorized(posts["gmaps"])
+    missing = posts["lat"].isna() | posts["lon"].isna()
+    posts.loc[missing, "lat"] = gmaps_lat[missing]
+    posts.loc[missing, "lon"] = gmaps_lon[missing]
+
+    error = pd.Series("", index=posts.index)
+    error[posts["lat"].isna() | posts["lon"].isna()] = "koordinat tidak ditemukan"
+    error[(error == "") & ~(posts["lat"].between(-90, 90) & posts["lon"].between(-180, 180))] = "koordinat di luar rentang"
+    error[posts["name"] == ""] = "nama posko kosong"
+    posts["error"] = error
+    return posts
+
+
+def _haversine_tree(lat, lon):
+    from sklearn.neighbors import BallTree
+    return BallTree(np.radians(np.column_stack([lat, lon])), metric="haversine")
+
+
+def mark_duplicates(posts, radius_m=DEDUP_RADIUS_M):
+    """Tandai posko yang berjarak < radius_m dari posko lama atau baris sebelumnya di file."""
+    valid = posts[posts["error"] == ""]
+    if valid.empty:
+        return posts
+    coords = np.radians(valid[["lat", "lon"]].to_numpy())
+    radius = radius_m / EARTH_RADIUS_M
+    duplicate = np.zeros(len(valid), dtype=bool)
+
+    # 1. Terhadap posko yang sudah ada: ambil kandidat dari index R*Tree (bbox file + margin)
+    pad = np.degrees(radius) * 2
+    existing = content_store.posts_in_bbox(
+        valid["lat"].min() - pad, valid["lat"].max() + pad,
+        valid["lon"].min() - pad, valid["lon"].max() + pad, limit=-1)
+    if existing:
+        tree = _haversine_tree([p["lat"] for p in existing], [p["lon"] for p in existing])
+        duplicate |= tree.query_radius(coords, r=radius, count_only=True) > 0
+
+    # 2. Sesama isi file: yang muncul pertama dipertahankan
+    neighbours = _haversine_tree(valid["lat"], valid["lon"]).query_radius(coords, r=radius)
+    kept = np.zeros(len(valid), dtype=bool)
+    for i, near in enumerate(neighbours):
+        if duplicate[i]:
+            continue
+        if any(kept[j] for j in near if j < i):
+            duplicate[i] = True
+        else:
+            kept[i] = True
+
+    posts = posts.copy()
+    posts.loc[valid.index[duplicate], "error"] = f"duplikat (< {radius_m} m dari posko lain)"
+    return posts
+
+
+def import_posts(raw, filename):
+    """Parse, validasi, dedup, lalu simpan dalam satu transaksi. Return ringkasan."""
+    validated = validate_posts(read_posts_file(raw, filename))
+    result = {}
+
+    def dedup_rows():
+        # Dipanggil di dalam transaksi tulis: posko lama dibaca di bawah lock yang sama dengan INSERT
+        result["posts"] = posts = mark_duplicates(validated)
+        ok = posts[posts["error"] == ""]
+        return ok[["name", "lat", "lon", "address"]].itertuples(index=False, name=None)
+
+    imported = content_store.add_posts_bulk(dedup_rows)
+    posts = result["posts"]
+
+    failed = posts[posts["error"] != ""]
+    return {
+        "total": len(posts),
+        "imported": imported,
+        "duplicates": int(failed["error"].str.startswith("duplikat").sum()),
+        "errors": [
+            {"row": int(r.Index), "name": r.name, "error": r.error}
+            for r in failed.head(MAX_REPORTED_ERRORS).itertuples()
+        ],
+        "error_count": len(failed),
+    }
@@ -0,0 +1,305 @@
+import base64
+import hashlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, request
+
+import cross_section
+import dataset_snapshot
+import event_table
+import timelapse
+
+# ======================================================================
+#            QUERY API (read-only, JSON / Arrow IPC)
+# ======================================================================
+# Akses data tanpa scraping dashboard:
+#
+#   GET /api/events       filter sama dengan dashboard, cursor + projection
+#   GET /api/aggregates   ?by=province|year|magnitude (&bin=0.5)
+#   GET /api/cross-section ?line=lat,lon;lat,lon&width_km=50, event di
+#                         koridor garis profil + jarak sepanjang garis
+#   GET /api/timelapse    ?step=day|week|month&start=0&frames=60, chunk
+#                         frame playback (event yang masuk per frame)
+#   GET /api/version      versi dataset aktif
+#
+# Parameter filter: province (boleh berulang), mag_min, mag_max, year
+# (boleh berulang), start_year, end_year. Tanpa filter = seluruh katalog.
+# Format: ?format=json (default) atau ?format=arrow (butuh pyarrow).
+#
+# Posisi baris hasil filter dan body respons di-cache per versi dataset,
+# dan ETag = versi + query, jadi request berulang dijawab 304 tanpa
+# menyentuh data sama sekali.
+
+DEFAULT_LIMIT = 500
+DEFAULT_SECTION_WIDTH_KM = 50
+MAX_LIMIT = 5000
+AGGREGATE_KEYS = ("province", "year", "magnitude")
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+_positions_cache = dataset_snapshot.VersionedCache(max_entries=256, name="api_positions")
+_response_cache = dataset_snapshot.VersionedCache(max_entries=1024, name="api_response")
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ----------------------------------------------------------------------
+#                           PARAMETER & CACHE
+# ----------------------------------------------------------------------
+def _query_key():
+    """Query dalam bentuk kanonik (urutan parameter tidak berpengaruh)."""
+    return tuple(sorted((k, tuple(request.args.getlist(k))) for k in request.args))
+
+
+def _etag(snap, endpoint, key):
+    digest = hashlib.sha1(repr((endpoint, key)).encode()).hexdigest()[:16]
+    return f"{snap.version}-{digest}"
+
+
+def _filter_args(snap):
+    provinces = request.args.getlist("province") or list(snap.province_options)
+    mag_range = [request.args.get("mag_min", snap.min_mag, type=float),
+                 request.args.get("mag_max", snap.max_mag, type=float)]
+    years = request.args.getlist("year", type=int)
+    start_year = request.args.get("start_year", type=int)
+    end_year = request.args.get("end_year", type=int)
+    if not years and start_year is None and end_year is None:
+        start_year, end_year = snap.min_year, snap.max_year
+    else:
+        start_year = snap.min_year if start_year is None else start_year
+        end_year = snap.max_year if end_year is None else end_year
+    return provinces, mag_range, years, start_year, end_year
+
+
+def _positions(snap, filter_fn):
+    args = _filter_args(snap)
+    key = repr(args)
+    return _positions_cache.get_or_build(
+        snap.version, key, lambda: filter_fn(*args, snap=snap)[0])
+
+
+def _fields(snap):
+    requested = [f for f in request.args.get("fields", "").split(",") if f]
+    columns = event_table.public_columns(snap.df)
+    unknown = [f for f in requested if f not in columns]
+    if unknown:
+        raise ApiError(f"Field tidak dikenal: {', '.join(unknown)}")
+    return requested or columns
+
+
+def _format():
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "arrow"):
+        raise ApiError(f"Format tidak dikenal: {fmt}")
+    return fmt
+
+
+def encode_cursor(version, offset):
+    raw = json.dumps({"v": version, "o": offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, version):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        offset = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise ApiError("Cursor tidak valid")
+    if data.get("v") != version:
+        # Posisi baris hanya berlaku untuk satu versi dataset
+        raise ApiError("Dataset sudah diperbarui, ulangi dari halaman pertama", status=410)
+    return offset
+
+
+# ----------------------------------------------------------------------
+#                              SERIALISASI
+# ----------------------------------------------------------------------
+def _frame_json(frame):
+    return frame.to_json(orient="records", date_format="iso", date_unit="ms")
+
+
+def _frame_arrow(frame, metadata):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({k: str(v) for k, v in metadata.items()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _body(frame, fmt, metadata, key="data"):
+    """Body respons + header tambahan (metadata ikut di header untuk Arrow)."""
+    if fmt == "arrow":
+        headers = {f"X-{k.replace('_', '-').title()}": str(v) for k, v in metadata.items() if v is not None}
+        return _frame_arrow(frame, metadata), ARROW_MIMETYPE, headers
+    head = json.dumps(metadata)[:-1]
+    return f'{head}, "{key}": {_frame_json(frame)}}}'.encode(), "application/json", {}
+
+
+def _respond(snap, endpoint, build):
+    """Jawab 304 kalau ETag cocok; selain itu ambil body dari cache (atau build)."""
+    key = _query_key()
+    etag = _etag(snap, endpoint, key)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body, mimetype, headers = _response_cache.get_or_build(snap.version, (endpoint, key), build)
+        response = Response(body, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"       # boleh disimpan, wajib revalidasi
+    response.headers["X-Dataset-Version"] = snap.version
+    return response
+
+
+# ----------------------------------------------------------------------
+#                               ENDPOINT
+# ----------------------------------------------------------------------
+def events_page(snap, filter_fn):
+    fmt, fields = _format(), _fields(snap)
+    limit = min(max(request.args.get("limit", DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+    cursor = request.args.get("cursor")
+    offset = decode_cursor(cursor, snap.version) if cursor else 0
+
+    positions = _positions(snap, filter_fn)
+    page = positions[offset:offset + limit]
+    frame = event_table.display(snap.df.iloc[page][fields])
+    next_offset = offset + len(page)
+    metadata = {
+        "version": snap.version,
+        "total": int(len(positions)),
+        "count": int(len(page)),
+        "next_cursor": encode_cursor(snap.version, next_offset) if next_offset < len(positions) else None,
+    }
+    return _body(frame, fmt, metadata, key="events")
+
+
+def aggregate(snap, filter_fn):
+    fmt = _format()
+    by = request.args.get("by", "province")
+    if by not in AGGREGATE_KEYS:
+        raise ApiError(f"Parameter by harus salah satu dari: {', '.join(AGGREGATE_KEYS)}")
+    bin_width = request.args.get("bin", 0.5, type=float)
+    if bin_width <= 0:
+        raise ApiError("Parameter bin harus > 0")
+
+    positions = _positions(snap, filter_fn)
+    df = snap.df
+    magnitude = np.round(df["magnitude"].to_numpy()[positions].astype(np.float64),
+                         event_table.DISPLAY_DECIMALS["magnitude"])
+    if by == "province":
+        key = np.asarray(df["province"].iloc[positions], dtype=object)
+    elif by == "year":
+        key = event_table.years(df).to_numpy()[positions].astype(int)
+    else:
+        by = "magnitude_bin"      # batas bawah bin, nama beda dari kolom nilai
+        key = np.round(np.floor(magnitude / bin_width) * bin_width, 6)
+
+    frame = (
+        pd.DataFrame({by: key, "value": magnitude})
+        .groupby(by, sort=True)["value"]
+        .agg(count="count", mean_magnitude="mean", max_magnitude="max")
+        .reset_index()
+    )
+    metadata = {"version": snap.version, "by": by, "total": int(len(positions))}
+    if by == "magnitude_bin":
+        metadata["bin"] = bin_width
+    return _body(frame, fmt, metadata, key="groups")
+
+
+def cross_section_page(snap, filter_fn, section_fn):
+    """Event di koridor garis profil, urut jarak sepanjang garis (tanpa paging)."""
+    fmt, fields = _format(), _fields(snap)
+    try:
+        line = cross_section.parse_line(request.args.get("line"))
+    except ValueError as e:
+        raise ApiError(f"Parameter line tidak valid ({e}); format: lat,lon;lat,lon")
+    width_km = request.args.get("width_km", DEFAULT_SECTION_WIDTH_KM, type=float)
+    if not 0 < width_km <= cross_section.MAX_WIDTH_KM:
+        raise ApiError(f"Parameter width_km harus 0-{cross_section.MAX_WIDTH_KM}")
+
+    rows, along, offset = section_fn(line, width_km, snap=snap)
+    keep = np.isin(rows, _positions(snap, filter_fn))
+    frame = event_table.display(snap.df.iloc[rows[keep]][fields]).reset_index(drop=True)
+    frame.insert(0, "distance_km", np.round(along[keep], 2))
+    frame.insert(1, "offset_km", np.round(offset[keep], 2))
+    metadata = {
+        "version": snap.version,
+        "length_km": round(cross_section.line_length_km(line), 2),
+        "width_km": width_km,
+        "count": int(keep.sum()),
+    }
+    return _body(frame, fmt, metadata, key="events")
+
+
+def timelapse_page(snap, filter_fn):
+    """Chunk frame time-lapse: offsets frame + kolom event yang masuk (JSON saja)."""
+    step = request.args.get("step", "month")
+    if step not in timelapse.STEPS:
+        raise ApiError(f"Parameter step harus salah satu dari: {', '.join(timelapse.STEPS)}")
+    start = max(request.args.get("start", 0, type=int), 0)
+    frames = min(max(request.args.get("frames", timelapse.CHUNK_FRAMES, type=int), 1), timelapse.MAX_CHUNK_FRAMES)
+    args = _filter_args(snap)
+    timeline = timelapse.timeline(snap, repr(args), step, lambda: _positions(snap, filter_fn))
+    body = {"version": snap.version, **timeline.chunk(snap.df, start, frames)}
+    return json.dumps(body, separators=(",", ":")).encode(), "application/json", {}
+
+
+def create_blueprint(filter_fn, section_fn=None):
+    """Blueprint /api; filter_fn = filter_positions dari dashboard (index yang sama).
+
+    section_fn = section_positions dari seismo_engine; tanpa itu
+    /api/cross-section tidak dipasang.
+    """
+    api = Blueprint("api", __name__, url_prefix="/api")
+
+    @api.errorhandler(ApiError)
+    def handle_api_error(e):
+        return Response(json.dumps({"error": str(e)}), status=e.status, mimetype="application/json")
+
+    @api.route("/version")
+    def version():
+        snap = dataset_snapshot.current()
+        return {"version": snap.version, "rows": len(snap.df), "min_year": snap.min_year, "max_year": snap.max_year}
+
+    @api.route("/events")
+    def events():
+        snap = dataset_snapshot.current()
+        if request.args.get("format") == "arrow":
+            _require_pyarrow()
+        return _respond(snap, "events", lambda: events_page(snap, filter_fn))
+
+    @api.route("/aggregates")
+    def aggregates():
+        snap = dataset_snapshot.current()
+        if request.args.get("format") == "arrow":
+            _require_pyarrow()
+        return _respond(snap, "aggregates", lambda: aggregate(snap, filter_fn))
+
+    @api.route("/timelapse")
+    def timelapse_frames():
+        snap = dataset_snapshot.current()
+        return _respond(snap, "timelapse", lambda: timelapse_page(snap, filter_fn))
+
+    if section_fn is not None:
+        @api.route("/cross-section")
+        def cross_section_events():
+            snap = dataset_snapshot.current()
+            if request.args.get("format") == "arrow":
+                _require_pyarrow()
+            return _respond(snap, "cross_section", lambda: cross_section_page(snap, filter_fn, section_fn))
+
+    return api
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ApiError("Format arrow butuh pyarrow (pip install pyarrow)", status=501)
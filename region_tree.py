@@ -0,0 +1,292 @@
+import threading
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+import event_table
+
+# ======================================================================
+#            REGION TREE (agregat hierarkis pulau > provinsi > kab/kota > kecamatan)
+# ======================================================================
+# Setiap node (path = ("Sulawesi", "Sulawesi Tengah", "Palu", ...)) menyimpan
+# ringkasan yang bisa digabung: jumlah event, statistik magnitudo dan
+# kedalaman, serta event terbaru. Drill-down di halaman regional hanya
+# membaca node dan anak-anaknya (dict lookup), tidak pernah groupby ulang
+# katalog.
+#
+# Pulau diturunkan dari nama provinsi (ISLAND_KEYWORDS); regency/district
+# hanya ada kalau kolomnya ada (polygon kab/kota / kecamatan, admin_regions).
+#
+# Upsert feed: ringkasan baris baru digabung ke node yang dilalui (salinan
+# dict node, tree versi lama tidak diubah). Baris lama yang diganti
+# dikurangkan; kalau baris itu min/max/terbaru sebuah node, node tersebut
+# dihitung ulang dari baris-barisnya saja.
+
+LEVELS = ("island", "province", "regency", "district")
+LEVEL_LABELS = {"island": "Pulau", "province": "Provinsi", "regency": "Kab/Kota", "district": "Kecamatan"}
+ROOT_NAME = "Indonesia"
+UNKNOWN = "Lainnya"
+
+# Kata kunci nama provinsi -> kelompok pulau (nama BIG, geoBoundaries, worldcities)
+ISLAND_KEYWORDS = (
+    ("Sumatera", ("sumatera", "sumatra", "aceh", "riau", "jambi", "bengkulu", "lampung", "bangka")),
+    ("Jawa", ("jawa", "java", "jakarta", "banten", "yogyakarta")),
+    ("Bali & Nusa Tenggara", ("bali", "nusa tenggara")),
+    ("Kalimantan", ("kalimantan", "borneo")),
+    ("Sulawesi", ("sulawesi", "gorontalo", "celebes")),
+    ("Maluku", ("maluku", "moluccas")),
+    ("Papua", ("papua",)),
+)
+
+_NO_TIME = np.iinfo(np.int64).min
+
+
+def island_of(province):
+    name = str(province).lower()
+    for island, keywords in ISLAND_KEYWORDS:
+        if any(k in name for k in keywords):
+            return island
+    return UNKNOWN
+
+
+@dataclass(frozen=True)
+class NodeSummary:
+    path: tuple
+    count: int = 0
+    mag_count: int = 0
+    mag_sum: float = 0.0
+    mag_min: float = np.nan
+    mag_max: float = np.nan
+    depth_count: int = 0
+    depth_sum: float = 0.0
+    depth_min: float = np.nan
+    depth_max: float = np.nan
+    latest_time: int = _NO_TIME              # epoch ns
+    latest: dict = field(default=None, compare=False)
+
+    @property
+    def name(self):
+        return self.path[-1] if self.path else ROOT_NAME
+
+    @property
+    def level(self):
+        return LEVELS[len(self.path) - 1] if self.path else "root"
+
+    @property
+    def mag_mean(self):
+        return self.mag_sum / self.mag_count if self.mag_count else np.nan
+
+    @property
+    def depth_mean(self):
+        return self.depth_sum / self.depth_count if self.depth_count else np.nan
+
+    def merge(self, other):
+        newer = other.latest_time > self.latest_time
+        return replace(
+            self,
+            count=self.count + other.count,
+            mag_count=self.mag_count + other.mag_count,
+            mag_sum=self.mag_sum + other.mag_sum,
+            mag_min=float(np.fmin(self.mag_min, other.mag_min)),
+            mag_max=float(np.fmax(self.mag_max, other.mag_max)),
+            depth_count=self.depth_count + other.depth_count,
+            depth_sum=self.depth_sum + other.depth_sum,
+            depth_min=float(np.fmin(self.depth_min, other.depth_min)),
+            depth_max=float(np.fmax(self.depth_max, other.depth_max)),
+            latest_time=other.latest_time if newer else self.latest_time,
+            latest=other.latest if newer else self.latest,
+        )
+
+    def subtract(self, other):
+        """(ringkasan tanpa baris `other`, True kalau hasilnya pasti benar).
+
+        Jumlah dan total bisa dikurangkan; min/max/terbaru hanya kalau baris
+        yang dibuang bukan ekstrem node ini.
+        """
+        result = replace(
+            self,
+            count=self.count - other.count,
+            mag_count=self.mag_count - other.mag_count,
+            mag_sum=self.mag_sum - other.mag_sum,
+            depth_count=self.depth_count - other.depth_count,
+            depth_sum=self.depth_sum - other.depth_sum,
+        )
+        exact = (
+            not other.mag_min <= self.mag_min and not other.mag_max >= self.mag_max
+            and not other.depth_min <= self.depth_min and not other.depth_max >= self.depth_max
+            and other.latest_time < self.latest_time
+        )
+        return result, exact
+
+
+# ----------------------------------------------------------------------
+#                       RINGKASAN DARI BARIS EVENT
+# ----------------------------------------------------------------------
+def levels_for(df):
+    return tuple(level for level in LEVELS if level == "island" or level in df.columns)
+
+
+def _frame(df, levels):
+    province = df["province"].astype(str) if "province" in df.columns else pd.Series(UNKNOWN, index=df.index)
+    islands = {p: island_of(p) for p in province.unique()}
+    columns = {"island": province.map(islands).to_numpy(dtype=object)}
+    for level in levels[1:]:
+        if level == "province":
+            columns[level] = province.to_numpy(dtype=object)
+        elif level in df.columns:
+            columns[level] = df[level].astype(object).fillna(UNKNOWN).astype(str).to_numpy(dtype=object)
+        else:
+            columns[level] = np.full(len(df), UNKNOWN, dtype=object)
+    columns["magnitude"] = pd.to_numeric(df["magnitude"], errors="coerce").to_numpy(dtype=np.float64)
+    columns["depth"] = pd.to_numeric(df["depth"], errors="coerce").to_numpy(dtype=np.float64)
+    columns["time"] = event_table.epoch_ns(df) if df["time"].dtype == "datetime64[ns]" \
+        else pd.to_datetime(df["time"]).astype("datetime64[ns]").to_numpy().view("int64")
+    return pd.DataFrame(columns)
+
+
+def _latest_events(df, positions):
+    """Detail event terbaru per node (satu display() untuk semua node)."""
+    rows = event_table.display(df.iloc[positions][["time", "latitude", "longitude", "depth", "magnitude"]
+                                                   + (["place"] if "place" in df.columns else [])])
+    out = pd.DataFrame({
+        "time": rows["time"].dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "magnitude": rows["magnitude"], "depth": rows["depth"],
+        "place": rows["place"].astype(object) if "place" in rows.columns else None,
+        "latitude": rows["latitude"], "longitude": rows["longitude"],
+    })
+    return out.astype(object).where(out.notna(), None).to_dict("records")
+
+
+def summarize(df, levels):
+    """{path: NodeSummary} untuk root dan setiap node di semua level (satu groupby per level)."""
+    if df.empty:
+        return {}
+    frame = _frame(df, levels)
+    frame["_one"] = 0
+    groups = []
+    for depth in range(len(levels) + 1):
+        keys = list(levels[:depth]) or ["_one"]
+        grouped = frame.groupby(keys, sort=False, observed=True).agg(
+            count=("time", "size"),
+            mag_count=("magnitude", "count"), mag_sum=("magnitude", "sum"),
+            mag_min=("magnitude", "min"), mag_max=("magnitude", "max"),
+            depth_count=("depth", "count"), depth_sum=("depth", "sum"),
+            depth_min=("depth", "min"), depth_max=("depth", "max"),
+            latest_time=("time", "max"), latest_position=("time", "idxmax"),
+        )
+        for key, row in zip(grouped.index, grouped.itertuples(index=False)):
+            groups.append((() if depth == 0 else (key if isinstance(key, tuple) else (key,)), row))
+
+    latest = _latest_events(df, [int(row.latest_position) for _, row in groups])
+    return {
+        path: NodeSummary(
+            path=path, count=int(row.count),
+            mag_count=int(row.mag_count), mag_sum=float(row.mag_sum),
+            mag_min=float(row.mag_min), mag_max=float(row.mag_max),
+            depth_count=int(row.depth_count), depth_sum=float(row.depth_sum),
+            depth_min=float(row.depth_min), depth_max=float(row.depth_max),
+            latest_time=int(row.latest_time), latest=event,
+        )
+        for (path, row), event in zip(groups, latest)
+    }
+
+
+def _path_mask(frame, path, levels):
+    mask = np.ones(len(frame), dtype=bool)
+    for level, value in zip(levels, path):
+        mask &= frame[level].to_numpy() == value
+    return mask
+
+
+# ----------------------------------------------------------------------
+#                                TREE
+# ----------------------------------------------------------------------
+class RegionTree:
+    """Node per path + index anak; immutable setelah dibuat (update = tree baru)."""
+
+    def __init__(self, levels, nodes):
+        self.levels = levels
+        self.nodes = nodes
+        self.children = {}
+        for path in nodes:
+            if path:
+                self.children.setdefault(path[:-1], set()).add(path)
+
+    @classmethod
+    def build(cls, df):
+        levels = levels_for(df)
+        return cls(levels, summarize(df, levels))
+
+    def node(self, path=()):
+        return self.nodes.get(tuple(path))
+
+    def child_nodes(self, path=()):
+        """Anak-anak node, event terbanyak dulu."""
+        paths = self.children.get(tuple(path), ())
+        return sorted((self.nodes[p] for p in paths), key=lambda n: (-n.count, n.name))
+
+    def has_children(self, path):
+        return bool(self.children.get(tuple(path)))
+
+    def apply(self, df, appended, replaced=None):
+        """Tree baru setelah upsert: gabung baris baru, kurangi baris lama yang diganti."""
+        nodes = dict(self.nodes)
+        stale = set()
+        if replaced is not None and not replaced.empty:
+            for path, removed in summarize(replaced, self.levels).items():
+                current = nodes.get(path)
+                if current is None:
+                    continue
+                result, exact = current.subtract(removed)
+                if result.count <= 0:
+                    del nodes[path]
+                elif exact:
+                    nodes[path] = result
+                else:
+                    stale.add(path)
+        if appended is not None and not appended.empty:
+            for path, added in summarize(appended, self.levels).items():
+                if path in stale:
+                    continue
+                nodes[path] = nodes[path].merge(added) if path in nodes else added
+        if stale:
+            # Hanya baris di bawah node yang ekstremnya hilang yang dihitung ulang
+            frame = _frame(df, self.levels)
+            for path in stale:
+                rows = df[_path_mask(frame, path, self.levels)]
+                nodes[path] = summarize(rows, self.levels[:len(path)]).get(path) if not rows.empty else None
+            nodes = {p: n for p, n in nodes.items() if n is not None}
+        return RegionTree(self.levels, nodes)
+
+
+# ----------------------------------------------------------------------
+#                       TREE PER VERSI DATASET
+# ----------------------------------------------------------------------
+_trees = {}                      # version -> RegionTree
+_trees_lock = threading.Lock()
+
+
+def update(snap):
+    """Tree untuk versi baru: inkremental dari versi induk kalau snapshot hasil upsert."""
+    with _trees_lock:
+        base = _trees.get(snap.parent_version) if snap.parent_version else None
+    if base is not None and snap.upserted is not None and base.levels == levels_for(snap.df):
+        tree = base.apply(snap.df, snap.upserted, snap.replaced)
+    else:
+        tree = RegionTree.build(snap.df)
+    with _trees_lock:
+        _trees[snap.version] = tree
+    return tree
+
+
+def get(snap):
+    with _trees_lock:
+        tree = _trees.get(snap.version)
+    return tree if tree is not None else update(snap)
+
+
+def evict_except(version):
+    with _trees_lock:
+        for key in [k for k in _trees if k != version]:
+            del _trees[key]
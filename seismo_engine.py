@@ -0,0 +1,366 @@
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import admin_regions
+import cross_section
+import dataset_snapshot
+import event_table
+import feed_poller
+import heatmap_tiles
+import region_tree
+import startup_profile
+
+# ======================================================================
+#            SEISMO ENGINE (akses data bersama dashv2 & gempa_dash)
+# ======================================================================
+# Satu tempat untuk semua yang menyentuh dataset event:
+#   - load combined.csv + event feed, deteksi provinsi, tabel kompak
+#   - store mmap, snapshot immutable + hot reload, ingestion feed
+#   - index (baris per provinsi dari store, pyramid heatmap)
+#   - filter lewat query bertipe (EventQuery)
+# App Dash hanya berisi layout & callback di atasnya. Beberapa app yang
+# di-mount di satu server Flask (satu proses) memanggil start() masing-
+# masing, tapi dataset hanya di-load sekali dan snapshot-nya dipakai bersama.
+
+DATA_SOURCES = ["data/combined/combined.csv", "data/worldcities.csv", *admin_regions.BOUNDARY_FILES.values()]
+PROVINCE_RADIUS_KM = 150
+
+current = dataset_snapshot.current
+
+
+def prepare_dataset():
+    """Load combined.csv dan tambahkan kolom provinsi (dipanggil sekali per versi data)."""
+    try:
+        with startup_profile.stage("read_csv"):
+            df = pd.read_csv("data/combined/combined.csv", parse_dates=['time'])
+    except FileNotFoundError:
+        print("Warning: 'data/combined/combined.csv' not found. Creating dummy data.")
+        # Dummy data for demonstration if file is missing
+        data = {
+            'time': pd.to_datetime(['2025-10-15T12:00:00Z', '2025-10-16T08:30:00Z', '2024-05-20T10:00:00Z', '2023-01-01T00:00:00Z', '2025-10-14T11:00:00Z']),
+            'latitude': [-6.2088, -7.7956, -8.4095, 0.7893, -6.9034],
+            'longitude': [106.8456, 110.3695, 115.1889, 113.9213, 107.6191],
+            'depth': [10.0, 50.5, 12.3, 150.0, 20.0],
+            'magnitude': [5.5, 4.2, 6.1, 7.0, 3.5],
+            'place': ['8km S of Jakarta', 'Yogyakarta Region', 'Bali', 'Kalimantan Tengah', 'Bandung'],
+        }
+        df = pd.DataFrame(data)
+
+    # Waktu disimpan sebagai UTC tanpa timezone supaya bisa di-mmap tanpa salinan
+    df["time"] = pd.to_datetime(df["time"], utc=True).dt.tz_localize(None)
+
+    # Event dari feed poller (upsert per event_id) ikut masuk saat build ulang
+    with startup_profile.stage("feed_events"):
+        feed_events = feed_poller.load_feed_events()
+        if not feed_events.empty:
+            df = pd.concat([df, feed_events], ignore_index=True)
+
+    with startup_profile.stage("assign_provinces"):
+        df = assign_provinces(df)
+
+    # Representasi kompak: string di-intern, float32, kolom year
+    with startup_profile.stage("compact"):
+        before = startup_profile.dataframe_memory(df)["total_mb"]
+        df = event_table.compact(df)
+        after = startup_profile.dataframe_memory(df)["total_mb"]
+    print(f"✅ Tabel event kompak: {before:.1f} MB -> {after:.1f} MB ({len(df)} baris).")
+    return df
+
+
+_city_index_lock = threading.Lock()
+_city_index_state = {}
+
+
+def _city_index():
+    """(BallTree, nama provinsi) kota Indonesia di worldcities.csv; None kalau file tidak ada.
+
+    Dibangun sekali per proses: upsert feed memanggil assign_provinces berulang
+    kali, jadi file tidak dibaca ulang dan peringatan hanya dicetak sekali.
+    """
+    with _city_index_lock:
+        if "index" not in _city_index_state:
+            try:
+                # Import di sini: worker yang me-mmap store tidak perlu sklearn sama sekali
+                with startup_profile.stage("import_sklearn"):
+                    from sklearn.neighbors import BallTree
+                with startup_profile.stage("worldcities"):
+                    worldcities = pd.read_csv("data/worldcities.csv")
+                    indo = worldcities[worldcities["country"] == "Indonesia"].copy()
+                with startup_profile.stage("balltree"):
+                    tree = BallTree(np.radians(indo[["lat", "lng"]].values), metric="haversine")
+                    names = indo["admin_name"].astype(str).str.replace("Province", "").str.strip().to_numpy(dtype=object)
+                _city_index_state["index"] = (tree, names)
+            except FileNotFoundError:
+                print("Warning: 'data/worldcities.csv' not found. Using simple place matching.")
+                _city_index_state["index"] = None
+        return _city_index_state["index"]
+
+
+def assign_provinces(df):
+    """Tambahkan kolom provinsi (+ regency/district kalau ada polygon kab/kota/kecamatan).
+
+    Utama: point-in-polygon batas administrasi (admin_regions). Tanpa polygon:
+    kota terdekat < 150 km di worldcities.csv, lalu kotak kasar.
+    """
+    df = df.copy()
+    lat = pd.to_numeric(df["latitude"], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df["longitude"], errors="coerce").to_numpy(dtype=np.float64)
+    if admin_regions.available():
+        with startup_profile.stage("lookup_polygons"):
+            for level, names in admin_regions.assign(lat, lon).items():
+                df[level] = names
+        return df
+
+    # --- Deteksi provinsi Indonesia ---
+    index = _city_index()
+    if index is not None:
+        tree, names = index
+        # Satu query batch untuk semua event (bukan per baris)
+        with startup_profile.stage("lookup"):
+            province = np.full(len(df), "Lainnya", dtype=object)
+            valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+            if len(valid):
+                dist, idx = tree.query(np.radians(np.column_stack([lat[valid], lon[valid]])), k=1)
+                near = dist[:, 0] * 6371 < PROVINCE_RADIUS_KM
+                province[valid[near]] = names[idx[near, 0]]
+            df["province"] = province
+    else:
+        # Fallback province detection
+        with startup_profile.stage("lookup_fallback"):
+            df["province"] = np.select(
+                [(lat < -5) & (lon < 110), (lat > -1) & (lon > 120)],
+                ["Sumatera/Jawa Barat", "Sulawesi/Maluku"], default="Lainnya").astype(object)
+
+    return df
+
+
+# ----------------------------------------------------------------------
+#                    INGESTION FEED
+# ----------------------------------------------------------------------
+def ingest_feed_events(events):
+    """Jalur ingestion poller (satu proses per host): simpan, upsert ke store, publish."""
+    feed_poller.save_feed_events(events)
+    dataset_snapshot.upsert(assign_provinces(events[feed_poller.EVENT_COLUMNS]))
+    print(f"✅ {len(events)} event feed di-upsert ke dataset.")
+
+
+def replay_feed_events():
+    """Store di disk bisa lebih tua dari file feed: upsert event feed yang belum ada di snapshot."""
+    feed_events = feed_poller.load_feed_events()
+    if feed_events.empty:
+        return
+    df = dataset_snapshot.current().df
+    known = set(zip(df["event_id"], df["updated"])) if "event_id" in df.columns else set()
+    missing = feed_events[[k not in known for k in zip(feed_events["event_id"], feed_events["updated"])]]
+    if not missing.empty:
+        dataset_snapshot.upsert(assign_provinces(missing))
+
+
+# ----------------------------------------------------------------------
+#                    INDEX PER VERSI
+# ----------------------------------------------------------------------
+@dataset_snapshot.on_prepare
+def build_indexes(snap):
+    """Precompute pyramid heatmap, agregat wilayah dan grid spasial untuk versi baru sebelum swap."""
+    with startup_profile.stage("heatmap_pyramids"):
+        heatmap_tiles.update(snap)
+    with startup_profile.stage("region_tree"):
+        region_tree.update(snap)
+    with startup_profile.stage("spatial_grid"):
+        cross_section.update(snap)
+
+
+@dataset_snapshot.on_publish
+def evict_old_versions(snap):
+    heatmap_tiles.evict_except(snap.version)
+    region_tree.evict_except(snap.version)
+    cross_section.evict_except(snap.version)
+
+
+# ----------------------------------------------------------------------
+#                    START (sekali per proses)
+# ----------------------------------------------------------------------
+_start_lock = threading.Lock()
+_started = False
+
+
+def warn_missing_boundaries():
+    """Peringatan jelas saat start kalau provinsi tidak dari polygon batas wilayah."""
+    path = admin_regions.BOUNDARY_FILES["province"]
+    if os.path.exists(path):
+        return
+    fallback = "kota terdekat di data/worldcities.csv" if os.path.exists("data/worldcities.csv") \
+        else "kotak kasar (Sumatera/Jawa Barat, Sulawesi/Maluku, Lainnya)"
+    print(f"⚠️ Polygon batas provinsi tidak ada ({path}): provinsi ditentukan dari {fallback}. "
+          f"Jalankan `python fetch_boundaries.py` untuk mengunduh batas ADM1/ADM2.")
+
+
+def start(watch=True, feed=True):
+    """Load dataset, watcher hot reload dan poller feed; panggilan berikutnya no-op.
+
+    Hook on_prepare/on_publish milik app yang di-import setelah start() tetap
+    dijalankan untuk snapshot aktif (lihat dataset_snapshot.on_prepare).
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return current()
+        warn_missing_boundaries()
+        dataset_snapshot.load(prepare_dataset, DATA_SOURCES)
+        startup_profile.mark("dataset_load")
+        if watch:
+            dataset_snapshot.start_watcher(prepare_dataset, DATA_SOURCES)
+        if feed:
+            # Hanya pemegang lock poller yang upsert; worker lain mengikuti store
+            feed_poller.start_in_thread(ingest_feed_events, on_leader=replay_feed_events)
+            dataset_snapshot.start_follower()
+        _started = True
+    return current()
+
+
+# ----------------------------------------------------------------------
+#                    QUERY
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class EventQuery:
+    """Filter event; field kosong/None = tidak membatasi.
+
+    years dan start_year/end_year (inklusif) memfilter tahun, start_time
+    (inklusif) / end_time (eksklusif) memfilter waktu UTC naive.
+    """
+    provinces: tuple = ()
+    mag_min: float = None
+    mag_max: float = None
+    years: tuple = ()
+    start_year: int = None
+    end_year: int = None
+    start_time: pd.Timestamp = None
+    end_time: pd.Timestamp = None
+
+
+def query_positions(q, snap=None, rows=None):
+    """Posisi baris (urut waktu terbaru dulu) yang lolos query, tanpa menyalin data.
+
+    rows: kandidat posisi dari index lain (mis. grid spasial cross_section).
+    """
+    snap = snap or current()
+    df = snap.df
+    if rows is not None:
+        rows = np.sort(np.asarray(rows, dtype=np.int64))
+        if q.provinces:
+            rows = rows[df["province"].iloc[rows].isin(q.provinces).to_numpy()]
+    elif q.provinces and snap.province_rows is not None:
+        # Pakai index provinsi dari store: hanya baris provinsi terpilih yang discan
+        rows = np.sort(np.concatenate([snap.province_rows.get(p, np.empty(0, dtype=np.int64))
+                                       for p in q.provinces]))
+    elif q.provinces:
+        rows = np.flatnonzero(df["province"].isin(q.provinces).to_numpy())
+    else:
+        rows = np.arange(len(df))
+
+    keep = np.ones(len(rows), dtype=bool)
+    if q.mag_min is not None or q.mag_max is not None:
+        magnitude = df["magnitude"].to_numpy()[rows]
+        if q.mag_min is not None:
+            keep &= magnitude >= q.mag_min
+        if q.mag_max is not None:
+            keep &= magnitude <= q.mag_max
+    if q.years or q.start_year is not None or q.end_year is not None:
+        years = event_table.years(df).to_numpy()[rows]
+        if q.years:
+            keep &= np.isin(years, q.years)
+        if q.start_year is not None:
+            keep &= years >= q.start_year
+        if q.end_year is not None:
+            keep &= years <= q.end_year
+    times = df["time"].to_numpy()[rows]
+    if q.start_time is not None:
+        keep &= times >= pd.Timestamp(q.start_time).to_datetime64()
+    if q.end_time is not None:
+        keep &= times < pd.Timestamp(q.end_time).to_datetime64()
+    rows = rows[keep]
+    order = np.argsort(times[keep], kind="stable")[::-1]
+    return rows[order]
+
+
+def query(q, snap=None):
+    """DataFrame hasil query (urut waktu terbaru dulu)."""
+    snap = snap or current()
+    return snap.df.iloc[query_positions(q, snap)]
+
+
+# ----------------------------------------------------------------------
+#                    FILTER DASHBOARD (default dashv2)
+# ----------------------------------------------------------------------
+def year_window(years, start_year, end_year, snap):
+    """Tahun yang dipakai filter: {"years": [...]} atau {"start": a, "end": b}."""
+    # Cek apakah ada input year range yang valid
+    has_valid_range = (
+        start_year is not None and
+        end_year is not None and
+        start_year >= snap.min_year and
+        end_year <= snap.max_year and
+        start_year <= end_year
+    )
+
+    if years and len(years) > 0:
+        # Prioritas 1: Multiple years selection (hanya jika ada isinya)
+        return {"years": list(years)}
+    if has_valid_range:
+        # Prioritas 2: Year Range input (jika valid)
+        return {"start": start_year, "end": end_year}
+    # Default: 5 tahun terakhir
+    return {"start": snap.max_year - 4, "end": snap.max_year}
+
+
+def dashboard_query(provinces_input, mag_range, years, start_year, end_year, snap):
+    """Input filter dashboard -> EventQuery (provinsi teratas & 5 tahun terakhir sebagai default)."""
+    if not provinces_input:
+        provinces = [snap.top_province] if snap.top_province != 'Lainnya' else snap.df['province'].unique().tolist()
+    else:
+        provinces = provinces_input
+    window = year_window(years, start_year, end_year, snap)
+    return EventQuery(
+        provinces=tuple(provinces),
+        mag_min=mag_range[0],
+        mag_max=mag_range[1],
+        years=tuple(window.get("years", ())),
+        start_year=window.get("start"),
+        end_year=window.get("end"),
+    )
+
+
+def filter_positions(provinces_input, mag_range, years, start_year, end_year, snap=None):
+    """Posisi baris hasil filter dashboard + daftar provinsi efektif."""
+    snap = snap or current()
+    q = dashboard_query(provinces_input, mag_range, years, start_year, end_year, snap)
+    return query_positions(q, snap), list(q.provinces)
+
+
+def filter_data(provinces_input, mag_range, years, start_year, end_year, snap=None):
+    """Fungsi pembantu untuk memfilter DataFrame berdasarkan semua input."""
+    snap = snap or current()
+    positions, provinces = filter_positions(provinces_input, mag_range, years, start_year, end_year, snap)
+    return snap.df.iloc[positions], provinces
+
+
+def section_positions(line, width_km, q=EventQuery(), snap=None):
+    """Event di koridor garis profil (lebar width_km), urut jarak sepanjang garis.
+
+    Kandidat diambil dari grid spasial per versi, lalu filter query dan
+    proyeksi eksak hanya untuk kandidat itu. Mengembalikan (posisi baris,
+    jarak sepanjang garis km, offset dari garis km).
+    """
+    snap = snap or current()
+    half_width = min(float(width_km), cross_section.MAX_WIDTH_KM) / 2
+    candidates = cross_section.grid_for(snap).candidates(line, half_width)
+    rows = query_positions(q, snap, rows=candidates)
+    lat = snap.df["latitude"].to_numpy()[rows]
+    lon = snap.df["longitude"].to_numpy()[rows]
+    inside, along, offset = cross_section.project(lat, lon, line, half_width)
+    order = np.argsort(along[inside], kind="stable")
+    return rows[inside][order], along[inside][order], offset[inside][order]
@@ -0,0 +1,113 @@
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya coalescing antar thread
+    fcntl = None
+
+# ======================================================================
+#            SINGLE FLIGHT (gabungkan callback identik yang bersamaan)
+# ======================================================================
+# Saat banyak operator membuka overview bersamaan dengan filter default,
+# callback yang sama dengan input yang sama dijalankan berkali-kali.
+# Dengan single flight, hanya satu eksekusi (leader) yang berjalan; request
+# lain dengan key yang sama menunggu lalu memakai hasil yang sama.
+#
+# - Antar thread dalam satu worker: selalu aktif.
+# - Antar worker gunicorn (opsional, SEISMO_SINGLE_FLIGHT=shared): leader
+#   mengambil file lock per key; worker lain menunggu lock lalu membaca hasil
+#   yang di-pickle leader (berlaku SHARED_TTL_SECONDS).
+
+FLIGHT_DIR = "data/flight"
+SHARED_TTL_SECONDS = 2.0
+SHARED_ENABLED = os.environ.get("SEISMO_SINGLE_FLIGHT", "") == "shared"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self, shared=SHARED_ENABLED, flight_dir=FLIGHT_DIR):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = shared and fcntl is not None
+        self.flight_dir = flight_dir
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """Jalankan fn() sekali untuk semua pemanggil bersamaan dengan key yang sama."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.followers += 1
+                self.followers += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._shared_do(key, fn) if self.shared else fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _shared_do(self, key, fn):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        os.makedirs(self.flight_dir, exist_ok=True)
+        result_path = os.path.join(self.flight_dir, f"{digest}.pkl")
+        with open(os.path.join(self.flight_dir, f"{digest}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)     # worker lain dengan key sama menunggu di sini
+            try:
+                try:
+                    if time.time() - os.path.getmtime(result_path) < SHARED_TTL_SECONDS:
+                        with open(result_path, "rb") as f:
+                            return pickle.load(f)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    pass
+                result = fn()
+                tmp = f"{result_path}.tmp-{os.getpid()}"
+                try:
+                    with open(tmp, "wb") as f:
+                        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp, result_path)
+                except (OSError, pickle.PicklingError, TypeError, AttributeError):
+                    pass                           # hasil tidak bisa dibagi, tetap dipakai worker ini
+                return result
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+flight = SingleFlight()
+
+
+def coalesce(key_fn):
+    """Decorator callback: panggilan bersamaan dengan key_fn(*args) yang sama berbagi hasil."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = f"{fn.__module__}.{fn.__name__}:{key_fn(*args)}"
+            return flight.do(key, lambda: fn(*args))
+        return wrapper
+    return decorator
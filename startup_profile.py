@@ -0,0 +1,215 @@
+import collections
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# ======================================================================
+#            STARTUP PROFILE (timeline tahap load + memori dataset)
+# ======================================================================
+# Setiap load/reload dataset dicatat sebagai satu "run" berisi tahap-tahap
+# (read_csv, worldcities, balltree, assign_provinces, materialize, mmap,
+# snapshot, warm-up hook, ...) dengan:
+#   wall_ms      waktu nyata
+#   cpu_ms       waktu CPU thread yang menjalankan tahap
+#   retained_mb  kenaikan RSS yang MASIH tertahan setelah tahap selesai
+# Tahap bersarang ditulis sebagai "induk/anak". Kode modul dashv2 sendiri
+# dicatat lewat mark() di run "process".
+#
+# Laporan (timeline + memori per kolom/dtype DataFrame aktif) ditulis ke
+# STARTUP_REPORT_PATH setiap load, dan tersedia di /debug/startup kalau
+# SEISMO_DEBUG=1.
+
+STARTUP_REPORT_PATH = "data/startup/report.json"
+KEEP_RUNS = 10
+DEBUG_ENABLED = os.environ.get("SEISMO_DEBUG", "") == "1"
+
+
+def rss_bytes():
+    """RSS proses saat ini (Linux); di OS lain puncak RSS seumur proses."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _seconds_since_process_start():
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _mb(value):
+    return round(value / 2 ** 20, 2)
+
+
+class StartupProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.created = time.time()
+        self.runs = collections.deque(maxlen=KEEP_RUNS)
+        self._process_run = self._new_run("process")
+        # mark pertama dihitung dari start proses (interpreter + import library)
+        self._last_mark = (time.perf_counter() - _seconds_since_process_start(), 0.0, 0)
+
+    @staticmethod
+    def _new_run(label):
+        return {"label": label, "started": time.time(), "stages": []}
+
+    @contextlib.contextmanager
+    def run(self, label):
+        """Kelompokkan tahap-tahap satu load/reload; nilai yield bisa diberi info tambahan."""
+        run = self._new_run(label)
+        previous, self._local.run = getattr(self._local, "run", None), run
+        wall, cpu, rss = time.perf_counter(), time.thread_time(), rss_bytes()
+        try:
+            yield run
+        finally:
+            self._local.run = previous
+            run.update(wall_ms=round((time.perf_counter() - wall) * 1000, 1),
+                       cpu_ms=round((time.thread_time() - cpu) * 1000, 1),
+                       retained_mb=_mb(rss_bytes() - rss))
+            with self._lock:
+                self.runs.append(run)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Catat satu tahap di run aktif; di luar run (mis. upsert feed) tidak dicatat."""
+        if getattr(self._local, "run", None) is None:
+            yield
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(name)
+        path = "/".join(stack)
+        wall, cpu, rss = time.perf_counter(), time.thread_time(), rss_bytes()
+        try:
+            yield
+        finally:
+            stack.pop()
+            record = {"stage": path,
+                      "wall_ms": round((time.perf_counter() - wall) * 1000, 1),
+                      "cpu_ms": round((time.thread_time() - cpu) * 1000, 1),
+                      "retained_mb": _mb(rss_bytes() - rss)}
+            with self._lock:
+                self._local.run["stages"].append(record)
+
+    def mark(self, name):
+        """Tahap linear di level modul: waktu sejak mark sebelumnya (atau import modul ini)."""
+        wall, cpu, rss = time.perf_counter(), time.process_time(), rss_bytes()
+        last_wall, last_cpu, last_rss = self._last_mark
+        self._last_mark = (wall, cpu, rss)
+        with self._lock:
+            self._process_run["stages"].append({
+                "stage": name,
+                "wall_ms": round((wall - last_wall) * 1000, 1),
+                "cpu_ms": round((cpu - last_cpu) * 1000, 1),
+                "retained_mb": _mb(rss - last_rss),
+            })
+
+
+profiler = StartupProfiler()
+stage = profiler.stage
+mark = profiler.mark
+
+
+# ----------------------------------------------------------------------
+#                        MEMORI DATAFRAME
+# ----------------------------------------------------------------------
+def _is_mapped(array):
+    """True kalau array adalah view ke file mmap (dibagi lewat page cache, bukan privat)."""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def _backing_array(series):
+    values = series.array
+    if isinstance(values, pd.Categorical):
+        return values.codes
+    return getattr(values, "_ndarray", None)
+
+
+def dataframe_memory(df):
+    """Memori per kolom (bytes, dtype, mmap atau privat) + total per dtype."""
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        backing = _backing_array(series)
+        total = int(series.memory_usage(index=False, deep=True))
+        mapped = _is_mapped(backing)
+        # Kategori (string) selalu privat walaupun kodenya di-mmap
+        private = total - backing.nbytes if mapped else total
+        columns.append({"column": str(col), "dtype": str(series.dtype), "bytes": total,
+                        "private_bytes": int(private), "mapped": mapped})
+    by_dtype = collections.defaultdict(int)
+    for c in columns:
+        by_dtype[c["dtype"]] += c["bytes"]
+    index_bytes = int(df.index.memory_usage(deep=True))
+    return {
+        "rows": len(df),
+        "total_mb": _mb(sum(c["bytes"] for c in columns) + index_bytes),
+        "private_mb": _mb(sum(c["private_bytes"] for c in columns) + index_bytes),
+        "index_bytes": index_bytes,
+        "columns": sorted(columns, key=lambda c: c["bytes"], reverse=True),
+        "by_dtype": dict(sorted(by_dtype.items(), key=lambda kv: kv[1], reverse=True)),
+    }
+
+
+def report(snapshot=None):
+    """Laporan lengkap: timeline semua run + memori dataset snapshot aktif."""
+    with profiler._lock:
+        runs = [dict(run, stages=list(run["stages"])) for run in [profiler._process_run, *profiler.runs]]
+    result = {
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - profiler.created, 1),
+        "rss_mb": _mb(rss_bytes()),
+        "runs": runs,
+    }
+    if snapshot is not None:
+        result["dataset"] = {"version": snapshot.version, **dataframe_memory(snapshot.df)}
+    return result
+
+
+def save_report(snapshot=None, path=STARTUP_REPORT_PATH):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(report(snapshot), f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Laporan startup tidak bisa ditulis: {e}")
+
+
+if __name__ == "__main__":
+    # Cold start lengkap lalu cetak ringkasan timeline. Import modul lewat
+    # namanya: profiler yang dipakai dashv2 bukan milik __main__.
+    import dashv2  # noqa: F401
+    import dataset_snapshot
+    import startup_profile
+    data = startup_profile.report(dataset_snapshot.current())
+    for run in data["runs"]:
+        print(f"▶ {run['label']} {run.get('version', '')} {run.get('wall_ms', '')}")
+        for s in run["stages"]:
+            print(f"  {s['stage']:<50}{s['wall_ms']:>10.1f} ms{s['cpu_ms']:>10.1f} cpu{s['retained_mb']:>9.1f} MB")
+    dataset = data.get("dataset", {})
+    print(f"Dataset {dataset.get('version')}: {dataset.get('rows')} baris, {dataset.get('total_mb')} MB "
+          f"({dataset.get('private_mb')} MB privat)")
+    for c in dataset.get("columns", []):
+        print(f"  {c['column']:<20}{c['dtype']:<16}{_mb(c['bytes']):>10.2f} MB{'  mmap' if c['mapped'] else ''}")
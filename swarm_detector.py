@@ -0,0 +1,167 @@
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import event_table
+
+# ======================================================================
+#                 DETEKSI SWARM (streaming, state konstan)
+# ======================================================================
+# Setiap sel grid dan setiap provinsi punya satu counter yang meluruh
+# eksponensial (tau = panjang jendela). Nilai counter ~ jumlah event dalam
+# jendela terakhir, tanpa perlu query ulang ke seluruh `df`.
+
+CELL_DEG = 0.5
+WINDOW_HOURS = 24
+RATIO_THRESHOLD = 5.0     # berapa kali lipat dari baseline historis
+MIN_EVENTS = 5            # minimal event dalam jendela sebelum dianggap swarm
+MAX_ALERTS = 50
+
+
+def epoch_seconds(times):
+    """Konversi kolom waktu (string/datetime, naive atau tz-aware) ke detik epoch."""
+    t = pd.to_datetime(pd.Series(times), utc=True, errors="coerce")
+    return (t - pd.Timestamp("1970-01-01", tz="UTC")).dt.total_seconds().to_numpy()
+
+
+def cell_key(lat, lon):
+    return (math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG))
+
+
+def cell_label(key):
+    lat0, lon0 = key[0] * CELL_DEG, key[1] * CELL_DEG
+    return f"Sel {lat0:.1f}..{lat0 + CELL_DEG:.1f}, {lon0:.1f}..{lon0 + CELL_DEG:.1f}"
+
+
+class SwarmDetector:
+    """Detektor swarm berbasis decayed counter per sel dan per provinsi."""
+
+    def __init__(self, window_hours=WINDOW_HOURS, ratio_threshold=RATIO_THRESHOLD,
+                 min_events=MIN_EVENTS, max_alerts=MAX_ALERTS):
+        self.tau = window_hours * 3600.0
+        self.window_days = window_hours / 24.0
+        self.ratio_threshold = ratio_threshold
+        self.min_events = min_events
+        self.baseline = {}          # ("cell"/"province", key) -> event per hari
+        self.baseline_floor = 0.0
+        self.state = {}             # ("cell"/"province", key) -> [count, last_t, flagged, max_mag, max_t]
+        self.alerts = deque(maxlen=max_alerts)
+        self.processed = 0
+        self.alert_count = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def fit_baseline(self, df):
+        """Hitung laju rata-rata historis (event/hari) per sel dan per provinsi."""
+        if df.empty:
+            return self
+        t = epoch_seconds(df["time"])
+        span_days = max((np.nanmax(t) - np.nanmin(t)) / 86400.0, 1.0)
+
+        lat_idx = np.floor(df["latitude"].to_numpy() / CELL_DEG).astype(int)
+        lon_idx = np.floor(df["longitude"].to_numpy() / CELL_DEG).astype(int)
+        cells = pd.Series(1, index=pd.MultiIndex.from_arrays([lat_idx, lon_idx])).groupby(level=[0, 1]).sum()
+        baseline = {("cell", key): n / span_days for key, n in cells.items()}
+        if "province" in df.columns:
+            for prov, n in df["province"].value_counts().items():
+                baseline[("province", prov)] = n / span_days
+
+        with self._lock:
+            self.baseline = baseline
+            # Sel tanpa histori tetap punya baseline minimal (1 event sepanjang katalog)
+            self.baseline_floor = 1.0 / span_days
+        return self
+
+    def expected(self, key):
+        return max(self.baseline.get(key, 0.0), self.baseline_floor) * self.window_days
+
+    # ------------------------------------------------------------------
+    def _update(self, key, t, label, magnitude):
+        entry = self.state.get(key)
+        if entry is None:
+            entry = self.state[key] = [0.0, t, False, math.nan, t]
+        dt = max(t - entry[1], 0.0)
+        entry[0] = entry[0] * math.exp(-dt / self.tau) + 1.0
+        entry[1] = max(entry[1], t)
+        # M maks dalam jendela: maksimum lama kedaluwarsa setelah tau detik
+        # (perkiraan dengan state konstan, sama seperti counter)
+        if not math.isnan(magnitude) and (
+                math.isnan(entry[3]) or magnitude >= entry[3] or t - entry[4] > self.tau):
+            entry[3], entry[4] = magnitude, t
+
+        expected = self.expected(key)
+        ratio = entry[0] / expected if expected > 0 else float("inf")
+        is_swarm = entry[0] >= self.min_events and ratio >= self.ratio_threshold
+        if is_swarm and not entry[2]:
+            self.alerts.appendleft({
+                "time": pd.Timestamp(t, unit="s", tz="UTC").strftime("%Y-%m-%d %H:%M"),
+                "scope": key[0],
+                "label": label,
+                "count": round(entry[0], 1),
+                "expected": round(expected, 2),
+                "ratio": round(ratio, 1),
+                "max_magnitude": entry[3],
+            })
+            self.alert_count += 1
+        entry[2] = is_swarm
+
+    def consume(self, events):
+        """Proses batch event baru (DataFrame) secara berurutan waktu; return jumlah alert baru."""
+        if events is None or len(events) == 0:
+            return 0
+        t = epoch_seconds(events["time"])
+        order = np.argsort(t, kind="stable")
+        lats = events["latitude"].to_numpy()
+        lons = events["longitude"].to_numpy()
+        mags = events["magnitude"].to_numpy()
+        provinces = events["province"].to_numpy() if "province" in events.columns else None
+
+        with self._lock:
+            alerts_before = self.alert_count
+            for i in order:
+                if not np.isfinite(t[i]) or not np.isfinite(lats[i]) or not np.isfinite(lons[i]):
+                    continue
+                ck = cell_key(lats[i], lons[i])
+                self._update(("cell", ck), t[i], cell_label(ck), event_table.display_value(mags[i], "magnitude"))
+                if provinces is not None and provinces[i] != "Lainnya":
+                    self._update(("province", provinces[i]), t[i], str(provinces[i]),
+                                 event_table.display_value(mags[i], "magnitude"))
+                self.processed += 1
+            return self.alert_count - alerts_before
+
+    def recent_alerts(self, limit=10):
+        with self._lock:
+            return list(self.alerts)[:limit]
+
+    def active(self):
+        """Key yang saat ini masih berstatus swarm."""
+        with self._lock:
+            return [key for key, entry in self.state.items() if entry[2]]
+
+
+def replay(df, detector=None, batch_size=1000):
+    """Putar ulang katalog sebagai stream (untuk uji throughput / warm-up)."""
+    detector = detector or SwarmDetector().fit_baseline(df)
+    ordered = df.iloc[np.argsort(epoch_seconds(df["time"]), kind="stable")]
+    for start in range(0, len(ordered), batch_size):
+        detector.consume(ordered.iloc[start:start + batch_size])
+    return detector
+
+
+if __name__ == "__main__":
+    catalog = pd.read_csv("data/combined/combined.csv")
+    catalog["time"] = pd.to_datetime(catalog["time"], utc=True, format="mixed", errors="coerce")
+    catalog = catalog.dropna(subset=["time"])
+    last_year = catalog[catalog["time"] >= catalog["time"].max() - pd.Timedelta(days=365)]
+
+    start = time.perf_counter()
+    result = replay(last_year, SwarmDetector().fit_baseline(catalog))
+    elapsed = time.perf_counter() - start
+    print(f"✅ Replay {len(last_year)} event dalam {elapsed:.2f} detik "
+          f"({len(last_year) / max(elapsed, 1e-9):,.0f} event/detik), {len(result.alerts)} alert.")
+    for alert in result.recent_alerts(5):
+        print(f"   {alert['time']}  {alert['label']}: {alert['count']} event (x{alert['ratio']})")
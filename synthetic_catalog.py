@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ======================================================================
+#            KATALOG SINTETIS (untuk benchmark & load test)
+# ======================================================================
+# Katalog gempa buatan di wilayah Indonesia dengan distribusi yang mirip
+# data asli, supaya hasil benchmark di 100k / 1M / 10M event bisa dipercaya:
+# - magnitudo mengikuti Gutenberg–Richter (b ≈ 1 di atas magnitudo lengkap)
+# - episenter terkumpul di sepanjang zona subduksi/sesar utama + sedikit
+#   kegempaan latar di seluruh wilayah
+# - kedalaman campuran dangkal (kerak/megathrust) dan menengah–dalam (slab)
+# - sebagian event adalah susulan yang mengelompok di ruang & waktu
+# Kolom sama dengan combined.csv: time, latitude, longitude, depth,
+# magnitude, place, source.
+
+MAG_COMPLETENESS = 2.5
+B_VALUE = 1.0
+MAX_MAGNITUDE = 9.3
+START_TIME = pd.Timestamp("2000-01-01")
+END_TIME = pd.Timestamp("2025-10-01")
+AFTERSHOCK_FRACTION = 0.2
+
+# (nama region, titik (lat, lon) sepanjang jalur, bobot kegempaan)
+SOURCE_ZONES = [
+    ("Northern Sumatra, Indonesia", [(5.5, 94.5), (2.0, 96.5), (-1.0, 98.5)], 1.5),
+    ("Southern Sumatra, Indonesia", [(-1.0, 98.5), (-4.0, 101.0), (-6.0, 103.5)], 1.2),
+    ("Java, Indonesia", [(-6.0, 103.5), (-8.5, 107.0), (-9.5, 111.0), (-10.0, 114.5)], 1.2),
+    ("Bali-Nusa Tenggara, Indonesia", [(-10.0, 114.5), (-10.3, 118.0), (-10.5, 121.0)], 0.9),
+    ("Banda Sea", [(-10.5, 121.0), (-9.0, 125.0), (-7.5, 129.0), (-5.0, 131.0), (-4.0, 129.5)], 1.0),
+    ("Molucca Sea", [(3.5, 125.5), (1.5, 126.5), (-1.0, 127.0)], 1.1),
+    ("Sulawesi, Indonesia", [(1.0, 120.0), (-1.0, 119.8), (-2.5, 121.0)], 0.6),
+    ("Papua, Indonesia", [(-2.5, 134.0), (-3.5, 138.0), (-3.0, 141.0)], 0.8),
+]
+BACKGROUND_FRACTION = 0.08
+BACKGROUND_BOUNDS = (-11.0, 6.0, 94.0, 141.0)     # lat_min, lat_max, lon_min, lon_max
+ZONE_SPREAD_DEG = 0.6
+
+
+def _segments():
+    """Semua segmen jalur zona + panjang berbobot (untuk sampling proporsional)."""
+    starts, ends, names, weights = [], [], [], []
+    for name, points, weight in SOURCE_ZONES:
+        for a, b in zip(points[:-1], points[1:]):
+            starts.append(a)
+            ends.append(b)
+            names.append(name)
+            weights.append(weight * np.hypot(b[0] - a[0], b[1] - a[1]))
+    weights = np.asarray(weights)
+    return np.asarray(starts), np.asarray(ends), names, weights / weights.sum()
+
+
+def gutenberg_richter(rng, n, mc=MAG_COMPLETENESS, b=B_VALUE, max_mag=MAX_MAGNITUDE):
+    """Magnitudo dengan log10 N(>=M) = a - b*M, dibulatkan 0.1."""
+    mags = mc - np.log10(1.0 - rng.random(n)) / b
+    return np.round(np.minimum(mags, max_mag), 1)
+
+
+def _depths(rng, n):
+    shallow = rng.random(n) < 0.7
+    depth = np.where(shallow, 5.0 + rng.exponential(15.0, n), 60.0 + rng.exponential(120.0, n))
+    return np.round(np.minimum(depth, 700.0), 1)
+
+
+def generate(n, seed=0):
+    """DataFrame n event sintetis, urut waktu terbaru dulu (seperti combined.csv)."""
+    rng = np.random.default_rng(seed)
+    starts, ends, names, probs = _segments()
+    names = np.asarray(names + ["Indonesia Region"])
+
+    n_after = int(n * AFTERSHOCK_FRACTION)
+    n_main = n - n_after
+
+    # Event utama: di zona (titik acak sepanjang segmen + jitter) atau latar
+    segment = rng.choice(len(probs), size=n_main, p=probs)
+    t = rng.random(n_main)[:, None]
+    points = starts[segment] + t * (ends[segment] - starts[segment])
+    lat = points[:, 0] + rng.normal(0, ZONE_SPREAD_DEG, n_main)
+    lon = points[:, 1] + rng.normal(0, ZONE_SPREAD_DEG, n_main)
+    background = rng.random(n_main) < BACKGROUND_FRACTION
+    lat_min, lat_max, lon_min, lon_max = BACKGROUND_BOUNDS
+    lat[background] = rng.uniform(lat_min, lat_max, background.sum())
+    lon[background] = rng.uniform(lon_min, lon_max, background.sum())
+    segment[background] = len(probs)
+    span = (END_TIME - START_TIME).value
+    times = START_TIME.value + (rng.random(n_main) * span).astype(np.int64)
+
+    # Susulan: induk dipilih condong ke event besar, waktu meluruh (Omori kasar)
+    mags_main = gutenberg_richter(rng, n_main)
+    if n_after:
+        weight = 10.0 ** (mags_main - mags_main.max())
+        parent = rng.choice(n_main, size=n_after, p=weight / weight.sum())
+        delay = (rng.pareto(1.1, n_after) * 3600e9).astype(np.int64)    # jam -> ns
+        lat = np.concatenate([lat, lat[parent] + rng.normal(0, 0.15, n_after)])
+        lon = np.concatenate([lon, lon[parent] + rng.normal(0, 0.15, n_after)])
+        times = np.concatenate([times, np.minimum(times[parent] + delay, END_TIME.value)])
+        segment = np.concatenate([segment, segment[parent]])
+        mags = np.concatenate([mags_main, np.minimum(gutenberg_richter(rng, n_after), mags_main[parent] - 0.1)])
+    else:
+        mags = mags_main
+
+    df = pd.DataFrame({
+        "time": pd.to_datetime(times // 1_000_000 * 1_000_000),     # presisi milidetik seperti USGS
+        "latitude": np.round(np.clip(lat, -15.0, 10.0), 4),
+        "longitude": np.round(np.clip(lon, 90.0, 145.0), 4),
+        "depth": _depths(rng, n),
+        "magnitude": np.maximum(mags, MAG_COMPLETENESS),
+        "place": names[segment],
+        "source": np.where(rng.random(n) < 0.5, "USGS", "EMSC"),
+    })
+    return df.sort_values("time", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def write_source_csvs(df, usgs_folder, emsc_folder, files_per_source=4):
+    """Tulis katalog ke CSV bergaya USGS & EMSC (input load_and_combine)."""
+    os.makedirs(usgs_folder, exist_ok=True)
+    os.makedirs(emsc_folder, exist_ok=True)
+    usgs = df[df["source"] == "USGS"]
+    emsc = df[df["source"] == "EMSC"]
+    for i, part in enumerate(np.array_split(np.arange(len(usgs)), files_per_source)):
+        chunk = usgs.iloc[part]
+        pd.DataFrame({
+            "time": chunk["time"].dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "latitude": chunk["latitude"], "longitude": chunk["longitude"],
+            "depth": chunk["depth"], "mag": chunk["magnitude"], "magType": "mb",
+            "id": [f"syn{j}" for j in part], "place": chunk["place"], "type": "earthquake",
+        }).to_csv(os.path.join(usgs_folder, f"query ({i + 1}).csv"), index=False)
+    # Header sama dengan export EMSC yang ada di data/EMSC
+    for i, part in enumerate(np.array_split(np.arange(len(emsc)), files_per_source)):
+        chunk = emsc.iloc[part]
+        pd.DataFrame({
+            "tbdat href": "", "Date_Time": chunk["time"].dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "lat": chunk["latitude"], "lon": chunk["longitude"],
+            "depth": chunk["depth"], "mag": chunk["magnitude"], "reg": chunk["place"].str.upper(),
+        }).to_csv(os.path.join(emsc_folder, f"emsc_{i + 1}.csv"), index=False)
@@ -0,0 +1,48 @@
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Modul app ada di root repo (bukan package): tambahkan ke sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dataset_snapshot  # noqa: E402
+import event_table  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+PROVINCES = ("Jawa Barat", "Bali", "Sulawesi Tengah", "Papua", "Lainnya")
+
+_versions = itertools.count(1)
+
+
+def make_catalog(n=40, seed=0):
+    """Katalog kecil deterministik dalam bentuk kompak (seperti hasil prepare_dataset)."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "time": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 5 * 365, n)), unit="D"),
+        "latitude": np.round(rng.uniform(-10, 5, n), 4),
+        "longitude": np.round(rng.uniform(95, 140, n), 4),
+        "depth": np.round(rng.uniform(5, 300, n), 1),
+        "magnitude": np.round(rng.uniform(2.5, 7.0, n), 1),
+        "place": "test",
+        "province": rng.choice(PROVINCES, n),
+        "event_id": [f"ev{i}" for i in range(n)],
+        "source": "TEST",
+    })
+    return event_table.compact(df)
+
+
+def publish_catalog(df):
+    """Publish df sebagai versi baru (hook on_prepare/on_publish ikut jalan)."""
+    return dataset_snapshot.publish(dataset_snapshot.build_snapshot(df, f"test-{next(_versions)}"))
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    """Snapshot aktif dari make_catalog(); snapshot sebelumnya dipulihkan setelah tes."""
+    monkeypatch.setattr(dataset_snapshot, "_current", dataset_snapshot._current)
+    return publish_catalog(make_catalog())
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+import admin_regions
+import region_tree
+import seismo_engine
+from conftest import FIXTURES
+
+pytest.importorskip("shapely")
+
+BOUNDARIES = os.path.join(FIXTURES, "boundaries")
+FILES = {"province": "provinces.geojson", "regency": "regencies.geojson", "district": "districts.geojson"}
+
+
+@pytest.fixture
+def boundaries(monkeypatch):
+    """Polygon batas sederhana (kotak kasar, bukan batas resmi) untuk ADM1/ADM2/ADM3."""
+    for level, name in FILES.items():
+        monkeypatch.setitem(admin_regions.BOUNDARY_FILES, level, os.path.join(BOUNDARIES, name))
+    monkeypatch.setattr(admin_regions, "_layers", None)
+    admin_regions._cache.clear()
+    yield
+    admin_regions._cache.clear()
+
+
+def events(points):
+    lat, lon = zip(*points)
+    return pd.DataFrame({"time": pd.Timestamp("2025-01-01"), "latitude": lat, "longitude": lon,
+                         "depth": 10.0, "magnitude": 4.5})
+
+
+def test_assign_provinces_uses_boundary_polygons(boundaries):
+    assert admin_regions.available()
+    df = seismo_engine.assign_provinces(events([
+        (-6.20, 106.85),     # Jakarta: di dalam DKI Jakarta dan Jawa Barat, polygon pertama menang
+        (-6.88, 107.62),     # Bandung: sampai level kecamatan
+        (-9.00, 115.20),     # laut selatan Bali: polygon terdekat (< OFFSHORE_MAX_KM)
+        (0.00, 130.00),      # jauh dari semua polygon
+    ]))
+    assert df["province"].tolist() == ["DKI Jakarta", "Jawa Barat", "Bali", "Lainnya"]
+    assert df["regency"].tolist() == ["Kabupaten Bogor", "Kota Bandung", "Kabupaten Badung", "Lainnya"]
+    assert df["district"].tolist()[1] == "Coblong"
+
+
+def test_region_tree_has_regency_and_district_levels(boundaries):
+    df = seismo_engine.assign_provinces(events([(-6.88, 107.62), (-6.89, 107.63), (-8.70, 115.20)]))
+    tree = region_tree.RegionTree.build(df)
+    assert tree.levels == region_tree.LEVELS
+    assert tree.node(("Jawa", "Jawa Barat", "Kota Bandung", "Coblong")).count == 2
+    assert tree.node(("Bali & Nusa Tenggara", "Bali", "Kabupaten Badung")).count == 1
+
+
+def test_without_boundary_files_falls_back(monkeypatch):
+    for level in admin_regions.BOUNDARY_FILES:
+        monkeypatch.setitem(admin_regions.BOUNDARY_FILES, level, os.path.join(BOUNDARIES, "missing.geojson"))
+    monkeypatch.setattr(admin_regions, "_layers", None)
+    df = seismo_engine.assign_provinces(events([(-6.2, 106.85)]))
+    assert "regency" not in df.columns
+    assert region_tree.levels_for(df) == ("island", "province")
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cluster_analysis
+import event_table
+
+pytest.importorskip("sklearn")
+
+
+def blob(lat, lon, n, province, rng, spread=0.05):
+    return pd.DataFrame({
+        "time": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "latitude": lat + rng.normal(0, spread, n), "longitude": lon + rng.normal(0, spread, n),
+        "depth": 10.0, "magnitude": rng.uniform(3, 5, n), "province": province,
+    })
+
+
+def test_dense_groups_become_clusters_per_island():
+    rng = np.random.default_rng(0)
+    df = event_table.compact(pd.concat([
+        blob(-0.9, 119.9, 40, "Sulawesi Tengah", rng),
+        blob(-8.3, 115.2, 15, "Bali", rng),
+        blob(-6.0, 106.0, 3, "Banten", rng),                   # terlalu sedikit
+        pd.DataFrame({"time": pd.Timestamp("2024-01-01"), "latitude": rng.uniform(-10, 5, 30),
+                      "longitude": rng.uniform(95, 140, 30), "depth": 10.0, "magnitude": 3.0,
+                      "province": "Lainnya"}),                  # tersebar
+    ], ignore_index=True))
+    steps = []
+    clusters = cluster_analysis.find_clusters(df, radius_km=25, min_events=10,
+                                              progress=lambda done, total, label: steps.append((done, total)))
+    assert clusters["events"].tolist() == [40, 15]
+    assert clusters["province"].tolist() == ["Sulawesi Tengah", "Bali"]
+    assert clusters["island"].tolist() == ["Sulawesi", "Bali & Nusa Tenggara"]
+    assert clusters.loc[0, "latitude"] == pytest.approx(-0.9, abs=0.05)
+    assert steps[-1][0] == steps[-1][1] == len(steps)
+
+
+def test_no_clusters_returns_empty_frame():
+    df = event_table.compact(blob(-0.9, 119.9, 5, "Sulawesi Tengah", np.random.default_rng(1)))
+    clusters = cluster_analysis.find_clusters(df, min_events=10)
+    assert clusters.empty
+    assert list(clusters.columns) == cluster_analysis.COLUMNS
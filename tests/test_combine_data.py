@@ -0,0 +1,19 @@
+import pandas as pd
+
+import combine_data
+import synthetic_catalog
+
+
+def test_emsc_date_time_rows_are_kept(tmp_path):
+    catalog = synthetic_catalog.generate(200, seed=1)
+    usgs_dir, emsc_dir = tmp_path / "usgs", tmp_path / "emsc"
+    synthetic_catalog.write_source_csvs(catalog, str(usgs_dir), str(emsc_dir))
+
+    df = combine_data.load_and_combine(str(usgs_dir), str(emsc_dir), output_csv=str(tmp_path / "out" / "c.csv"))
+
+    assert len(df) == len(catalog)
+    assert (df["source"] == "EMSC").sum() == (catalog["source"] == "EMSC").sum()
+    emsc = df[df["source"] == "EMSC"]
+    assert emsc["place"].notna().all()
+    # Satu format waktu untuk kedua sumber
+    assert pd.to_datetime(df["time"], utc=True).notna().all()
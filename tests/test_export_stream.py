@@ -0,0 +1,54 @@
+import gzip
+import io
+import json
+
+import flask
+import numpy as np
+import pytest
+
+import export_stream
+
+EMPTY = np.array([], dtype=np.int64)
+
+
+def export(snap, positions, fmt, columns=None):
+    app = flask.Flask(__name__)
+    with app.test_request_context():
+        response = export_stream.export_response(snap, positions, fmt, columns)
+        return response.status_code, response.get_data()
+
+
+def test_empty_csv_still_has_header(snapshot):
+    status, body = export(snapshot, EMPTY, "csv", ["time", "magnitude", "province"])
+    assert status == 200
+    assert gzip.decompress(body).decode() == "time,magnitude,province\n"
+
+
+def test_empty_geojson_is_valid_collection(snapshot):
+    status, body = export(snapshot, EMPTY, "geojson")
+    assert json.loads(body) == {"type": "FeatureCollection", "features": []}
+
+
+def test_empty_parquet_keeps_schema(snapshot):
+    pq = pytest.importorskip("pyarrow.parquet")
+    status, body = export(snapshot, EMPTY, "parquet", ["time", "latitude", "magnitude"])
+    table = pq.read_table(io.BytesIO(body))
+    assert table.num_rows == 0
+    assert table.schema.names == ["time", "latitude", "magnitude"]
+
+
+def test_parquet_rows_use_display_values(snapshot):
+    pq = pytest.importorskip("pyarrow.parquet")
+    positions = np.arange(5)
+    _, body = export(snapshot, positions, "parquet", ["magnitude"])
+    exported = pq.read_table(io.BytesIO(body)).column("magnitude").to_pylist()
+    expected = export_stream.event_table.display(snapshot.df.iloc[positions][["magnitude"]])["magnitude"].tolist()
+    assert exported == expected       # float64 dibulatkan, bukan 4.300000190734863
+
+
+def test_csv_chunks_write_header_once(snapshot):
+    positions = np.arange(len(snapshot.df))
+    chunks = export_stream.iter_chunks(snapshot.df, positions, ["event_id"], chunk_rows=7)
+    lines = gzip.decompress(b"".join(export_stream.iter_csv_gzip(chunks))).decode().splitlines()
+    assert lines[0] == "event_id"
+    assert len(lines) == len(snapshot.df) + 1
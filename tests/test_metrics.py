@@ -0,0 +1,13 @@
+import metrics
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_total", "uji", ("callback",))
+    counter.inc('a\\b"c\nd')
+    assert counter.render()[-1] == 'test_total{callback="a\\\\b\\"c\\nd"} 1'
+
+
+def test_histogram_labels_are_escaped():
+    histogram = metrics.Histogram("test_seconds", "uji", (1.0,), ("route",))
+    histogram.observe(0.5, '/"x"')
+    assert 'test_seconds_count{route="/\\"x\\""} 1' in histogram.render()
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+import content_store
+import posko_import
+
+pytest.importorskip("sklearn")
+
+# ~20 m ke utara = 0.00018°; ~200 m = 0.0018°
+CSV = """nama,latitude,longitude,alamat,link
+Posko A,-6.9000,107.6000,Jl. A,
+Posko A2,-6.89982,107.6000,Jl. A (dobel),
+Posko C,-6.9018,107.6000,Jl. C,
+Dekat SDN,-7.25765,112.7521,,
+Tanpa koordinat,,,Jl. ?,
+Dari link,,,,"https://www.google.com/maps/@-6.95,107.65,17z"
+"""
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Database posko terpisah per tes (berisi SEED_POSTS)."""
+    monkeypatch.setattr(content_store, "DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(content_store, "_local", threading.local())
+    content_store.init_db()
+    yield
+    content_store.connect().close()
+
+
+def test_duplicates_against_file_and_existing_posts(db):
+    summary = posko_import.import_posts(CSV.encode(), "posko.csv")
+    assert summary["total"] == 6
+    assert summary["imported"] == 3                 # A, C, dari link
+    assert summary["duplicates"] == 2               # A2 (sesama file), dekat SDN Surabaya 1 (sudah ada)
+    errors = {e["name"]: (e["row"], e["error"]) for e in summary["errors"]}
+    assert errors["Posko A2"][0] == 3               # nomor baris CSV (header = baris 1)
+    assert errors["Posko A2"][1].startswith("duplikat")
+    assert errors["Dekat SDN"][1].startswith("duplikat")
+    assert errors["Tanpa koordinat"][1] == "koordinat tidak ditemukan"
+    assert "Posko A" not in errors and "Posko C" not in errors
+
+    names = {p["name"] for p in content_store.posts_in_bbox(-7.0, -6.8, 107.5, 107.7, limit=-1)}
+    assert names == {"Posko A", "Posko C", "Dari link"}
+
+
+def test_reimport_is_all_duplicates(db):
+    posko_import.import_posts(CSV.encode(), "posko.csv")
+    again = posko_import.import_posts(CSV.encode(), "posko.csv")
+    assert again["imported"] == 0
+    assert again["duplicates"] == 5
+    assert again["error_count"] == 6
+
+
+def test_geojson_duplicate_within_radius(db):
+    geojson = b"""{"type": "FeatureCollection", "features": [
+      {"type": "Feature", "properties": {"name": "P1"}, "geometry": {"type": "Point", "coordinates": [110.0, -7.0]}},
+      {"type": "Feature", "properties": {"name": "P2"}, "geometry": {"type": "Point", "coordinates": [110.0003, -7.0]}},
+      {"type": "Feature", "properties": {"name": "P3"}, "geometry": {"type": "Point", "coordinates": [110.001, -7.0]}}
+    ]}"""
+    summary = posko_import.import_posts(geojson, "posko.geojson")
+    # P2 ~33 m dari P1 (duplikat), P3 ~110 m dari P1 (tidak)
+    assert (summary["imported"], summary["duplicates"]) == (2, 1)
+    assert summary["errors"][0]["name"] == "P2"
+
+
+def test_concurrent_imports_do_not_both_insert(db):
+    barrier = threading.Barrier(4)
+    summaries = []
+
+    def run():
+        barrier.wait()
+        summaries.append(posko_import.import_posts(CSV.encode(), "posko.csv"))
+        content_store.connect().close()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(s["imported"] for s in summaries) == 3
+    names = [p["name"] for p in content_store.posts_in_bbox(-7.0, -6.8, 107.5, 107.7, limit=-1)]
+    assert sorted(names) == ["Dari link", "Posko A", "Posko C"]
@@ -0,0 +1,65 @@
+import flask
+import pytest
+
+import query_api
+import seismo_engine
+from conftest import make_catalog, publish_catalog
+
+
+@pytest.fixture
+def client(snapshot):
+    app = flask.Flask(__name__)
+    app.register_blueprint(query_api.create_blueprint(seismo_engine.filter_positions))
+    return app.test_client()
+
+
+def test_cursor_pages_cover_all_events_once(client, snapshot):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 15, "fields": "event_id"}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/events", query_string=params).get_json()
+        assert body["version"] == snapshot.version
+        assert body["total"] == len(snapshot.df)
+        ids += [row["event_id"] for row in body["events"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert sorted(ids) == sorted(snapshot.df["event_id"].astype(str))
+
+
+def test_cursor_from_old_version_is_gone(client, snapshot):
+    cursor = client.get("/api/events", query_string={"limit": 10}).get_json()["next_cursor"]
+    publish_catalog(make_catalog(seed=1))
+    response = client.get("/api/events", query_string={"limit": 10, "cursor": cursor})
+    assert response.status_code == 410
+    assert "error" in response.get_json()
+
+
+def test_invalid_cursor_is_bad_request(client):
+    assert client.get("/api/events", query_string={"cursor": "bukan-cursor"}).status_code == 400
+
+
+def test_etag_revalidation(client, snapshot):
+    first = client.get("/api/aggregates", query_string={"by": "year"})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["X-Dataset-Version"] == snapshot.version
+
+    again = client.get("/api/aggregates", query_string={"by": "year"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    # Urutan parameter tidak mengubah ETag
+    reordered = client.get("/api/events?limit=5&fields=event_id")
+    same = client.get("/api/events?fields=event_id&limit=5", headers={"If-None-Match": reordered.headers["ETag"]})
+    assert same.status_code == 304
+
+    # Versi baru: ETag lama tidak berlaku lagi
+    publish_catalog(make_catalog(seed=2))
+    after = client.get("/api/aggregates", query_string={"by": "year"}, headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import event_table
+import region_tree
+from conftest import make_catalog
+
+
+def assert_same_tree(actual, expected):
+    assert set(actual.nodes) == set(expected.nodes)
+    for path, node in expected.nodes.items():
+        got = actual.nodes[path]
+        assert (got.count, got.mag_count, got.depth_count) == (node.count, node.mag_count, node.depth_count), path
+        assert got.mag_sum == pytest.approx(node.mag_sum)
+        assert got.depth_sum == pytest.approx(node.depth_sum)
+        assert (got.mag_min, got.mag_max, got.depth_min, got.depth_max) == \
+            pytest.approx((node.mag_min, node.mag_max, node.depth_min, node.depth_max), nan_ok=True)
+        assert got.latest_time == node.latest_time
+    assert actual.children == expected.children
+
+
+def upsert(df, rows):
+    """Sama dengan dataset_snapshot._merge: baris lama dengan event_id sama dibuang, baris baru di ekor."""
+    rows = event_table.compact(rows)
+    existing = df["event_id"].isin(rows["event_id"]).to_numpy()
+    merged = event_table.concat([df[~existing], rows])
+    return merged, merged.iloc[len(merged) - len(rows):], df[existing]
+
+
+def rows_like(df, ids, **changes):
+    rows = event_table.display(df[df["event_id"].isin(ids)]).reset_index(drop=True)
+    rows["province"] = rows["province"].astype(str)
+    for col, value in changes.items():
+        rows[col] = value
+    return rows
+
+
+@pytest.mark.parametrize("case", ["new_only", "replace_extremes", "move_province"])
+def test_apply_matches_build(case):
+    df = make_catalog(n=60)
+    tree = region_tree.RegionTree.build(df)
+    strongest = str(df.loc[df["magnitude"].idxmax(), "event_id"])
+    latest = str(df.loc[df["time"].idxmax(), "event_id"])
+    fresh = rows_like(df, ["ev0", "ev1"], event_id=["new0", "new1"], magnitude=[3.1, 5.4],
+                      time=pd.Timestamp("2026-01-01"))
+
+    if case == "new_only":
+        rows = fresh
+    elif case == "replace_extremes":
+        # Event terkuat & terbaru diganti (magnitudo turun): node yang dilalui dihitung ulang
+        rows = pd.concat([fresh, rows_like(df, [strongest, latest], magnitude=2.6, depth=np.nan)], ignore_index=True)
+    else:
+        # Semua event satu provinsi pindah: node provinsi lama hilang
+        ids = df.loc[df["province"] == "Bali", "event_id"].astype(str).tolist()
+        rows = rows_like(df, ids, province="Papua")
+
+    merged, upserted, replaced = upsert(df, rows)
+    assert_same_tree(tree.apply(merged, upserted, replaced), region_tree.RegionTree.build(merged))
+    if case == "move_province":
+        assert tree.node(("Bali & Nusa Tenggara", "Bali")) is not None
+        assert tree.apply(merged, upserted, replaced).node(("Bali & Nusa Tenggara", "Bali")) is None
+
+
+def test_apply_leaves_original_tree_untouched():
+    df = make_catalog(n=30)
+    tree = region_tree.RegionTree.build(df)
+    before = dict(tree.nodes)
+    merged, upserted, replaced = upsert(df, rows_like(df, ["ev3"], magnitude=6.9))
+    tree.apply(merged, upserted, replaced)
+    assert tree.nodes == before
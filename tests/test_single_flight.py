@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+import single_flight
+
+THREADS = 8
+
+
+def run_concurrently(flight, loader):
+    """THREADS pemanggil dengan key sama; loader ditahan sampai semua follower menunggu."""
+    outcomes = [None] * THREADS
+
+    def call(i):
+        try:
+            outcomes[i] = ("ok", flight.do("overview:default", loader))
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads)
+    return outcomes
+
+
+def blocking_loader(flight, result=None, error=None):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flight.followers < THREADS - 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        if error is not None:
+            raise error
+        return result
+
+    return loader, calls
+
+
+def test_loader_runs_once_and_result_is_shared():
+    flight = single_flight.SingleFlight(shared=False)
+    result = {"rows": [1, 2, 3]}
+    loader, calls = blocking_loader(flight, result=result)
+
+    outcomes = run_concurrently(flight, loader)
+
+    assert len(calls) == 1
+    assert (flight.leaders, flight.followers) == (1, THREADS - 1)
+    assert all(kind == "ok" and value is result for kind, value in outcomes)
+
+
+def test_error_reaches_every_waiter():
+    flight = single_flight.SingleFlight(shared=False)
+    error = RuntimeError("query gagal")
+    loader, calls = blocking_loader(flight, error=error)
+
+    outcomes = run_concurrently(flight, loader)
+
+    assert len(calls) == 1
+    assert all(kind == "error" and value is error for kind, value in outcomes)
+    # Key dilepas setelah gagal: panggilan berikutnya menjalankan loader lagi
+    assert flight.do("overview:default", lambda: "ulang") == "ulang"
+
+
+@pytest.mark.skipif(single_flight.fcntl is None, reason="butuh fcntl")
+def test_shared_mode_runs_loader_once(tmp_path):
+    flight = single_flight.SingleFlight(shared=True, flight_dir=str(tmp_path))
+    loader, calls = blocking_loader(flight, result=[4, 5, 6])
+
+    outcomes = run_concurrently(flight, loader)
+
+    assert len(calls) == 1
+    assert all(kind == "ok" and value == [4, 5, 6] for kind, value in outcomes)
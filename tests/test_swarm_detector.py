@@ -0,0 +1,30 @@
+import pandas as pd
+
+import swarm_detector
+
+
+def burst(times, magnitudes):
+    return pd.DataFrame({
+        "time": pd.to_datetime(times, utc=True),
+        "latitude": -7.1, "longitude": 110.1,
+        "magnitude": magnitudes, "province": "Jawa Tengah",
+    })
+
+
+def test_alert_reports_largest_magnitude_in_window():
+    detector = swarm_detector.SwarmDetector(min_events=3, ratio_threshold=1)
+    detector.consume(burst(["2025-01-01 00:00", "2025-01-01 01:00", "2025-01-01 02:00", "2025-01-01 03:00"],
+                           [3.0, 5.2, 4.0, 3.1]))
+
+    alerts = detector.recent_alerts()
+    assert alerts
+    assert all(a["max_magnitude"] == 5.2 for a in alerts)
+
+
+def test_window_max_expires():
+    detector = swarm_detector.SwarmDetector(min_events=3, ratio_threshold=1)
+    detector.consume(burst(["2025-01-01 00:00"], [6.0]))
+    detector.consume(burst(["2025-01-03 00:00", "2025-01-03 01:00", "2025-01-03 02:00", "2025-01-03 03:00"],
+                           [3.0, 3.4, 3.2, 3.1]))
+
+    assert detector.recent_alerts()[0]["max_magnitude"] == 3.4
@@ -0,0 +1,347 @@
+import argparse
+import math
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, Response
+
+import single_flight
+
+# ======================================================================
+#            TILE CACHE (proxy tile peta + MBTiles lokal)
+# ======================================================================
+# Peta (map-graph, evacuation-map) memakai tile raster dari /tiles/{z}/{x}/{y}.png
+# di server ini, bukan langsung dari server OSM publik:
+#   - tile dibaca dari file MBTiles (SQLite) TILE_CACHE_PATH
+#   - miss: diambil dari TILE_UPSTREAM sekali (single flight per tile),
+#     disimpan, lalu disajikan; upstream gagal -> jeda UPSTREAM_BACKOFF_SECONDS
+#     sebelum dicoba lagi, jadi saat jaringan putus peta tidak menunggu timeout
+#   - SEISMO_TILE_OFFLINE=1: hanya dari cache, tidak pernah ke upstream
+#   - tile hasil seed (python tile_cache.py seed) di-pin; tile hasil browsing
+#     dievict LRU kalau ukurannya melewati TILE_CACHE_MAX_MB
+# Tile yang sudah ada di file MBTiles dari tool lain (tanpa tabel tile_access)
+# dianggap di-pin. Tanpa SEISMO_TILE_PROXY=1 peta tetap memakai open-street-map.
+#
+#   SEISMO_TILE_PROXY=1
+#   SEISMO_TILE_CACHE=data/tiles/osm.mbtiles
+#   SEISMO_TILE_UPSTREAM=https://tile.openstreetmap.org/{z}/{x}/{y}.png
+#   SEISMO_TILE_CACHE_MB=1024
+#   SEISMO_TILE_URL=/tiles/{z}/{x}/{y}.png     (URL yang dipakai browser)
+
+ENABLED = os.environ.get("SEISMO_TILE_PROXY", "") == "1"
+OFFLINE = os.environ.get("SEISMO_TILE_OFFLINE", "") == "1"
+TILE_CACHE_PATH = os.environ.get("SEISMO_TILE_CACHE", "data/tiles/osm.mbtiles")
+TILE_UPSTREAM = os.environ.get("SEISMO_TILE_UPSTREAM", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+TILE_URL = os.environ.get("SEISMO_TILE_URL", "/tiles/{z}/{x}/{y}.png")
+TILE_CACHE_MAX_MB = float(os.environ.get("SEISMO_TILE_CACHE_MB", 1024))
+ATTRIBUTION = "© OpenStreetMap contributors"
+USER_AGENT = "SeismoTrack-tile-cache/1.0"
+
+MAX_ZOOM = 19
+REQUEST_TIMEOUT_SECONDS = 10
+UPSTREAM_BACKOFF_SECONDS = 30
+TOUCH_INTERVAL_SECONDS = 3600        # last_access hanya ditulis ulang kalau lebih tua dari ini
+EVICT_TARGET = 0.9                   # evict sampai 90% batas
+BROWSER_MAX_AGE = 7 * 86400
+
+# Bounding box Indonesia untuk seed (lat_min, lat_max, lon_min, lon_max)
+INDONESIA_BBOX = (-11.5, 6.5, 94.5, 141.5)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+CREATE TABLE IF NOT EXISTS tile_access (
+    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+    last_access REAL NOT NULL, size INTEGER NOT NULL, pinned INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+CREATE INDEX IF NOT EXISTS tile_access_lru ON tile_access (pinned, last_access);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_state_lock = threading.Lock()
+_initialized_path = None
+_evictable_bytes = 0
+_upstream_down_until = 0.0
+_stats = {"hits": 0, "misses": 0, "upstream_errors": 0, "evicted": 0}
+_flight = single_flight.SingleFlight(shared=False)
+
+
+# ----------------------------------------------------------------------
+#                            PENYIMPANAN
+# ----------------------------------------------------------------------
+def connect():
+    """Koneksi per thread ke file MBTiles (skema dibuat sekali per proses)."""
+    global _initialized_path, _evictable_bytes
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid() and _local.path == TILE_CACHE_PATH:
+        return conn
+    os.makedirs(os.path.dirname(TILE_CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(TILE_CACHE_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _init_lock:
+        if _initialized_path != TILE_CACHE_PATH:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)", [
+                ("name", "SeismoTrack tile cache"), ("format", "png"), ("type", "baselayer"),
+                ("attribution", ATTRIBUTION), ("bounds", "{2},{0},{3},{1}".format(*INDONESIA_BBOX)),
+            ])
+            conn.commit()
+            _evictable_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM tile_access WHERE pinned = 0").fetchone()[0]
+            _initialized_path = TILE_CACHE_PATH
+    _local.conn, _local.pid, _local.path = conn, os.getpid(), TILE_CACHE_PATH
+    return conn
+
+
+def _tms_row(z, y):
+    # MBTiles menyimpan baris dalam skema TMS (y dibalik)
+    return (1 << z) - 1 - y
+
+
+def get_tile(z, x, y):
+    """Isi tile (bytes) dari cache, atau None."""
+    conn = connect()
+    key = (z, x, _tms_row(z, y))
+    row = conn.execute(
+        "SELECT t.tile_data, a.last_access FROM tiles t LEFT JOIN tile_access a "
+        "ON a.zoom_level = t.zoom_level AND a.tile_column = t.tile_column AND a.tile_row = t.tile_row "
+        "WHERE t.zoom_level = ? AND t.tile_column = ? AND t.tile_row = ?", key).fetchone()
+    if row is None:
+        return None
+    now = time.time()
+    if row[1] is not None and now - row[1] > TOUCH_INTERVAL_SECONDS:
+        conn.execute("UPDATE tile_access SET last_access = ? "
+                     "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", (now, *key))
+        conn.commit()
+    return row[0]
+
+
+def put_tile(z, x, y, data, pinned=False):
+    """Simpan tile; tile tidak di-pin ikut dihitung untuk batas ukuran cache."""
+    global _evictable_bytes
+    conn = connect()
+    key = (z, x, _tms_row(z, y))
+    previous = conn.execute("SELECT size, pinned FROM tile_access "
+                            "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", key).fetchone()
+    pinned = pinned or bool(previous and previous[1])
+    conn.execute("INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+                 (*key, sqlite3.Binary(data)))
+    conn.execute("INSERT OR REPLACE INTO tile_access (zoom_level, tile_column, tile_row, last_access, size, pinned) "
+                 "VALUES (?, ?, ?, ?, ?, ?)", (*key, time.time(), len(data), int(pinned)))
+    conn.commit()
+    with _state_lock:
+        if previous and not previous[1]:
+            _evictable_bytes -= previous[0]
+        if not pinned:
+            _evictable_bytes += len(data)
+        over = _evictable_bytes > TILE_CACHE_MAX_MB * 1024 * 1024
+    if over:
+        evict()
+
+
+def evict(max_bytes=None):
+    """Hapus tile tidak di-pin yang paling lama tidak diakses sampai di bawah EVICT_TARGET."""
+    global _evictable_bytes
+    max_bytes = TILE_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tile_access WHERE pinned = 0").fetchone()[0]
+        removed = 0
+        while total > max_bytes * EVICT_TARGET:
+            victims = conn.execute("SELECT zoom_level, tile_column, tile_row, size FROM tile_access "
+                                   "WHERE pinned = 0 ORDER BY last_access LIMIT 500").fetchall()
+            if not victims:
+                break
+            keys = [v[:3] for v in victims]
+            conn.executemany("DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", keys)
+            conn.executemany("DELETE FROM tile_access WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", keys)
+            total -= sum(v[3] for v in victims)
+            removed += len(victims)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    with _state_lock:
+        _evictable_bytes = total
+        _stats["evicted"] += removed
+    return removed
+
+
+# ----------------------------------------------------------------------
+#                            UPSTREAM
+# ----------------------------------------------------------------------
+def fetch_upstream(z, x, y):
+    """Ambil satu tile dari TILE_UPSTREAM; None kalau gagal (upstream lalu di-backoff)."""
+    global _upstream_down_until
+    if OFFLINE or time.time() < _upstream_down_until:
+        return None
+    url = TILE_UPSTREAM.format(z=z, x=x, y=y)
+    try:
+        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT_SECONDS) as resp:
+            return resp.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 404:   # tile memang tidak ada, upstream sehat
+            return None
+        error = e
+    except (urllib.error.URLError, OSError) as e:
+        error = e
+    with _state_lock:
+        _stats["upstream_errors"] += 1
+        _upstream_down_until = time.time() + UPSTREAM_BACKOFF_SECONDS
+    print(f"⚠️ Tile upstream gagal ({error}), coba lagi dalam {UPSTREAM_BACKOFF_SECONDS} detik.")
+    return None
+
+
+def tile(z, x, y):
+    """Tile dari cache, atau dari upstream lalu disimpan (sekali per tile untuk request bersamaan)."""
+    data = get_tile(z, x, y)
+    if data is not None:
+        with _state_lock:
+            _stats["hits"] += 1
+        return data
+    with _state_lock:
+        _stats["misses"] += 1
+
+    def load():
+        data = fetch_upstream(z, x, y)
+        if data is not None:
+            put_tile(z, x, y, data)
+        return data
+
+    return _flight.do((z, x, y), load)
+
+
+def cache_info():
+    return dict(_stats)
+
+
+# ----------------------------------------------------------------------
+#                            SEED
+# ----------------------------------------------------------------------
+def tile_range(zoom, bbox=INDONESIA_BBOX):
+    """(x_min, x_max, y_min, y_max) tile XYZ yang menutupi bbox di zoom ini."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    n = 1 << zoom
+
+    def tile_x(lon):
+        return min(n - 1, max(0, int((lon + 180) / 360 * n)))
+
+    def tile_y(lat):
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(rad)) / math.pi) / 2 * n)))
+
+    return tile_x(lon_min), tile_x(lon_max), tile_y(lat_max), tile_y(lat_min)
+
+
+def seed(zooms, bbox=INDONESIA_BBOX, workers=2, refresh=False):
+    """Isi cache untuk bbox di level zoom tertentu; tile hasil seed di-pin (tidak dievict)."""
+    conn = connect()
+    todo = []
+    for z in zooms:
+        x_min, x_max, y_min, y_max = tile_range(z, bbox)
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                todo.append((z, x, y))
+    if not refresh:
+        pinned = set(conn.execute("SELECT zoom_level, tile_column, tile_row FROM tile_access WHERE pinned = 1"))
+        todo = [(z, x, y) for z, x, y in todo if (z, x, _tms_row(z, y)) not in pinned]
+    print(f"Seed {len(todo)} tile (zoom {', '.join(map(str, zooms))})")
+
+    def fetch(key):
+        data = get_tile(*key) if not refresh else None
+        if data is None:
+            data = fetch_upstream(*key)
+        return key, data
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (z, x, y), data in pool.map(fetch, todo):
+            if data is None:
+                failed += 1
+                continue
+            put_tile(z, x, y, data, pinned=True)
+            done += 1
+            if done % 500 == 0:
+                print(f"  {done}/{len(todo)}")
+    print(f"✅ {done} tile tersimpan, {failed} gagal, cache: {TILE_CACHE_PATH}")
+    return done, failed
+
+
+# ----------------------------------------------------------------------
+#                            FLASK & PLOTLY
+# ----------------------------------------------------------------------
+def create_blueprint():
+    tiles = Blueprint("tiles", __name__)
+
+    @tiles.route("/tiles/<int:z>/<int:x>/<int:y>.png")
+    def serve_tile(z, x, y):
+        if z > MAX_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+            return Response("Not found", status=404, mimetype="text/plain")
+        data = tile(z, x, y)
+        if data is None:
+            # Tanpa tile: 404 singkat supaya browser mencoba lagi nanti
+            return Response("Tile not available", status=404, mimetype="text/plain",
+                            headers={"Cache-Control": "no-store"})
+        return Response(data, mimetype="image/png",
+                        headers={"Cache-Control": f"public, max-age={BROWSER_MAX_AGE}"})
+
+    return tiles
+
+
+def init_app(server):
+    """Pasang /tiles di server Flask (sekali per server) kalau proxy aktif."""
+    if ENABLED and "tiles" not in server.blueprints:
+        server.register_blueprint(create_blueprint())
+    return server
+
+
+def mapbox_layout(**mapbox):
+    """Properti layout.mapbox: tile lokal kalau proxy aktif, selain itu open-street-map."""
+    if not ENABLED:
+        return {"style": "open-street-map", **mapbox}
+    return {
+        "style": "white-bg",
+        "layers": [{"below": "traces", "sourcetype": "raster", "sourceattribution": ATTRIBUTION,
+                    "source": [TILE_URL]}],
+        **mapbox,
+    }
+
+
+def _zoom_list(text):
+    zooms = []
+    for part in text.split(","):
+        lo, _, hi = part.partition("-")
+        zooms.extend(range(int(lo), int(hi or lo) + 1))
+    return sorted(set(zooms))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed / evict cache tile peta")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_seed = sub.add_parser("seed", help="isi cache untuk wilayah Indonesia")
+    p_seed.add_argument("--zoom", default="3-8", help="mis. 3-8 atau 4,6,9")
+    p_seed.add_argument("--bbox", help="lat_min,lat_max,lon_min,lon_max (default Indonesia)")
+    p_seed.add_argument("--workers", type=int, default=2)
+    p_seed.add_argument("--refresh", action="store_true", help="ambil ulang tile yang sudah ada")
+    p_evict = sub.add_parser("evict", help="evict tile tidak di-pin sampai di bawah batas")
+    p_evict.add_argument("--max-mb", type=float, default=TILE_CACHE_MAX_MB)
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        bbox = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else INDONESIA_BBOX
+        seed(_zoom_list(args.zoom), bbox, workers=args.workers, refresh=args.refresh)
+    else:
+        print(f"{evict(args.max_mb * 1024 * 1024)} tile dievict")
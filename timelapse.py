@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+import dataset_snapshot
+import event_table
+
+# ======================================================================
+#            TIME-LAPSE (playback seismisitas per hari/minggu/bulan)
+# ======================================================================
+# Posisi baris hasil filter diurutkan waktu sekali (Timeline, di-cache per
+# versi dataset + filter + step). Setiap frame = rentang kontigu di urutan
+# itu: offsets[f]..offsets[f+1]. Karena itu browser tidak perlu point set
+# penuh per frame (seperti animasi Plotly biasa): ia menerima chunk frame
+# berurutan (event yang MASUK, kolom ringkas), menyimpannya di buffer di
+# depan playhead, dan event yang KELUAR cukup dihitung dari offsets frame
+# yang sudah lewat jejak (trail). Peta menampilkan event di trail frame
+# terakhir.
+
+STEPS = {"day": "D", "week": "7D", "month": "MS"}
+STEP_LABELS = {"day": "Harian", "week": "Mingguan", "month": "Bulanan"}
+LABEL_FORMATS = {"day": "%Y-%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m"}
+TRAIL_FRAMES = {"day": 30, "week": 12, "month": 6}    # event tetap tampil selama N frame
+CHUNK_FRAMES = 60
+MAX_CHUNK_FRAMES = 500
+MAX_CHUNK_EVENTS = 20_000       # chunk dipotong lebih awal kalau event sebanyak ini
+
+_timelines = dataset_snapshot.VersionedCache(max_entries=64, name="timelapse")
+
+
+def _frame_start(time, step):
+    day = time.normalize()
+    if step == "week":
+        return day - pd.Timedelta(days=day.weekday())      # mulai Senin
+    if step == "month":
+        return day.replace(day=1)
+    return day
+
+
+class Timeline:
+    """Posisi baris urut waktu + batas frame; immutable per versi dataset."""
+
+    def __init__(self, df, positions, step):
+        positions = np.asarray(positions, dtype=np.int64)
+        times = df["time"].to_numpy()[positions]
+        valid = ~np.isnat(times)
+        positions, times = positions[valid], times[valid]
+        order = np.argsort(times, kind="stable")
+        self.step = step
+        self.positions = positions[order]
+        times = times[order]
+        if len(times):
+            edges = pd.date_range(_frame_start(pd.Timestamp(times[0]), step), pd.Timestamp(times[-1]),
+                                  freq=STEPS[step])
+            edges = edges.append(pd.DatetimeIndex([edges[-1] + pd.tseries.frequencies.to_offset(STEPS[step])]))
+        else:
+            edges = pd.DatetimeIndex([])
+        self.labels = edges[:-1].strftime(LABEL_FORMATS[step]).tolist()
+        self.offsets = np.searchsorted(times, edges.to_numpy().astype(times.dtype)) if len(edges) \
+            else np.zeros(1, dtype=np.int64)
+
+    @property
+    def n_frames(self):
+        return len(self.labels)
+
+    def chunk(self, df, start, frames=CHUNK_FRAMES):
+        """Frame start..start+frames: offsets absolut, label, dan event yang masuk (kolom)."""
+        start = min(max(int(start), 0), self.n_frames)
+        end = min(start + max(int(frames), 1), self.n_frames)
+        # Potong chunk kalau event terlalu banyak (minimal satu frame)
+        limit = np.searchsorted(self.offsets, self.offsets[start] + MAX_CHUNK_EVENTS, side="right") - 1
+        end = min(end, max(limit, start + 1)) if start < self.n_frames else start
+        lo, hi = int(self.offsets[start]), int(self.offsets[end])
+        events = event_table.display(df.iloc[self.positions[lo:hi]][["time", "latitude", "longitude", "magnitude", "depth"]])
+        return {
+            "step": self.step,
+            "total_frames": self.n_frames,
+            "trail": TRAIL_FRAMES[self.step],
+            "start": start,
+            "labels": self.labels[start:end],
+            "offsets": self.offsets[start:end + 1].tolist(),
+            "events": {
+                "time": events["time"].dt.strftime("%Y-%m-%d %H:%M").tolist(),
+                "latitude": np.round(events["latitude"].to_numpy(dtype=np.float64), 3).tolist(),
+                "longitude": np.round(events["longitude"].to_numpy(dtype=np.float64), 3).tolist(),
+                "magnitude": events["magnitude"].astype(object).where(events["magnitude"].notna(), None).tolist(),
+                "depth": events["depth"].astype(object).where(events["depth"].notna(), None).tolist(),
+            },
+        }
+
+
+def timeline(snap, key, step, positions_fn):
+    """Timeline untuk (filter, step) di versi snap; positions_fn() = posisi hasil filter."""
+    return _timelines.get_or_build(snap.version, (key, step), lambda: Timeline(snap.df, positions_fn(), step))